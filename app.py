@@ -131,8 +131,9 @@ except ModuleNotFoundError:
         # Try import again
         from src.main import main
 
-# Call setup function at import time
-setup_tesseract()
+# Call setup function at import time (not when multiprocessing re-imports this file in a worker)
+if __name__ != "__mp_main__":
+    setup_tesseract()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
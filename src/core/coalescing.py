@@ -0,0 +1,177 @@
+"""Single-flight coalescing of identical concurrent conversions."""
+
+import asyncio
+import hashlib
+import logging
+from typing import Callable, Dict, Hashable, Optional, Set
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CANCELLED_RESULT = ("Conversion cancelled.", None)
+
+
+def file_digest(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, the same hash the library stores."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Flight:
+    """One running (or queued) job and the requests attached to it."""
+
+    def __init__(self, key: Hashable, job, retain_seconds: float = 0.0):
+        self.key = key
+        self.job = job
+        self.retain_seconds = retain_seconds
+        self.subscribers: Set["JobSubscription"] = set()
+        self.result = asyncio.ensure_future(job.wait())
+
+    def succeeded(self) -> bool:
+        """True once the job has finished with a download file."""
+        return (self.result.done() and not self.result.cancelled() and self.result.exception() is None
+                and self.result.result()[1] is not None)
+
+
+class JobSubscription:
+    """
+    One request's view of a shared job.
+
+    Exposes the same interface as ScheduledJob. Cancelling a subscription
+    only detaches it; the job itself is cancelled once every subscriber
+    has cancelled.
+    """
+
+    def __init__(self, coalescer: "SingleFlight", flight: _Flight):
+        self._coalescer = coalescer
+        self._flight = flight
+        self._cancelled = asyncio.Event()
+
+    @property
+    def estimate(self):
+        return self._flight.job.estimate
+
+    @property
+    def started(self) -> bool:
+        return self._flight.job.started
+
+    @property
+    def shared(self) -> bool:
+        """True if other requests are attached to the same job."""
+        return len(self._flight.subscribers) > 1
+
+    def position(self) -> int:
+        return self._flight.job.position()
+
+    def eta(self) -> float:
+        return self._flight.job.eta()
+
+    def progress(self):
+        return self._flight.job.progress()
+
+    def promote(self) -> None:
+        """Give a speculative job normal priority."""
+        self._flight.job.promote()
+
+    def done(self) -> bool:
+        return self._flight.result.done()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    async def wait_started(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the shared job gets a slot; returns False on timeout."""
+        return await self._flight.job.wait_started(timeout)
+
+    async def wait(self):
+        """Wait for the shared result, returning early if this subscriber cancels."""
+        cancel_waiter = asyncio.ensure_future(self._cancelled.wait())
+        try:
+            await asyncio.wait({self._flight.result, cancel_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancel_waiter.cancel()
+        if self.cancelled() or not self._flight.result.done():
+            return CANCELLED_RESULT
+        return self._flight.result.result()
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    async def cancel(self):
+        """Detach from the job, cancelling it if no other subscriber remains."""
+        if self._cancelled.is_set():
+            return
+        self._cancelled.set()
+        await self._coalescer._unsubscribe(self)
+
+
+class SingleFlight:
+    """
+    Attaches identical concurrent requests to one job.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def join(self, key: Hashable, start: Callable[[], object], retain_seconds: float = 0.0) -> JobSubscription:
+        """
+        Subscribe to the job running for ``key``, starting it with ``start()`` if there is none.
+
+        Args:
+            key: Identity of the work (content hash, parser, options)
+            start: Callable that queues the job and returns a ScheduledJob
+            retain_seconds: Keep a new job's successful result available to
+                later requests for this long after it finishes
+
+        Returns:
+            JobSubscription: This request's handle on the job
+        """
+        flight = self._flights.get(key)
+        if not self.is_available(key):
+            flight = _Flight(key, start(), retain_seconds)
+            self._flights[key] = flight
+            flight.result.add_done_callback(lambda _: self._finished(flight))
+        else:
+            metrics.inc("coalescing.joined")
+            logger.info(f"Attached request to in-flight conversion ({len(flight.subscribers) + 1} subscribers)")
+        subscription = JobSubscription(self, flight)
+        flight.subscribers.add(subscription)
+        return subscription
+
+    def is_running(self, key: Hashable) -> bool:
+        """True if a job for ``key`` is queued or running."""
+        flight = self._flights.get(key)
+        return flight is not None and not flight.result.done()
+
+    def is_available(self, key: Hashable) -> bool:
+        """True if a job for ``key`` is queued, running or has a retained result."""
+        flight = self._flights.get(key)
+        return flight is not None and (not flight.result.done() or flight.succeeded())
+
+    def _finished(self, flight: _Flight) -> None:
+        if flight.retain_seconds and flight.succeeded():
+            asyncio.get_running_loop().call_later(flight.retain_seconds, self._forget, flight)
+        else:
+            self._forget(flight)
+
+    def _forget(self, flight: _Flight) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    async def _unsubscribe(self, subscription: JobSubscription) -> None:
+        flight = subscription._flight
+        flight.subscribers.discard(subscription)
+        if flight.subscribers:
+            return
+        # Nobody is waiting any more; new requests must start a fresh job
+        self._forget(flight)
+        await flight.job.cancel()
@@ -1,20 +1,59 @@
 import tempfile
+import hashlib
 import logging
+import threading
+import asyncio
 import time
 import os
+import shutil
+import uuid
+import concurrent.futures
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Use relative imports instead of absolute imports
 from src.core.parser_factory import ParserFactory
+from src.parsers.parser_interface import ParseResult
+from src.parsers.parser_registry import ParserRegistry
+from src.services.document_store import get_document_store
+from src.core.preflight import estimate_page_cost, detect_mime_type, MIME_EXTENSIONS, NATIVE_MIME_TYPES
+from src.core.scheduler import JobScheduler, estimate_job_cost
+from src.core.output_store import get_output_store
+from src.core.cpu_budget import MAX_CONCURRENT_CONVERSIONS, get_cpu_budget
+from src.core.hedging import FAST_ROUTE
+from src.core.progress import ProgressTracker
+from src.core.speculation import SPECULATION_RETAIN_SECONDS
+from src.core.coalescing import SingleFlight, file_digest
+from src.core.job_queue import QUEUE_MODE, QUEUED, DONE, FINISHED_STATES, get_broker, shared_path
 
 # Import all parsers to ensure they're registered
 import parsers
 
+# Output format display name -> (format id passed to parsers, file extension)
+OUTPUT_FORMATS = {
+    "Markdown": ("markdown", ".md"),
+    "JSON": ("json", ".json"),
+    "JSON Lines (per page)": ("jsonl", ".jsonl"),
+    "Text": ("text", ".txt"),
+    "Document Tags": ("document_tags", ".doctags"),
+}
+
+# Parsers that convert office, HTML and Markdown files with Docling's native backends
+NATIVE_DOCUMENT_PARSERS = {"Docling", "PyPdfium", "Auto"}
+
 # Reference to the cancellation flag from ui.py
 # This will be set by the UI when the cancel button is clicked
 conversion_cancelled = None  # Will be a threading.Event object
-# Flag to track if conversion is currently in progress
-_conversion_in_progress = False
+# Number of conversions currently in progress
+_conversions_in_progress = 0
+_in_progress_lock = threading.Lock()
+
+# Seconds between status checks of a conversion handed to a worker
+REMOTE_POLL_INTERVAL = 0.5
+
+# Executor that runs conversions for the async API
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CONVERSIONS, thread_name_prefix="markit-convert")
 
 def set_cancellation_flag(flag):
     """Set the reference to the cancellation flag from ui.py"""
@@ -23,8 +62,7 @@ def set_cancellation_flag(flag):
 
 def is_conversion_in_progress():
     """Check if conversion is currently in progress"""
-    global _conversion_in_progress
-    return _conversion_in_progress
+    return _conversions_in_progress > 0
 
 def check_cancellation():
     """Check if cancellation has been requested"""
@@ -41,7 +79,40 @@ def safe_delete_file(file_path):
         except Exception as e:
             logging.error(f"Error cleaning up temp file {file_path}: {e}")
 
-def convert_file(file_path, parser_name, ocr_method_name, output_format):
+def save_to_library(content, filename, content_hash, parser_name, ocr_method_name,
+                    output_format, duration):
+    """Store a finished conversion in the document library, if enabled"""
+    store = get_document_store()
+    if store is None:
+        return None
+    try:
+        pages = getattr(content, "pages", None)
+        if not pages:
+            output_path = getattr(content, "output_path", None)
+            if output_path:
+                # Only a preview is held in memory; index the full output
+                with open(output_path, encoding="utf-8") as f:
+                    pages = [f.read()]
+            else:
+                pages = [str(content)]
+        # Drop the hedged upgrade future, which cannot be stored
+        metadata = {k: v for k, v in (getattr(content, "metadata", None) or {}).items() if k != "upgrade"}
+        return store.add_document(
+            filename=filename,
+            pages=pages,
+            parser=parser_name,
+            ocr_method=ocr_method_name,
+            output_format=output_format,
+            duration=duration,
+            content_hash=content_hash,
+            metadata=metadata,
+        )
+    except Exception as e:
+        logging.error(f"Error saving conversion to library: {e}")
+        return None
+
+def convert_file(file_path, parser_name, ocr_method_name, output_format, cancellation_flag=None, profile=None,
+                 hedge=None, page_range=None, progress=None):
     """
     Convert a file using the specified parser and OCR method.
     
@@ -49,15 +120,37 @@ def convert_file(file_path, parser_name, ocr_method_name, output_format):
         file_path: Path to the file
         parser_name: Name of the parser to use
         ocr_method_name: Name of the OCR method to use
-        output_format: Output format (Markdown, JSON, Text, Document Tags)
+        output_format: Output format (Markdown, JSON, JSON Lines (per page), Text, Document Tags)
+        cancellation_flag: Optional per-job threading.Event; defaults to the
+            module-level flag set with set_cancellation_flag()
+        profile: True/False to force or skip profiling; None uses the
+            MARKIT_PROFILE settings and the Admin tab toggle
+        hedge: True/False to force or skip hedged parsing; None uses
+            MARKIT_HEDGED_PARSING. A hedged fast result carries
+            metadata["upgrade"], a future that resolves once the thorough
+            result has replaced the download file (None if it never does)
+        page_range: Optional 1-based page selection such as "1-3, 7", for
+            parsers that can convert part of a document (Gemini Flash)
+        progress: Optional callback receiving progress events (stage, pages
+            done, total pages, pages/s and ETA; see src.core.progress)
         
     Returns:
         tuple: (content, download_file_path)
     """
-    global conversion_cancelled, _conversion_in_progress
+    global _conversions_in_progress
+    
+    cancellation_flag = cancellation_flag or conversion_cancelled
+    tracker = ProgressTracker(progress) if progress else None
     
-    # Set the conversion in progress flag
-    _conversion_in_progress = True
+    def check_cancellation():
+        if cancellation_flag and cancellation_flag.is_set():
+            logging.info("Cancellation detected in convert_file")
+            return True
+        return False
+    
+    # Track the conversion as in progress
+    with _in_progress_lock:
+        _conversions_in_progress += 1
     
     # Temporary file paths to clean up
     temp_input = None
@@ -73,9 +166,18 @@ def convert_file(file_path, parser_name, ocr_method_name, output_format):
             logging.info("Cancellation detected at start of convert_file")
             return "Conversion cancelled.", None
 
+        original_name = Path(file_path).name
+        digest = hashlib.sha256()
+
+        # Pick the backend from the detected content type rather than the file name
+        mime_type = detect_mime_type(file_path)
+        if mime_type in NATIVE_MIME_TYPES and parser_name not in NATIVE_DOCUMENT_PARSERS:
+            logging.info(f"Routing {mime_type} document to Docling's native backend instead of {parser_name}")
+            parser_name, ocr_method_name = "Docling", "No OCR"
+
         # Create a temporary file with English filename
         try:
-            original_ext = Path(file_path).suffix
+            original_ext = MIME_EXTENSIONS.get(mime_type, Path(file_path).suffix)
             with tempfile.NamedTemporaryFile(suffix=original_ext, delete=False) as temp_file:
                 temp_input = temp_file.name
                 # Copy the content of original file to temp file
@@ -93,6 +195,7 @@ def convert_file(file_path, parser_name, ocr_method_name, output_format):
                         if not chunk:
                             break
                         temp_file.write(chunk)
+                        digest.update(chunk)
             file_path = temp_input
         except Exception as e:
             safe_delete_file(temp_input)
@@ -104,61 +207,84 @@ def convert_file(file_path, parser_name, ocr_method_name, output_format):
             safe_delete_file(temp_input)
             return "Conversion cancelled.", None
 
+        # Determine the format id and file extension based on the output format
+        format_id, ext = OUTPUT_FORMATS.get(output_format, (output_format.lower(), ".txt"))
+
+        # Reserve the download file up front so parsers can stream into it
+        try:
+            output_store = get_output_store()
+            tmp_path = output_store.create_path(suffix=ext)
+        except Exception as e:
+            safe_delete_file(temp_input)
+            return f"Error creating temporary file: {e}", None
+
         content = None
         try:
             # Use the parser factory to parse the document
             start = time.time()
             
-            # Pass the cancellation flag to the parser factory
-            content = ParserFactory.parse_document(
-                file_path=file_path,
-                parser_name=parser_name,
-                ocr_method_name=ocr_method_name,
-                output_format=output_format.lower(),
-                cancellation_flag=conversion_cancelled  # Pass the flag to parsers
-            )
+            # Pass the cancellation flag and this job's thread allotment to the parser factory
+            with get_cpu_budget().allot() as allotment:
+                content = ParserFactory.parse_document(
+                    file_path=file_path,
+                    parser_name=parser_name,
+                    ocr_method_name=ocr_method_name,
+                    output_format=format_id,
+                    cancellation_flag=cancellation_flag,  # Pass the flag to parsers
+                    output_path=tmp_path,
+                    with_pages=get_document_store() is not None,
+                    num_threads=allotment.threads,
+                    profile=profile,
+                    hedge=hedge,
+                    page_range=page_range,
+                    progress=tracker
+                )
+                upgrade = content.metadata.get("upgrade") if isinstance(content, ParseResult) else None
+                if upgrade is not None:
+                    # The thorough hedge branch keeps running on this job's share
+                    allotment.hold_until(upgrade)
             
             # If content indicates cancellation, return early
             if content == "Conversion cancelled.":
                 logging.info("Parser reported cancellation")
+                safe_delete_file(tmp_path)
                 safe_delete_file(temp_input)
                 return content, None
             
             duration = time.time() - start
             logging.info(f"Processed in {duration:.2f} seconds.")
+            if tracker is not None:
+                tracker.stage("saving")
             
             # Check for cancellation after processing
             if check_cancellation():
                 logging.info("Cancellation detected after processing")
+                safe_delete_file(tmp_path)
                 safe_delete_file(temp_input)
                 return "Conversion cancelled.", None
                 
         except Exception as e:
+            safe_delete_file(tmp_path)
             safe_delete_file(temp_input)
             return f"Error: {e}", None
 
-        # Determine the file extension based on the output format
-        if output_format == "Markdown":
-            ext = ".md"
-        elif output_format == "JSON":
-            ext = ".json"
-        elif output_format == "Text":
-            ext = ".txt"
-        elif output_format == "Document Tags":
-            ext = ".doctags"
-        else:
-            ext = ".txt"
+        # The parser already streamed the full output into the download file
+        if isinstance(content, ParseResult) and content.output_path == tmp_path:
+            safe_delete_file(temp_input)
+            temp_input = None
+            return _complete(content, tmp_path, original_name, digest.hexdigest(), parser_name,
+                             ocr_method_name, output_format, duration)
 
         # Check for cancellation again
         if check_cancellation():
             logging.info("Cancellation detected before output file creation")
+            safe_delete_file(tmp_path)
             safe_delete_file(temp_input)
             return "Conversion cancelled.", None
 
         try:
-            # Create a temporary file for download
-            with tempfile.NamedTemporaryFile(mode="w", suffix=ext, delete=False, encoding="utf-8") as tmp:
-                tmp_path = tmp.name
+            # Write the content to the download file
+            with open(tmp_path, "w", encoding="utf-8") as tmp:
                 # Write in chunks and check for cancellation
                 chunk_size = 10000  # characters
                 for i in range(0, len(content), chunk_size):
@@ -174,17 +300,325 @@ def convert_file(file_path, parser_name, ocr_method_name, output_format):
             # Clean up the temporary input file
             safe_delete_file(temp_input)
             temp_input = None  # Mark as cleaned up
-                
-            return content, tmp_path
+            
+            return _complete(content, tmp_path, original_name, digest.hexdigest(), parser_name,
+                             ocr_method_name, output_format, duration)
         except Exception as e:
             safe_delete_file(tmp_path)
             safe_delete_file(temp_input)
             return f"Error: {e}", None
     finally:
+        if tracker is not None:
+            tracker.stage("finished")
+        
         # Always clean up any remaining temp files
         safe_delete_file(temp_input)
         if check_cancellation() and tmp_path:
             safe_delete_file(tmp_path)
             
         # Always clear the conversion in progress flag when done
-        _conversion_in_progress = False
+        with _in_progress_lock:
+            _conversions_in_progress -= 1
+
+
+def _complete(content, tmp_path, original_name, content_hash, parser_name, ocr_method_name,
+              output_format, duration):
+    """
+    Register a finished download file and store the result in the library.
+
+    A hedged fast result is stored once its upgrade settles: the thorough
+    result replaces the download file and goes to the library, or the fast
+    result is stored if the upgrade fails.
+
+    Returns:
+        tuple: (content, download_file_path)
+    """
+    get_output_store().register(tmp_path)
+    upgrade = content.metadata.get("upgrade") if isinstance(content, ParseResult) else None
+    if upgrade is None:
+        save_to_library(content, original_name, content_hash, parser_name,
+                        ocr_method_name, output_format, duration)
+        return content, tmp_path
+
+    applied = concurrent.futures.Future()
+    started = time.time()
+
+    def on_upgrade(future):
+        result = future.result()
+        if result is None or not os.path.exists(tmp_path):
+            if isinstance(result, ParseResult) and result.output_path != tmp_path:
+                safe_delete_file(result.output_path)
+            save_to_library(content, original_name, content_hash, FAST_ROUTE[0],
+                            "No OCR", output_format, duration)
+            applied.set_result(None)
+            return
+        try:
+            if isinstance(result, ParseResult) and result.output_path and result.output_path != tmp_path:
+                os.replace(result.output_path, tmp_path)
+            else:
+                # Swap the file atomically so running downloads never see a partial file
+                partial_path = f"{tmp_path}.part"
+                with open(partial_path, "w", encoding="utf-8") as partial:
+                    partial.write(str(result))
+                os.replace(partial_path, tmp_path)
+            get_output_store().register(tmp_path)
+            save_to_library(result, original_name, content_hash, parser_name, ocr_method_name,
+                            output_format, duration + time.time() - started)
+            logging.info(f"Upgraded {original_name} to the {parser_name} result")
+            applied.set_result(result)
+        except Exception as e:
+            logging.error(f"Could not apply upgraded result: {e}")
+            applied.set_result(None)
+
+    upgrade.add_done_callback(on_upgrade)
+    metadata = dict(content.metadata, upgrade=applied)
+    return ParseResult(content, output_path=content.output_path, pages=content.pages, metadata=metadata), tmp_path
+
+
+class ConversionJob:
+    """
+    Awaitable handle for a conversion running in the executor.
+
+    Awaiting the job returns ``(content, download_file_path)`` as soon as the
+    conversion finishes or is cancelled, whichever happens first.
+    """
+
+    def __init__(self, future: asyncio.Future, cancellation_flag: threading.Event, progress=None):
+        self._future = future
+        self.cancellation_flag = cancellation_flag
+        self._progress = progress if progress is not None else {}
+        self._cancelled = asyncio.Event()
+
+    def done(self):
+        """Return True if the conversion has finished running"""
+        return self._future.done()
+
+    def progress(self):
+        """Return the latest progress event, or None before the first one"""
+        return dict(self._progress) or None
+
+    def cancelled(self):
+        """Return True if cancellation was requested"""
+        return self.cancellation_flag.is_set()
+
+    def add_done_callback(self, fn):
+        """Call fn(future) when the conversion finishes running"""
+        self._future.add_done_callback(fn)
+
+    async def wait(self):
+        """Wait for the result, returning early if the job is cancelled"""
+        cancel_waiter = asyncio.ensure_future(self._cancelled.wait())
+        try:
+            await asyncio.wait({self._future, cancel_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancel_waiter.cancel()
+        if self._future.done() and not self.cancelled():
+            return self._future.result()
+        return "Conversion cancelled.", None
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    async def cancel(self, timeout=0.5):
+        """
+        Request cancellation and give the worker a short time to clean up.
+
+        Returns:
+            bool: True if the worker has stopped
+        """
+        self.cancellation_flag.set()
+        self._cancelled.set()
+        if not self._future.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._future), timeout)
+            except (asyncio.TimeoutError, Exception):
+                pass
+        if not self._future.done():
+            logging.warning("Conversion did not stop within the cancellation timeout")
+        return self._future.done()
+
+
+def start_conversion(file_path, parser_name, ocr_method_name, output_format, page_range=None):
+    """
+    Start a conversion in the executor without blocking the event loop.
+
+    Must be called from a running event loop.
+
+    Returns:
+        ConversionJob: Awaitable handle with its own cancellation flag
+    """
+    loop = asyncio.get_running_loop()
+    cancellation_flag = threading.Event()
+    progress = {}
+    future = loop.run_in_executor(
+        _executor, functools.partial(convert_file, file_path, parser_name, ocr_method_name, output_format,
+                                     cancellation_flag, page_range=page_range, progress=progress.update)
+    )
+    return ConversionJob(future, cancellation_flag, progress)
+
+
+async def _run_remote(file_path, parser_name, ocr_method_name, output_format, cancellation_flag, page_range=None,
+                      progress=None):
+    """Hand a conversion to the worker queue and wait for its result."""
+    loop = asyncio.get_running_loop()
+    broker = get_broker()
+    input_path = shared_path("inputs", f"{uuid.uuid4().hex}{Path(file_path).suffix}")
+    await loop.run_in_executor(None, shutil.copyfile, file_path, input_path)
+    if cancellation_flag.is_set():
+        safe_delete_file(input_path)
+        return "Conversion cancelled.", None
+    job_id = await loop.run_in_executor(None, broker.enqueue, {
+        "input_path": input_path,
+        "parser_name": parser_name,
+        "ocr_method_name": ocr_method_name,
+        "output_format": output_format,
+        "page_range": page_range,
+        "original_name": Path(file_path).name,
+    })
+
+    while True:
+        job = await loop.run_in_executor(None, broker.get, job_id)
+        if cancellation_flag.is_set():
+            await loop.run_in_executor(None, broker.cancel, job_id)
+            if job["status"] == QUEUED:
+                safe_delete_file(input_path)
+            return "Conversion cancelled.", None
+        if job["status"] in FINISHED_STATES:
+            break
+        if progress is not None and job.get("progress"):
+            progress.update(job["progress"])
+        await asyncio.sleep(REMOTE_POLL_INTERVAL)
+
+    if job["status"] != DONE:
+        safe_delete_file(input_path)
+        return (job["result"] or {}).get("error", "Conversion failed."), None
+
+    # Take the result out of shared storage so it expires with the other downloads
+    output_store = get_output_store()
+    download_path = output_store.create_path(suffix=Path(job["result"]["result_path"]).suffix)
+    await loop.run_in_executor(None, shutil.move, job["result"]["result_path"], download_path)
+    output_store.register(download_path)
+    with open(download_path, encoding="utf-8") as f:
+        content = await loop.run_in_executor(None, f.read)
+    return content, download_path
+
+
+def start_remote_conversion(file_path, parser_name, ocr_method_name, output_format, page_range=None):
+    """
+    Queue a conversion for a worker process (MARKIT_QUEUE_MODE=1).
+
+    Must be called from a running event loop.
+
+    Returns:
+        ConversionJob: Awaitable handle with its own cancellation flag
+    """
+    cancellation_flag = threading.Event()
+    progress = {}
+    future = asyncio.ensure_future(
+        _run_remote(file_path, parser_name, ocr_method_name, output_format, cancellation_flag, page_range,
+                    progress)
+    )
+    return ConversionJob(future, cancellation_flag, progress)
+
+
+_scheduler = None
+_single_flight = None
+
+def get_single_flight():
+    """Return the shared in-flight conversion registry"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
+
+def get_scheduler():
+    """Return the shared job scheduler (created on first use inside the event loop)"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler(slots=MAX_CONCURRENT_CONVERSIONS)
+    return _scheduler
+
+
+async def submit_conversion(file_path, parser_name, ocr_method_name, output_format, user="anonymous",
+                            page_range=None, speculative=False):
+    """
+    Estimate a conversion's cost and queue it with the scheduler.
+
+    A request for the same content, parser, OCR method, output format and pages as
+    a conversion that is already queued or running attaches to that job
+    instead of starting another one. So does a request matching a
+    speculative conversion that finished in the last
+    SPECULATION_RETAIN_SECONDS.
+
+    Args:
+        speculative: Start the conversion only if the scheduler is idle, at
+            the lowest priority, and keep its result for a later matching
+            request (see src.core.speculation)
+
+    Raises:
+        AdmissionRejected: If the server's backlog limit would be exceeded
+
+    Returns:
+        JobSubscription: Awaitable handle exposing position(), eta() and cancel();
+        None for a speculative request that was not started
+    """
+    ocr_method_id = ParserRegistry.get_ocr_method_id(parser_name, ocr_method_name) or ocr_method_name
+    # A selection left over from a parser that supports it must not change the job's identity
+    page_range = ((page_range or "").strip() or None) if ParserRegistry.supports_page_range(parser_name) else None
+    loop = asyncio.get_running_loop()
+    try:
+        content_hash = await loop.run_in_executor(None, _cached_digest, file_path, *_file_identity(file_path))
+    except Exception as e:
+        logging.warning(f"Could not hash {file_path}; conversion will not be shared: {e}")
+        content_hash = None
+
+    runner = start_remote_conversion if QUEUE_MODE else start_conversion
+
+    def start():
+        return get_scheduler().submit(
+            lambda: runner(file_path, parser_name, ocr_method_name, output_format, page_range),
+            estimate, user=user, parser_name=parser_name, ocr_method_id=ocr_method_id,
+            speculative=speculative
+        )
+
+    key = (content_hash, parser_name, ocr_method_id, output_format, page_range) if content_hash else object()
+    coalescer = get_single_flight()
+    if coalescer.is_available(key):
+        subscription = coalescer.join(key, start)
+        if not speculative:
+            subscription.promote()
+        return subscription
+
+    try:
+        estimate = await loop.run_in_executor(None, _cached_estimate, file_path, content_hash,
+                                              parser_name, ocr_method_id, page_range)
+    except Exception as e:
+        logging.warning(f"Could not estimate conversion cost: {e}")
+        estimate = {"pages": 1, "file_size": 0, "scanned_ratio": 0.0,
+                    "seconds": estimate_page_cost(parser_name, ocr_method_id)}
+    if speculative and not get_scheduler().is_idle():
+        # Hashing and pre-flight are cached for the real request; the conversion waits for it
+        return None
+    return coalescer.join(key, start, retain_seconds=SPECULATION_RETAIN_SECONDS if speculative else 0.0)
+
+
+def _file_identity(file_path):
+    """Size and modification time, so cached results follow changes to the file"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_digest(file_path, size, mtime_ns):
+    return file_digest(file_path)
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_estimate(file_path, content_hash, parser_name, ocr_method_id, page_range=None):
+    return estimate_job_cost(file_path, parser_name, ocr_method_id, page_range=page_range)
+
+
+async def convert_file_async(file_path, parser_name, ocr_method_name, output_format, user="anonymous"):
+    """Async counterpart of convert_file() that goes through the scheduler."""
+    job = await submit_conversion(file_path, parser_name, ocr_method_name, output_format, user=user)
+    return await job
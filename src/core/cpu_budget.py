@@ -0,0 +1,179 @@
+"""Shared CPU thread budget for concurrent conversions."""
+
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _available_cpus() -> List[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+# Conversions that may run at the same time
+MAX_CONCURRENT_CONVERSIONS = int(os.getenv("MARKIT_MAX_CONCURRENT_CONVERSIONS", "4"))
+# Threads shared by all running conversions (default: CPUs available to the process)
+CPU_THREADS = int(os.getenv("MARKIT_CPU_THREADS", "0")) or len(_available_cpus())
+# Pin each conversion's worker thread to its own set of CPUs
+CPU_AFFINITY = os.getenv("MARKIT_CPU_AFFINITY", "0") == "1"
+
+# Read by OpenMP, MKL, OpenBLAS and numexpr when they initialise
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def apply_process_limits(concurrency: int = MAX_CONCURRENT_CONVERSIONS,
+                         total_threads: int = CPU_THREADS) -> int:
+    """
+    Cap the thread pools of native libraries so that ``concurrency`` jobs fit
+    in the budget. Must run before torch, OpenCV or tesseract are imported;
+    variables already set in the environment are left alone.
+
+    Returns:
+        int: Threads per job at full concurrency
+    """
+    threads = max(1, total_threads // max(1, concurrency))
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+    # Tesseract's own OpenMP pool; one thread each is fastest with parallel jobs
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1" if concurrency > 1 else str(threads))
+    return threads
+
+
+class ThreadAllotment:
+    """Threads (and optionally CPUs) granted to one running conversion."""
+
+    def __init__(self, threads: int, cpus: Optional[List[int]] = None):
+        self.threads = threads
+        self.cpus = cpus or []
+        self.held_until = None
+
+    def hold_until(self, future) -> None:
+        """
+        Keep this share reserved after the job's ``allot()`` block exits,
+        until ``future`` settles; for work the job leaves running in other
+        threads (a hedged conversion's thorough branch).
+        """
+        self.held_until = future
+
+    def __repr__(self):
+        return f"ThreadAllotment(threads={self.threads}, cpus={self.cpus})"
+
+
+class CpuBudget:
+    """
+    Splits a fixed number of CPU threads between the conversions running at
+    the same time.
+
+    Each job gets an equal share: the total divided by the number of jobs
+    allowed to run at once, so staggered jobs never add up to more than the
+    total and pinned jobs each find CPUs free. The share is passed to
+    parsers as ``num_threads``. torch and OpenCV only have process-wide
+    thread counts, so they are capped at one job's share once, when a job
+    first finds them loaded; concurrent jobs then add up to the total.
+    """
+
+    def __init__(self, total_threads: int = CPU_THREADS, pin: bool = CPU_AFFINITY,
+                 concurrency: int = MAX_CONCURRENT_CONVERSIONS):
+        self.total_threads = max(1, total_threads)
+        self.pin = pin
+        self.concurrency = max(1, concurrency)
+        self._lock = threading.Lock()
+        self._active: Dict[int, ThreadAllotment] = {}
+        self._free_cpus = _available_cpus()[:self.total_threads]
+        # Libraries whose process-wide thread count has been capped
+        self._limited = set()
+
+    def active_jobs(self) -> int:
+        with self._lock:
+            return len(self._active)
+
+    @contextmanager
+    def allot(self):
+        """Reserve a share of the budget for the calling thread's job."""
+        with self._lock:
+            threads = max(1, self.total_threads // self.concurrency)
+            cpus = []
+            if self.pin and self._free_cpus:
+                cpus, self._free_cpus = self._free_cpus[:threads], self._free_cpus[threads:]
+                threads = len(cpus)
+            allotment = ThreadAllotment(threads, cpus)
+            key = id(allotment)
+            self._active[key] = allotment
+            self._update_gauges()
+
+        self._limit_libraries()
+        previous_affinity = self._apply(allotment)
+        try:
+            yield allotment
+        finally:
+            if previous_affinity is not None:
+                try:
+                    os.sched_setaffinity(0, previous_affinity)
+                except OSError:
+                    pass
+            if allotment.held_until is not None:
+                allotment.held_until.add_done_callback(lambda _: self._release(key, allotment))
+            else:
+                self._release(key, allotment)
+
+    def _release(self, key: int, allotment: ThreadAllotment) -> None:
+        with self._lock:
+            self._active.pop(key, None)
+            self._free_cpus = sorted(self._free_cpus + allotment.cpus)
+            self._update_gauges()
+
+    def _limit_libraries(self) -> None:
+        """Cap torch and OpenCV thread pools at one job's share once they are loaded."""
+        # Both counts are process-wide: setting them per job would let each
+        # job overwrite the others' setting, so they are set once to the
+        # share every job gets
+        threads = max(1, self.total_threads // self.concurrency)
+        setters = {"torch": "set_num_threads", "cv2": "setNumThreads"}
+        with self._lock:
+            pending = [name for name in setters if name not in self._limited and name in sys.modules]
+            self._limited.update(pending)
+        for name in pending:
+            try:
+                getattr(sys.modules[name], setters[name])(threads)
+                logger.info(f"Limited {name} to {threads} threads per process")
+            except Exception as e:
+                logger.debug(f"Could not set {name} threads: {e}")
+
+    def _apply(self, allotment: ThreadAllotment):
+        """Pin the calling thread to the allotment's CPUs; returns the affinity to restore."""
+        if not allotment.cpus:
+            return None
+        try:
+            # On Linux pid 0 means the calling thread
+            previous = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, allotment.cpus)
+            return previous
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not pin conversion to CPUs {allotment.cpus}: {e}")
+            return None
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("cpu_budget.active_jobs", len(self._active))
+        metrics.set_gauge("cpu_budget.threads_in_use", sum(a.threads for a in self._active.values()))
+
+
+_budget: Optional[CpuBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_cpu_budget() -> CpuBudget:
+    """Return the shared CPU budget."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = CpuBudget()
+    return _budget
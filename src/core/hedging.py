@@ -0,0 +1,213 @@
+"""Hedged parsing: race a fast parser against a thorough one under a deadline."""
+
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+from src.core.metrics import metrics
+from src.core.progress import current_tracker, tracking
+from src.parsers.parser_interface import ParseResult
+
+logger = logging.getLogger(__name__)
+
+# Hedge every eligible conversion; callers can also pass hedge=True
+HEDGED_PARSING = os.getenv("MARKIT_HEDGED_PARSING", "0") == "1"
+# Seconds to wait for the thorough parser before returning the fast result
+HEDGE_DEADLINE_SECONDS = float(os.getenv("MARKIT_HEDGE_DEADLINE_SECONDS", "10"))
+# Parser and OCR method used for the fast branch
+FAST_ROUTE = ("PyPdfium", "no_ocr")
+# Parsers that are already fast enough not to be hedged
+UNHEDGED_PARSERS = {"PyPdfium", "Fast Text", "Auto"}
+
+CANCELLED = "Conversion cancelled."
+
+
+def should_hedge(parser_name: str, file_path: Union[str, Path], requested: Optional[bool] = None) -> bool:
+    """Hedge thorough parsers on PDFs when enabled globally or requested per job."""
+    enabled = HEDGED_PARSING if requested is None else requested
+    return (enabled and parser_name not in UNHEDGED_PARSERS
+            and Path(file_path).suffix.lower() == ".pdf")
+
+
+class _LinkedFlag:
+    """Cancellation flag that is set by its own branch or by the whole job."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._event = threading.Event()
+
+    def set(self):
+        self._event.set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set() or bool(self.parent and self.parent.is_set())
+
+
+def _run_in_thread(fn: Callable, name: str) -> Tuple[Future, dict]:
+    """Run ``fn`` in a new thread; returns its future and a dict receiving the native thread id."""
+    future: Future = Future()
+    info = {}
+
+    def target():
+        info["native_id"] = threading.get_native_id()
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return future, info
+
+
+def _deprioritise(info: dict) -> None:
+    """Lower the scheduling priority of a branch's thread (Linux only, best effort)."""
+    native_id = info.get("native_id")
+    if native_id is None or not hasattr(os, "setpriority"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, native_id, 10)
+    except OSError as e:
+        logger.debug(f"Could not lower priority of thread {native_id}: {e}")
+
+
+def _sibling_path(output_path: Optional[str], label: str) -> Optional[str]:
+    if not output_path:
+        return None
+    base, ext = os.path.splitext(output_path)
+    return f"{base}.{label}{ext}"
+
+
+def _succeeded(future: Future) -> bool:
+    if not future.done() or future.cancelled() or future.exception() is not None:
+        return False
+    result = future.result()
+    return result is not None and result != CANCELLED
+
+
+def _adopt_output(result, branch_path: Optional[str], output_path: Optional[str]):
+    """Move a branch's streamed output file into place at the job's output path."""
+    if (isinstance(result, ParseResult) and branch_path and output_path
+            and result.output_path == branch_path):
+        os.replace(branch_path, output_path)
+        return ParseResult(result, output_path=output_path, pages=result.pages, metadata=result.metadata)
+    return result
+
+
+def _remove(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def parse_hedged(parse: Callable[..., str], file_path: Union[str, Path],
+                 thorough: Tuple[str, str], fast: Tuple[str, str] = FAST_ROUTE,
+                 deadline: float = HEDGE_DEADLINE_SECONDS, cancellation_flag=None, **kwargs) -> str:
+    """
+    Start the fast and thorough conversions together.
+
+    If the thorough one finishes within ``deadline`` seconds its result is
+    returned and the fast one is cancelled. Otherwise the fast result is
+    returned as soon as it is ready, with ``metadata["upgrade"]`` set to a
+    future that resolves to the thorough result (or None if it fails or is
+    cancelled). The thorough branch keeps running at lower priority.
+
+    Args:
+        parse: Callable(parser_name, ocr_method_id, file_path, **kwargs) running one branch
+        file_path: Path to the document
+        thorough: (parser name, OCR method id) of the thorough branch
+        fast: (parser name, OCR method id) of the fast branch
+        deadline: Seconds to wait for the thorough branch
+        cancellation_flag: The job's cancellation flag
+        **kwargs: Options passed to both branches
+
+    Returns:
+        The chosen result
+    """
+    output_path = kwargs.get("output_path")
+
+    # The caller may delete its input file once we return, so the thorough
+    # branch works on its own link to it
+    thorough_input = f"{file_path}.thorough{Path(file_path).suffix}"
+    try:
+        os.link(file_path, thorough_input)
+    except OSError:
+        shutil.copyfile(file_path, thorough_input)
+
+    # Page progress follows the thorough branch
+    tracker = current_tracker()
+
+    branches = {}
+    for label, (parser_name, ocr_method_id), source in (("thorough", thorough, thorough_input),
+                                                          ("fast", fast, str(file_path))):
+        flag = _LinkedFlag(cancellation_flag)
+        branch_path = _sibling_path(output_path, label)
+        branch_kwargs = dict(kwargs, output_path=branch_path, cancellation_flag=flag,
+                             check_cancellation=flag.is_set)
+        branch_tracker = tracker if label == "thorough" else None
+
+        def run(parser_name=parser_name, ocr_method_id=ocr_method_id, source=source, branch_kwargs=branch_kwargs,
+                branch_tracker=branch_tracker):
+            with tracking(branch_tracker):
+                return parse(parser_name, ocr_method_id, source, **branch_kwargs)
+
+        future, info = _run_in_thread(run, f"markit-hedge-{label}")
+        branches[label] = {"future": future, "flag": flag, "path": branch_path, "info": info}
+
+    thorough_branch, fast_branch = branches["thorough"], branches["fast"]
+    thorough_branch["future"].add_done_callback(lambda _: _remove(thorough_input))
+
+    try:
+        thorough_branch["future"].result(timeout=deadline)
+    except FutureTimeoutError:
+        pass
+    except Exception:
+        pass
+
+    if _succeeded(thorough_branch["future"]):
+        fast_branch["flag"].set()
+        fast_branch["future"].add_done_callback(lambda _: _remove(fast_branch["path"]))
+        metrics.inc("hedge.thorough_within_deadline")
+        return _adopt_output(thorough_branch["future"].result(), thorough_branch["path"], output_path)
+
+    # Past the deadline (or the thorough branch failed): use the fast result
+    if not thorough_branch["future"].done():
+        _deprioritise(thorough_branch["info"])
+    try:
+        fast_result = fast_branch["future"].result()
+    except Exception as e:
+        logger.warning(f"Fast hedge branch failed: {e}")
+        fast_result = None
+    if fast_result is None or fast_result == CANCELLED:
+        # Nothing to show early; wait for the thorough branch
+        _remove(fast_branch["path"])
+        return _adopt_output(thorough_branch["future"].result(), thorough_branch["path"], output_path)
+
+    metrics.inc("hedge.fast_returned")
+    fast_result = _adopt_output(fast_result, fast_branch["path"], output_path)
+
+    upgrade: Future = Future()
+
+    def on_thorough_done(future: Future):
+        if _succeeded(future):
+            metrics.inc("hedge.upgrades")
+            upgrade.set_result(future.result())
+        else:
+            if not future.cancelled() and future.exception() is not None:
+                logger.warning(f"Thorough hedge branch failed: {future.exception()}")
+            _remove(thorough_branch["path"])
+            upgrade.set_result(None)
+
+    thorough_branch["future"].add_done_callback(on_thorough_done)
+    metadata = dict(getattr(fast_result, "metadata", None) or {},
+                    hedge="fast", upgrade=upgrade, fast_route=fast, thorough_route=thorough)
+    return ParseResult(fast_result, output_path=getattr(fast_result, "output_path", None),
+                       pages=getattr(fast_result, "pages", None), metadata=metadata)
@@ -0,0 +1,295 @@
+"""Durable conversion job queue shared by the UI and worker processes."""
+
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Send conversions to worker processes instead of running them in the UI process
+QUEUE_MODE = os.getenv("MARKIT_QUEUE_MODE", "0") == "1"
+# "sqlite" or "package.module:BrokerClass" for a custom JobBroker
+QUEUE_BROKER = os.getenv("MARKIT_QUEUE_BROKER", "sqlite")
+# Directory visible to the UI and every worker; holds the queue database, inputs and results
+DEFAULT_SHARED_DIR = os.path.join(os.path.expanduser("~"), ".markit", "shared")
+SHARED_DIR = os.getenv("MARKIT_SHARED_DIR", DEFAULT_SHARED_DIR)
+QUEUE_PATH = os.getenv("MARKIT_QUEUE_PATH", os.path.join(SHARED_DIR, "queue.sqlite"))
+# A running job whose worker has not heartbeated for this long is handed to another worker
+LEASE_SECONDS = float(os.getenv("MARKIT_WORKER_LEASE_SECONDS", "30"))
+# Deliveries before a job is marked as failed
+MAX_ATTEMPTS = int(os.getenv("MARKIT_QUEUE_MAX_ATTEMPTS", "3"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+
+class JobBroker(ABC):
+    """
+    Interface between the UI (producer) and workers (consumers).
+
+    Jobs are dicts with at least: id, status, payload, attempts, worker_id,
+    result and progress (the latest progress event, if any). A claimed job is leased to its worker; a worker keeps the
+    lease alive with heartbeat() and a job whose lease runs out is
+    delivered again.
+    """
+
+    @abstractmethod
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """Add a job and return its ID."""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Lease the oldest deliverable job to a worker, or return None."""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Extend a lease; returns False if the worker no longer owns the job."""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Record a job's result; returns False if the worker no longer owns the job."""
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record a job's failure; returns False if the worker no longer owns the job."""
+
+    @abstractmethod
+    def cancel(self, job_id: str) -> None:
+        """Cancel a queued job, or ask the worker running it to stop."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job, or None if it does not exist."""
+
+    def report_progress(self, job_id: str, worker_id: str, progress: Dict[str, Any]) -> None:
+        """Record a running job's latest progress event (optional)."""
+
+    def register_worker(self, worker_id: str, info: Dict[str, Any]) -> None:
+        """Record a worker's liveness and details (optional)."""
+
+    def workers(self) -> List[Dict[str, Any]]:
+        """Workers seen recently (optional)."""
+        return []
+
+
+class SQLiteBroker(JobBroker):
+    """
+    JobBroker backed by a SQLite database.
+
+    Suitable for workers on the same host or a filesystem with working
+    POSIX locks; use a custom broker for anything wider.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    progress TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+                CREATE TABLE IF NOT EXISTS workers (
+                    id TEXT PRIMARY KEY,
+                    info TEXT NOT NULL,
+                    last_seen REAL NOT NULL
+                );
+            """)
+            # Queues created before progress reporting lack the column
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "progress" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(payload), now, now),
+        )
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Cancelled jobs whose worker died before it could stop are finished here
+            abandoned = conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = ? AND lease_expires < ? AND cancel_requested = 1",
+                (RUNNING, now),
+            ).fetchall()
+            for stale in abandoned:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                    (CANCELLED, now, stale["id"]),
+                )
+            # Jobs whose worker died are given up on after too many deliveries
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, json.dumps({"error": "Worker stopped responding"}), now,
+                 RUNNING, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE (status = ? OR (status = ? AND lease_expires < ?)) "
+                "AND cancel_requested = 0 ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            job = None
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    (RUNNING, worker_id, now + lease_seconds, now, row["id"]),
+                )
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for stale in abandoned:
+            logger.info(f"Job {stale['id']} was cancelled while its worker was gone")
+            self._delete_input(json.loads(stale["payload"]))
+        if job is None:
+            return None
+        if job["attempts"] > 1:
+            logger.warning(f"Re-delivering job {job['id']} (attempt {job['attempts']})")
+        return self._row(job)
+
+    @staticmethod
+    def _delete_input(payload: Dict[str, Any]) -> None:
+        input_path = payload.get("input_path")
+        if not input_path:
+            return
+        try:
+            os.unlink(input_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete job input {input_path}: {e}")
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+            (now + lease_seconds, now, job_id, worker_id, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def _finish(self, job_id: str, worker_id: str, status: str, result: Dict[str, Any]) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = ?",
+            (status, json.dumps(result), time.time(), job_id, worker_id, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return self._finish(job_id, worker_id, DONE, result)
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._finish(job_id, worker_id, FAILED, {"error": error})
+
+    def cancel(self, job_id: str) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = ?, cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, now, job_id, QUEUED),
+        )
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+            (now, job_id, RUNNING),
+        )
+
+    def report_progress(self, job_id: str, worker_id: str, progress: Dict[str, Any]) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+            (json.dumps(progress), time.time(), job_id, worker_id, RUNNING),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._row(self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def register_worker(self, worker_id: str, info: Dict[str, Any]) -> None:
+        self._connect().execute(
+            "INSERT INTO workers (id, info, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET info = excluded.info, last_seen = excluded.last_seen",
+            (worker_id, json.dumps(info), time.time()),
+        )
+
+    def workers(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT * FROM workers WHERE last_seen > ? ORDER BY id", (time.time() - LEASE_SECONDS,)
+        ).fetchall()
+        return [dict(row, info=json.loads(row["info"])) for row in rows]
+
+
+def shared_path(*parts: str) -> str:
+    """Path inside the shared directory, creating its parent directory."""
+    path = os.path.join(SHARED_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+_broker: Optional[JobBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> JobBroker:
+    """Return the configured broker (MARKIT_QUEUE_BROKER)."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            if QUEUE_BROKER == "sqlite":
+                _broker = SQLiteBroker()
+            else:
+                module_name, _, class_name = QUEUE_BROKER.partition(":")
+                _broker = getattr(importlib.import_module(module_name), class_name)()
+            logger.info(f"Using {type(_broker).__name__} job broker")
+    return _broker
@@ -0,0 +1,191 @@
+"""Opt-in CPU-optimised (int8 / ONNX) variants of Docling's layout and table models."""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated parser names that use the CPU-optimised models by default,
+# e.g. "Docling,PyPdfium". Callers can override per job with cpu_optimised=True/False.
+CPU_OPTIMISED_PARSERS = {
+    name.strip() for name in os.getenv("MARKIT_CPU_OPTIMISED_PARSERS", "").split(",") if name.strip()
+}
+
+# Local directory with pre-downloaded Docling model artifacts and, optionally,
+# an exported layout model named layout.onnx
+MODEL_DIR = os.getenv("MARKIT_MODEL_DIR")
+LAYOUT_ONNX_FILENAME = "layout.onnx"
+
+# Optimised models built in this process, keyed by model kind, weights and device.
+# Every job creates a new converter; this keeps the int8 / ONNX conversion to once per process.
+_optimised_models: Dict[Tuple[str, str, str], Tuple[str, Any]] = {}
+_optimised_lock = threading.Lock()
+
+
+def is_cpu_optimised(parser_name: str, options: Dict[str, Any]) -> bool:
+    """Return True if a job should use the CPU-optimised models."""
+    return bool(options.get("cpu_optimised", parser_name in CPU_OPTIMISED_PARSERS))
+
+
+def apply_model_dir(pipeline_options) -> None:
+    """Load Docling models from the local model directory, if one is configured."""
+    if MODEL_DIR:
+        pipeline_options.artifacts_path = MODEL_DIR
+
+
+def optimise_converter(converter, input_format) -> Dict[str, str]:
+    """
+    Swap the layout and TableFormer models of a Docling converter for
+    CPU-optimised variants.
+
+    The layout model uses ``layout.onnx`` from the model directory when it
+    exists and onnxruntime is installed; otherwise both models are
+    dynamically quantised to int8.
+
+    Returns:
+        dict mapping model name to the variant now in use
+    """
+    variants = {}
+    converter.initialize_pipeline(input_format)
+    for pipeline in converter.initialized_pipelines.values():
+        for model in getattr(pipeline, "build_pipe", []):
+            if hasattr(model, "layout_predictor"):
+                variants["layout"] = optimise_layout_predictor(model.layout_predictor)
+            if hasattr(model, "tf_predictor"):
+                variants["tableformer"] = optimise_table_predictor(model.tf_predictor)
+    logger.info(f"CPU-optimised models: {variants}")
+    return variants
+
+
+def optimise_layout_predictor(predictor) -> str:
+    """Replace a LayoutPredictor's model with an ONNX or int8 variant."""
+
+    def build(model):
+        onnx_path = Path(MODEL_DIR) / LAYOUT_ONNX_FILENAME if MODEL_DIR else None
+        if onnx_path and onnx_path.exists():
+            try:
+                return "onnx", OnnxLayoutModel(str(onnx_path))
+            except Exception as e:
+                logger.warning(f"Could not load {onnx_path}, falling back to int8: {e}")
+        return "int8", quantize_module(model)
+
+    return _swap_model(predictor, "layout", build)
+
+
+def optimise_table_predictor(predictor) -> str:
+    """Dynamically quantise a TableFormer predictor's model to int8."""
+    return _swap_model(predictor, "tableformer", lambda model: ("int8", quantize_module(model)))
+
+
+def _swap_model(predictor, kind: str, build: Callable[[Any], Tuple[str, Any]]) -> str:
+    """Give a predictor the process-wide optimised model for its weights, building it on first use."""
+    if getattr(predictor, "_markit_variant", None):
+        return predictor._markit_variant
+    if not _on_cpu(predictor):
+        return "fp32"
+    weights = _weights_id(predictor)
+    key = (kind, weights or "", str(getattr(predictor, "_device", "cpu")))
+    with _optimised_lock:
+        cached = _optimised_models.get(key) if weights else None
+        if cached is None:
+            cached = build(predictor._model)
+            if weights:
+                _optimised_models[key] = cached
+        else:
+            logger.debug(f"Reusing optimised {kind} model")
+    predictor._markit_variant, predictor._model = cached
+    return predictor._markit_variant
+
+
+def _weights_id(predictor) -> Optional[str]:
+    """Identify the weights a predictor loaded; None if unknown (the model is then not shared)."""
+    st_fn = getattr(predictor, "_st_fn", None)
+    if st_fn:
+        return str(st_fn)
+    config = getattr(predictor, "_config", None)
+    if isinstance(config, dict):
+        save_dir = (config.get("model") or {}).get("save_dir")
+        if save_dir:
+            return str(save_dir)
+    return None
+
+
+def quantize_module(module):
+    """Dynamically quantise the Linear layers of a torch module to int8."""
+    import torch
+
+    quantized = torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+
+def _on_cpu(predictor) -> bool:
+    return str(getattr(predictor, "_device", "cpu")).startswith("cpu")
+
+
+class _LayoutOutputs:
+    """Mimics the fields of the RT-DETR model output used by post-processing."""
+
+    def __init__(self, logits, pred_boxes):
+        self.logits = logits
+        self.pred_boxes = pred_boxes
+
+
+class OnnxLayoutModel:
+    """Callable stand-in for the RT-DETR layout model backed by onnxruntime."""
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, session_options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, pixel_values, **kwargs):
+        import torch
+
+        logits, pred_boxes = self.session.run(
+            ["logits", "pred_boxes"], {"pixel_values": pixel_values.cpu().numpy()}
+        )
+        return _LayoutOutputs(torch.from_numpy(logits), torch.from_numpy(pred_boxes))
+
+
+def export_layout_onnx(predictor, output_path: str, opset: int = 17) -> str:
+    """
+    Export a LayoutPredictor's fp32 model to ONNX for use with OnnxLayoutModel.
+
+    Args:
+        predictor: A docling-ibm-models LayoutPredictor
+        output_path: Destination .onnx file
+        opset: ONNX opset version
+
+    Returns:
+        str: The output path
+    """
+    import torch
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            outputs = self.model(pixel_values=pixel_values)
+            return outputs.logits, outputs.pred_boxes
+
+    size = predictor._image_size
+    dummy = torch.zeros(1, 3, size, size)
+    torch.onnx.export(
+        _Wrapper(predictor._model).eval(),
+        (dummy,),
+        output_path,
+        input_names=["pixel_values"],
+        output_names=["logits", "pred_boxes"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}, "pred_boxes": {0: "batch"}},
+        opset_version=opset,
+    )
+    return output_path
@@ -0,0 +1,206 @@
+"""Managed directory for converted download files with TTL, quota and LRU eviction."""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Set
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "markit-outputs")
+OUTPUT_DIR = os.getenv("MARKIT_OUTPUT_DIR", DEFAULT_OUTPUT_DIR)
+OUTPUT_TTL_SECONDS = float(os.getenv("MARKIT_OUTPUT_TTL_SECONDS", str(24 * 3600)))
+OUTPUT_QUOTA_BYTES = int(float(os.getenv("MARKIT_OUTPUT_QUOTA_MB", "1024")) * 1024 * 1024)
+SWEEP_INTERVAL_SECONDS = float(os.getenv("MARKIT_OUTPUT_SWEEP_INTERVAL", "60"))
+# Untracked files (e.g. side files written next to a download) are adopted by the sweeper
+# once they have not changed for this long
+ORPHAN_GRACE_SECONDS = float(os.getenv("MARKIT_OUTPUT_ORPHAN_GRACE_SECONDS", "600"))
+
+
+class OutputStore:
+    """
+    Owns the files offered for download.
+
+    Every file gets a time-to-live; when the directory grows past its quota
+    the least recently used files are evicted, except the file most recently
+    registered or served. A background thread sweeps expired files
+    periodically and adopts files it does not track, such as profiles and
+    hedged-branch outputs written next to a download, so they expire too.
+    """
+
+    def __init__(self, directory: str = OUTPUT_DIR, ttl_seconds: float = OUTPUT_TTL_SECONDS,
+                 quota_bytes: int = OUTPUT_QUOTA_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        # path -> {"size": bytes, "last_used": timestamp, "expires": timestamp}
+        self._files: Dict[str, Dict[str, float]] = {}
+        # Paths handed out by create_path() that are still being written
+        self._reserved: Set[str] = set()
+        # Most recently registered or served file, never evicted for quota
+        self._pinned: Optional[str] = None
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._adopt_untracked()
+
+    def create_path(self, suffix: str = "") -> str:
+        """Reserve a new, empty file in the store and return its path."""
+        path = os.path.join(self.directory, f"{uuid.uuid4().hex}{suffix}")
+        open(path, "w").close()
+        with self._lock:
+            self._reserved.add(path)
+        return path
+
+    def register(self, path: str, ttl_seconds: Optional[float] = None) -> None:
+        """Start tracking a finished file and enforce the quota."""
+        now = time.time()
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._lock:
+            self._reserved.discard(path)
+            self._files[path] = {
+                "size": size,
+                "last_used": now,
+                "expires": now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds),
+            }
+            self._pinned = path
+        self._enforce_quota()
+        self._update_gauges()
+
+    def touch(self, path: str) -> None:
+        """Mark a file as recently used so it is evicted last."""
+        with self._lock:
+            entry = self._files.get(path)
+            if entry:
+                entry["last_used"] = time.time()
+                self._pinned = path
+
+    def discard(self, path: str) -> None:
+        """Delete a tracked file that is no longer needed."""
+        with self._lock:
+            self._reserved.discard(path)
+        self._evict(path, "discarded")
+        self._update_gauges()
+
+    def sweep(self) -> None:
+        """Adopt untracked files, remove expired ones, then evict until under quota."""
+        self._adopt_untracked(ORPHAN_GRACE_SECONDS)
+        now = time.time()
+        with self._lock:
+            expired = [path for path, entry in self._files.items() if entry["expires"] <= now]
+        for path in expired:
+            self._evict(path, "ttl")
+        self._enforce_quota()
+        self._update_gauges()
+
+    def bytes_held(self) -> int:
+        with self._lock:
+            return int(sum(entry["size"] for entry in self._files.values()))
+
+    def start_sweeper(self, interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+        """Start the background sweeper thread if it is not running."""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Output store sweep failed: {e}")
+
+        self._sweeper = threading.Thread(target=run, name="markit-output-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+
+    def _enforce_quota(self) -> None:
+        while True:
+            with self._lock:
+                total = sum(entry["size"] for entry in self._files.values())
+                candidates = [path for path in self._files if path != self._pinned]
+                if total <= self.quota_bytes or not candidates:
+                    return
+                oldest = min(candidates, key=lambda path: self._files[path]["last_used"])
+            self._evict(oldest, "quota")
+
+    def _evict(self, path: str, reason: str) -> None:
+        with self._lock:
+            entry = self._files.pop(path, None)
+        if entry is None:
+            return
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Could not evict {path}: {e}")
+        metrics.inc("output_store.evictions")
+        metrics.inc(f"output_store.evictions.{reason}")
+        metrics.inc("output_store.bytes_evicted", entry["size"])
+
+    def _update_gauges(self) -> None:
+        with self._lock:
+            metrics.set_gauge("output_store.bytes_held", int(sum(e["size"] for e in self._files.values())))
+            metrics.set_gauge("output_store.files_held", len(self._files))
+
+    def _adopt_untracked(self, min_age: float = 0.0) -> None:
+        """
+        Track files in the directory that nothing registered so they still expire.
+
+        Covers files left over from a previous run and side files written
+        next to a download. Files unchanged for less than ``min_age``
+        seconds, and those sharing a name with a file still being written,
+        are left for a later sweep.
+        """
+        now = time.time()
+        with self._lock:
+            self._reserved = {path for path in self._reserved if os.path.exists(path)}
+            tracked = set(self._files)
+            busy = {os.path.basename(path).split(".", 1)[0] for path in self._reserved}
+        adopted = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if path in tracked or name.split(".", 1)[0] in busy:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path) or now - stat.st_mtime < min_age:
+                continue
+            adopted[path] = {
+                "size": stat.st_size,
+                "last_used": stat.st_mtime,
+                "expires": stat.st_mtime + self.ttl_seconds,
+            }
+        if adopted:
+            with self._lock:
+                for path, entry in adopted.items():
+                    self._files.setdefault(path, entry)
+        self._update_gauges()
+
+
+_store: Optional[OutputStore] = None
+_store_lock = threading.Lock()
+
+
+def get_output_store() -> OutputStore:
+    """Return the shared output store, starting its sweeper on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OutputStore()
+            _store.start_sweeper()
+    return _store
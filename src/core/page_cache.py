@@ -0,0 +1,299 @@
+"""Page-level content-hash cache for incremental re-conversion of PDFs."""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from src.core.model_optimization import is_cpu_optimised
+from src.core.serialization import iter_jsonl, write_chunks
+from src.core.progress import report_pages
+from src.parsers.parser_interface import DocumentParser, ParseResult
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".markit", "page_cache.db")
+PAGE_CACHE_PATH = os.getenv("MARKIT_PAGE_CACHE_PATH", DEFAULT_CACHE_PATH)
+PAGE_CACHE_ENABLED = os.getenv("MARKIT_PAGE_CACHE_ENABLED", "1") != "0"
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("MARKIT_PAGE_CACHE_MAX_ENTRIES", "200000"))
+
+# Output formats that can be assembled from independently converted pages
+CACHEABLE_FORMATS = {"markdown", "jsonl"}
+
+# Parsers kept out of the cache: Fast Text reads the text layer about as fast as pages can be
+# hashed, and Auto may route a subset of changed pages differently from the whole document
+UNCACHED_PARSERS = {"Fast Text", "Auto"}
+
+# Pages with fewer text-layer characters are hashed by their rendered image
+SCANNED_PAGE_MAX_CHARS = 50
+
+# Render scale used when hashing scanned pages (1.0 = 72 DPI)
+HASH_RENDER_SCALE = 0.5
+
+# Bump to invalidate every cached page when page splitting or hashing changes
+CACHE_VERSION = "2"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_cache (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_page_cache_last_used ON page_cache(last_used);
+"""
+
+
+class PageCache:
+    """SQLite-backed store of converted pages keyed by page content hash."""
+
+    def __init__(self, db_path: str = PAGE_CACHE_PATH, max_entries: int = PAGE_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Return cached content for every key that is present."""
+        if not keys:
+            return {}
+        unique_keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock, self._conn:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, content FROM page_cache WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE page_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        return found
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        """Store converted pages and evict the least recently used ones over the limit."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO page_cache (key, content, last_used) VALUES (?, ?, ?)",
+                [(key, content, now) for key, content in items.items()],
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM page_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM page_cache WHERE key IN "
+                    "(SELECT key FROM page_cache ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Return the shared page cache, or None if it is disabled or unavailable."""
+    global _cache
+    if not PAGE_CACHE_ENABLED or not PDFIUM_AVAILABLE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = PageCache(PAGE_CACHE_PATH)
+            except Exception as e:
+                logger.error(f"Could not open page cache at {PAGE_CACHE_PATH}: {e}")
+                return None
+    return _cache
+
+
+def compute_page_hashes(file_path: Union[str, Path]) -> List[str]:
+    """
+    Hash every page of a PDF by what it displays.
+
+    The hash covers the page size, text layer, the type and position of
+    each page object and the raw data of every image, so pages that differ
+    only in an embedded image (whose OCR output would differ) do not
+    collide. Scanned pages, which have little or no text layer,
+    additionally hash a low-resolution rendering of the page.
+    """
+    pdf = pdfium.PdfDocument(str(file_path))
+    try:
+        hashes = []
+        for index in range(len(pdf)):
+            page = pdf[index]
+            try:
+                digest = hashlib.sha256()
+                width, height = page.get_size()
+                digest.update(f"{width:.2f}x{height:.2f}|".encode())
+                text_page = page.get_textpage()
+                text = text_page.get_text_bounded()
+                text_page.close()
+                digest.update(text.encode("utf-8"))
+                for obj in page.get_objects(max_depth=2):
+                    left, bottom, right, top = obj.get_pos()
+                    digest.update(f"|{obj.type}:{left:.1f},{bottom:.1f},{right:.1f},{top:.1f}".encode())
+                    if isinstance(obj, pdfium.PdfImage):
+                        digest.update(hashlib.sha256(bytes(obj.get_data(decode_simple=False))).digest())
+                if len(text.strip()) < SCANNED_PAGE_MAX_CHARS:
+                    bitmap = page.render(scale=HASH_RENDER_SCALE, grayscale=True)
+                    digest.update(bytes(bitmap.buffer))
+                    bitmap.close()
+                hashes.append(digest.hexdigest())
+            finally:
+                page.close()
+        return hashes
+    finally:
+        pdf.close()
+
+
+def _cache_key(page_hash: str, parser_name: str, ocr_method_id: str, model_variant: str = "") -> str:
+    """Combine a page hash with the conversion settings that affect its output."""
+    raw = f"{CACHE_VERSION}|{page_hash}|{parser_name}|{ocr_method_id}|{model_variant}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def write_page_subset(file_path: Union[str, Path], indices: List[int], output_path: str) -> None:
+    """Write the given zero-based pages of a PDF into a new PDF."""
+    src = pdfium.PdfDocument(str(file_path))
+    dest = pdfium.PdfDocument.new()
+    try:
+        dest.import_pages(src, pages=indices)
+        dest.save(output_path)
+    finally:
+        dest.close()
+        src.close()
+
+
+def _uncacheable(result) -> List[int]:
+    """Zero-based pages of a result that a fallback engine produced or that failed."""
+    statuses = (getattr(result, "metadata", None) or {}).get("page_status", [])
+    return [status["page"] - 1 for status in statuses if status["status"] in ("fallback", "failed")]
+
+
+def parse_with_page_cache(parser: DocumentParser, parser_name: str,
+                          file_path: Union[str, Path], ocr_method_id: str,
+                          cache: PageCache, **kwargs) -> Optional[str]:
+    """
+    Parse a PDF, converting only the pages that are not already cached.
+
+    Changed pages are copied into a smaller PDF and converted on their own,
+    then spliced together with the cached pages. Parsers that cannot return
+    per-page output are left alone.
+
+    Args:
+        parser: Parser instance to use for uncached pages
+        parser_name: Registry name of the parser (part of the cache key)
+        file_path: Path to the PDF
+        ocr_method_id: Internal OCR method ID
+        cache: Page cache to read from and write to
+        **kwargs: Options passed through to the parser
+
+    Returns:
+        The parsed content, or None if the document cannot be handled
+        page by page and should be parsed normally
+    """
+    output_format = kwargs.get("output_format", "markdown").lower()
+    if (output_format not in CACHEABLE_FORMATS or parser_name in UNCACHED_PARSERS
+            or not parser.supports_page_output()
+            or Path(file_path).suffix.lower() != ".pdf"):
+        return None
+    check_cancellation = kwargs.get("check_cancellation")
+
+    try:
+        page_hashes = compute_page_hashes(file_path)
+    except Exception as e:
+        logger.warning(f"Page cache skipped, could not hash pages: {e}")
+        return None
+    if not page_hashes:
+        return None
+
+    # Quantised models may produce slightly different output, so cache them separately
+    model_variant = "cpu_optimised" if is_cpu_optimised(parser_name, kwargs) else ""
+    keys = [_cache_key(h, parser_name, ocr_method_id, model_variant) for h in page_hashes]
+    cached = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    logger.info(f"Page cache: {len(page_hashes) - len(missing)}/{len(page_hashes)} pages cached")
+    report_pages(len(page_hashes) - len(missing))
+
+    if len(missing) == len(page_hashes):
+        # Nothing cached: convert normally and remember the pages for next time
+        result = parser.parse(file_path, ocr_method=ocr_method_id, **dict(kwargs, with_pages=True))
+        new_pages = getattr(result, "pages", None)
+        if new_pages and len(new_pages) == len(keys):
+            skip = set(_uncacheable(result))
+            cache.put_many({key: page for i, (key, page) in enumerate(zip(keys, new_pages)) if i not in skip})
+        elif result != "Conversion cancelled.":
+            logger.info("Page cache: parser returned no usable page split, not caching")
+        return result
+
+    fresh: Dict[int, str] = {}
+    page_status: List[Dict] = []
+    if missing:
+        parse_kwargs = dict(kwargs, output_format="markdown", with_pages=True)
+        parse_kwargs.pop("output_path", None)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            sub_path = tmp.name
+        try:
+            write_page_subset(file_path, missing, sub_path)
+            result = parser.parse(sub_path, ocr_method=ocr_method_id, **parse_kwargs)
+        finally:
+            if os.path.exists(sub_path):
+                os.unlink(sub_path)
+
+        if result == "Conversion cancelled.":
+            return result
+        new_pages = getattr(result, "pages", None)
+        if not new_pages or len(new_pages) != len(missing):
+            logger.info("Page cache: page split mismatch, falling back to full conversion")
+            return None
+        # Pages that failed or came from a fallback engine are shown but not cached
+        skip = set(_uncacheable(result))
+        fresh = dict(zip(missing, new_pages))
+        cache.put_many({keys[i]: content for n, (i, content) in enumerate(zip(missing, new_pages))
+                        if n not in skip})
+        # The sub-document's page numbers refer to its own pages, not the original's
+        page_status = [dict(status, page=missing[status["page"] - 1] + 1)
+                       for status in (getattr(result, "metadata", None) or {}).get("page_status", [])]
+
+    if check_cancellation and check_cancellation():
+        return "Conversion cancelled."
+
+    pages = [fresh[i] if i in fresh else cached[key] for i, key in enumerate(keys)]
+    metadata = {"page_cache": {"pages": len(pages), "hits": len(pages) - len(missing),
+                               "misses": len(missing)}}
+    if page_status:
+        metadata["page_status"] = page_status
+        metadata["failed_pages"] = [status["page"] for status in page_status if status["status"] == "failed"]
+    if output_format == "jsonl":
+        records = ({"page": i, "content": content} for i, content in enumerate(pages, start=1))
+        output_path = kwargs.get("output_path")
+        if output_path:
+            preview = write_chunks(iter_jsonl(records), output_path, check_cancellation)
+            if preview is None:
+                return "Conversion cancelled."
+            return ParseResult(preview, output_path=output_path, pages=pages, metadata=metadata)
+        return ParseResult("".join(iter_jsonl(records)), pages=pages, metadata=metadata)
+    return ParseResult("\n\n".join(pages), pages=pages, metadata=metadata)
@@ -0,0 +1,179 @@
+"""Convert documents in page units so one bad page does not sink the whole result."""
+
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import pypdfium2 as pdfium
+
+from src.core.metrics import metrics
+from src.core.page_cache import write_page_subset
+from src.core.progress import current_tracker
+from src.parsers.parser_interface import ParseResult
+
+logger = logging.getLogger(__name__)
+
+# Pages converted together before a failure is narrowed down to single pages
+PAGE_UNIT_SIZE = int(os.getenv("MARKIT_PAGE_UNIT_SIZE", "8"))
+# Extra attempts on a failing page with the primary engine before falling back
+PAGE_RETRIES = int(os.getenv("MARKIT_PAGE_RETRIES", "1"))
+
+CANCELLED = "Conversion cancelled."
+
+# An engine converts the given zero-based pages and returns one string per
+# page, or a single string for the whole unit if it cannot split by page
+Engine = Callable[[List[int]], Union[str, List[str]]]
+
+
+def failed_page_placeholder(page_no: int, error: str) -> str:
+    """Marker left in the output in place of a page that could not be converted."""
+    return f"<!-- Page {page_no} could not be converted: {error} -->"
+
+
+def page_count(file_path: Union[str, Path]) -> int:
+    """Number of pages in a PDF."""
+    pdf = pdfium.PdfDocument(str(file_path))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+@contextmanager
+def page_subset(file_path: Union[str, Path], indices: Sequence[int], page_count: int):
+    """Yield a PDF holding only ``indices``; the original file if that is every page."""
+    if list(indices) == list(range(page_count)):
+        yield str(file_path)
+        return
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        sub_path = tmp.name
+    try:
+        write_page_subset(file_path, list(indices), sub_path)
+        yield sub_path
+    finally:
+        if os.path.exists(sub_path):
+            os.unlink(sub_path)
+
+
+def _run(engine: Engine, indices: List[int]) -> List[str]:
+    """Run an engine and return one string per page, or a single string for the unit."""
+    output = engine(indices)
+    if output == CANCELLED:
+        raise _Cancelled()
+    if isinstance(output, str):
+        return [output]
+    if len(output) != len(indices):
+        raise ValueError(f"expected {len(indices)} pages, got {len(output)}")
+    return list(output)
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def convert_pages(page_indices: Sequence[int], engines: List[Tuple[str, Engine]],
+                  unit_size: int = PAGE_UNIT_SIZE, retries: int = PAGE_RETRIES,
+                  check_cancellation=None) -> str:
+    """
+    Convert pages unit by unit, isolating failures to the pages that cause them.
+
+    Each unit of ``unit_size`` pages goes to the first (primary) engine. If
+    it fails, its pages are converted one at a time: each page is retried
+    with the primary engine, then handed to the remaining engines in order;
+    a page that every engine fails on is replaced by a placeholder. Pages
+    that converted are never redone.
+
+    Args:
+        page_indices: Zero-based pages to convert
+        engines: (name, engine) pairs; the first is the primary engine
+        unit_size: Pages per unit
+        retries: Extra attempts with the primary engine for a failing page
+        check_cancellation: Optional callable returning True to abort
+
+    Returns:
+        ParseResult with the joined content, ``pages`` when every engine
+        returned per-page output, and ``metadata["page_status"]``: one dict
+        per page with page, status (ok, retried, fallback or failed),
+        engine and error. Returns "Conversion cancelled." if cancelled.
+    """
+    page_indices = sorted(page_indices)
+    primary_name, primary = engines[0]
+    pieces: List[str] = []
+    per_page = True
+    statuses: List[Dict[str, Any]] = []
+    tracker = current_tracker()
+
+    def settled() -> None:
+        if tracker is not None:
+            tracker.reach(len(statuses))
+
+    def convert_single(index: int) -> str:
+        error = None
+        for attempt in range(1 + retries):
+            try:
+                output = _run(primary, [index])
+                statuses.append({"page": index + 1, "status": "retried" if attempt else "ok",
+                                 "engine": primary_name})
+                return output[0]
+            except _Cancelled:
+                raise
+            except Exception as e:
+                error = e
+                logger.warning(f"Page {index + 1} failed with {primary_name} (attempt {attempt + 1}): {e}")
+        for name, engine in engines[1:]:
+            try:
+                output = _run(engine, [index])
+                statuses.append({"page": index + 1, "status": "fallback", "engine": name,
+                                 "error": str(error)})
+                metrics.inc("page_isolation.fallback_pages")
+                return output[0]
+            except _Cancelled:
+                raise
+            except Exception as e:
+                error = e
+                logger.warning(f"Page {index + 1} failed with fallback {name}: {e}")
+        statuses.append({"page": index + 1, "status": "failed", "engine": None, "error": str(error)})
+        metrics.inc("page_isolation.failed_pages")
+        return failed_page_placeholder(index + 1, str(error))
+
+    try:
+        for start in range(0, len(page_indices), max(1, unit_size)):
+            if check_cancellation and check_cancellation():
+                return CANCELLED
+            unit = page_indices[start:start + max(1, unit_size)]
+            try:
+                output = _run(primary, unit)
+            except _Cancelled:
+                raise
+            except Exception as e:
+                if len(unit) == 1:
+                    pieces.append(convert_single(unit[0]))
+                    settled()
+                    continue
+                logger.warning(f"Pages {unit[0] + 1}-{unit[-1] + 1} failed with {primary_name}: {e}; "
+                               f"converting them one by one")
+                metrics.inc("page_isolation.failed_units")
+                for index in unit:
+                    if check_cancellation and check_cancellation():
+                        return CANCELLED
+                    pieces.append(convert_single(index))
+                    settled()
+                continue
+            if len(output) != len(unit):
+                per_page = False
+            pieces.extend(output)
+            statuses.extend({"page": index + 1, "status": "ok", "engine": primary_name} for index in unit)
+            settled()
+    except _Cancelled:
+        return CANCELLED
+
+    statuses.sort(key=lambda status: status["page"])
+    failed = [status["page"] for status in statuses if status["status"] == "failed"]
+    if failed:
+        logger.warning(f"Returning partial output; pages {failed} could not be converted")
+    return ParseResult("\n\n".join(pieces), pages=pieces if per_page else None,
+                       metadata={"page_status": statuses, "failed_pages": failed})
+
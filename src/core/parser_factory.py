@@ -6,6 +6,12 @@ import time
 
 from src.parsers.parser_interface import DocumentParser
 from src.parsers.parser_registry import ParserRegistry
+from src.core.page_cache import get_page_cache, parse_with_page_cache
+from src.core.preflight import analyse_document
+from src.core.profiler import should_profile, profile_job, profile_archive_path
+from src.core.hedging import should_hedge, parse_hedged, FAST_ROUTE
+from src.core.progress import ProgressTracker, current_tracker, tracking
+from src.core.page_isolation import page_count
 
 
 class ParserFactory:
@@ -44,7 +50,15 @@ class ParserFactory:
             ocr_method_name: Display name of the OCR method to use
             output_format: Output format (markdown, json, text, document_tags)
             cancellation_flag: Optional flag to check for cancellation
-            **kwargs: Additional parser-specific options
+            **kwargs: Additional parser-specific options; pass
+                use_page_cache=False to bypass the page-level cache and
+                profile=True/False to force or skip profiling of this job;
+                hedge=True/False to force or skip hedged parsing (see
+                src.core.hedging), in which case the result may carry
+                metadata["upgrade"], a future of the thorough result;
+                progress=callback to receive progress events (pages done,
+                total pages, stage, pages/s and ETA; see src.core.progress),
+                or a ProgressTracker the caller keeps updating afterwards
             
         Returns:
             str: The parsed content
@@ -69,6 +83,10 @@ class ParserFactory:
         if not ocr_method_id:
             raise ValueError(f"Unknown OCR method: {ocr_method_name} for parser {parser_name}")
         
+        # Parsers without page selection convert the whole document
+        if not parser.supports_page_range():
+            kwargs.pop('page_range', None)
+        
         # Check for cancellation again before starting the parsing
         if check_cancellation():
             return "Conversion cancelled."
@@ -85,11 +103,94 @@ class ParserFactory:
         kwargs['should_check_cancellation'] = should_check_cancellation
         kwargs['output_format'] = output_format
         
-        # Parse the document
-        result = parser.parse(file_path, ocr_method=ocr_method_id, **kwargs)
+        # Report pages to the caller's tracker, or to one wrapping its callback
+        progress = kwargs.pop('progress', None)
+        owns_tracker = progress is not None and not isinstance(progress, ProgressTracker)
+        tracker = ProgressTracker(progress) if owns_tracker else (progress or current_tracker())
+        total_pages = None
+        if tracker is not None:
+            total_pages = cls._count_pages(file_path, kwargs.get('page_range'))
+            tracker.set_total(total_pages)
+            tracker.stage("converting")
+        
+        use_page_cache = kwargs.pop('use_page_cache', True)
+        hedge = should_hedge(parser_name, file_path, kwargs.pop('hedge', None))
+
+        def run(**options):
+            if hedge:
+                return cls._parse_hedged(parser, parser_name, file_path, ocr_method_id,
+                                         use_page_cache, **options)
+            return cls._parse(parser, parser_name, file_path, ocr_method_id, use_page_cache, **options)
+
+        if should_profile(kwargs.pop('profile', None)):
+            metadata = {
+                "parser": parser_name,
+                "ocr_method": ocr_method_id,
+                "output_format": output_format,
+                "file_name": Path(file_path).name,
+                "document": cls._describe_document(file_path),
+            }
+            with profile_job(profile_archive_path(kwargs.get('output_path')), metadata), tracking(tracker):
+                result = run(**kwargs)
+        else:
+            with tracking(tracker):
+                result = run(**kwargs)
         
         # Check one more time after parsing completes
         if check_cancellation():
             return "Conversion cancelled."
+        
+        # Parsers that cannot report pages as they go finish all at once
+        if tracker is not None and result != "Conversion cancelled.":
+            if total_pages is not None:
+                tracker.reach(total_pages)
+            if owns_tracker:
+                tracker.stage("done")
             
-        return result 
\ No newline at end of file
+        return result
+
+    @staticmethod
+    def _parse(parser: DocumentParser, parser_name: str, file_path: Union[str, Path],
+               ocr_method_id: str, use_page_cache: bool, **kwargs) -> str:
+        """Reuse cached pages where possible, otherwise parse the whole document."""
+        result = None
+        cache = get_page_cache() if use_page_cache else None
+        if cache is not None:
+            result = parse_with_page_cache(parser, parser_name, file_path, ocr_method_id, cache, **kwargs)
+        if result is None:
+            result = parser.parse(file_path, ocr_method=ocr_method_id, **kwargs)
+        return result
+
+    @classmethod
+    def _parse_hedged(cls, parser: DocumentParser, parser_name: str, file_path: Union[str, Path],
+                      ocr_method_id: str, use_page_cache: bool, **kwargs) -> str:
+        """Race the fast route against the requested parser; see parse_hedged()."""
+        def branch(branch_parser_name, branch_ocr_method_id, branch_file_path, **options):
+            branch_parser = parser if branch_parser_name == parser_name else cls.create_parser(branch_parser_name)
+            return cls._parse(branch_parser, branch_parser_name, branch_file_path, branch_ocr_method_id,
+                              use_page_cache, **options)
+
+        return parse_hedged(branch, file_path, thorough=(parser_name, ocr_method_id), fast=FAST_ROUTE,
+                            cancellation_flag=kwargs.pop('cancellation_flag', None), **kwargs)
+
+    @staticmethod
+    def _count_pages(file_path: Union[str, Path], page_range: Optional[str] = None) -> Optional[int]:
+        """Pages the conversion will process, or None if that is unknown."""
+        if Path(file_path).suffix.lower() != ".pdf":
+            return None
+        try:
+            total = page_count(file_path)
+            if page_range:
+                from src.parsers.gemini_payload import parse_page_range
+                return len(parse_page_range(page_range, total))
+            return total
+        except Exception:
+            return None
+
+    @staticmethod
+    def _describe_document(file_path: Union[str, Path]) -> Dict[str, Any]:
+        """Document characteristics recorded with a profile."""
+        try:
+            return analyse_document(file_path)
+        except Exception as e:
+            return {"error": str(e)}
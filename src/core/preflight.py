@@ -0,0 +1,229 @@
+"""Cheap pre-flight analysis of documents before conversion."""
+
+import logging
+import mimetypes
+import os
+import re
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tiff", ".tif", ".bmp", ".gif"}
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+HTML_MIME_TYPE = "text/html"
+MARKDOWN_MIME_TYPE = "text/markdown"
+
+# Formats Docling converts with its native backends, without any layout model
+NATIVE_MIME_TYPES = {DOCX_MIME_TYPE, PPTX_MIME_TYPE, XLSX_MIME_TYPE, HTML_MIME_TYPE, MARKDOWN_MIME_TYPE}
+
+# Canonical file extension for each detected MIME type
+MIME_EXTENSIONS = {
+    PDF_MIME_TYPE: ".pdf",
+    DOCX_MIME_TYPE: ".docx",
+    PPTX_MIME_TYPE: ".pptx",
+    XLSX_MIME_TYPE: ".xlsx",
+    HTML_MIME_TYPE: ".html",
+    MARKDOWN_MIME_TYPE: ".md",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/tiff": ".tiff",
+    "image/bmp": ".bmp",
+    "image/gif": ".gif",
+}
+
+_MAGIC_NUMBERS = [
+    (b"%PDF-", PDF_MIME_TYPE),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+    (b"GIF8", "image/gif"),
+]
+
+# Top-level folder inside an Office Open XML package -> MIME type
+_OOXML_FOLDERS = {"word/": DOCX_MIME_TYPE, "ppt/": PPTX_MIME_TYPE, "xl/": XLSX_MIME_TYPE}
+
+# Maximum number of pages inspected; larger documents are sampled evenly
+MAX_SAMPLED_PAGES = 12
+
+# A page with fewer text-layer characters than this is treated as scanned
+MIN_TEXT_CHARS_PER_PAGE = 50
+
+# Number of vector path objects on a page at which ruled tables are assumed
+TABLE_PATH_OBJECTS = 40
+
+_NUMERIC_TOKEN = re.compile(r"\d")
+
+# Rough seconds per page for each parser/OCR combination on a CPU box,
+# used for routing and ETA estimates until real timings are available
+PAGE_COST_ESTIMATES = {
+    ("Fast Text", "no_ocr"): 0.005,
+    ("PyPdfium", "no_ocr"): 0.05,
+    ("PyPdfium", "easyocr"): 1.5,
+    ("Docling", "no_ocr"): 0.6,
+    ("Docling", "easyocr"): 2.0,
+    ("Docling", "easyocr_cpu"): 2.0,
+    ("Docling", "tesseract"): 1.2,
+    ("Docling", "tesseract_cli"): 1.4,
+    ("Docling", "full_force_ocr"): 2.5,
+    ("Marker", "no_ocr"): 1.0,
+    ("Marker", "force_ocr"): 3.0,
+    ("Gemini Flash", "none"): 0.8,
+}
+DEFAULT_PAGE_COST = 1.0
+
+
+def estimate_page_cost(parser_name: str, ocr_method_id: str) -> float:
+    """Return the estimated seconds per page for a parser/OCR combination."""
+    return PAGE_COST_ESTIMATES.get((parser_name, ocr_method_id), DEFAULT_PAGE_COST)
+
+
+def detect_mime_type(file_path: Union[str, Path]) -> Optional[str]:
+    """
+    Detect a document's MIME type from its content, falling back to its extension.
+
+    Args:
+        file_path: Path to the document
+
+    Returns:
+        The MIME type, or None if it cannot be determined
+    """
+    path = Path(file_path)
+    try:
+        with open(path, "rb") as f:
+            head = f.read(2048)
+    except OSError:
+        return None
+
+    for magic, mime_type in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime_type
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as package:
+                for name in package.namelist():
+                    for folder, mime_type in _OOXML_FOLDERS.items():
+                        if name.startswith(folder):
+                            return mime_type
+        except zipfile.BadZipFile:
+            pass
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith((b"<!doctype html", b"<html")):
+        return HTML_MIME_TYPE
+    if path.suffix.lower() in (".md", ".markdown"):
+        return MARKDOWN_MIME_TYPE
+    return mimetypes.guess_type(path.name)[0]
+
+
+def analyse_document(file_path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Inspect a document without running any models.
+
+    Args:
+        file_path: Path to the document
+
+    Returns:
+        dict with keys:
+            - file_type: Lower-case file extension
+            - file_size: Size in bytes
+            - page_count: Number of pages (1 for non-PDF files)
+            - text_coverage: Fraction of sampled pages with a usable text layer
+            - image_ratio: Average fraction of page area covered by images
+            - table_likelihood: 0-1 score from numeric rows and ruling lines
+            - text_chars_per_page: Average text-layer characters per sampled page
+    """
+    path = Path(file_path)
+    file_type = path.suffix.lower()
+    profile = {
+        "file_type": file_type,
+        "file_size": os.path.getsize(path),
+        "page_count": 1,
+        "text_coverage": 0.0,
+        "image_ratio": 1.0 if file_type in IMAGE_EXTENSIONS else 0.0,
+        "table_likelihood": 0.0,
+        "text_chars_per_page": 0.0,
+    }
+    if file_type != ".pdf" or not PDFIUM_AVAILABLE:
+        return profile
+
+    try:
+        pdf = pdfium.PdfDocument(str(path))
+    except Exception as e:
+        logger.warning(f"Pre-flight could not open {path.name}: {e}")
+        return profile
+
+    try:
+        page_count = len(pdf)
+        profile["page_count"] = page_count
+        if page_count == 0:
+            return profile
+
+        step = max(1, page_count // MAX_SAMPLED_PAGES)
+        sampled = list(range(0, page_count, step))[:MAX_SAMPLED_PAGES]
+
+        text_pages = 0
+        total_chars = 0
+        image_area = 0.0
+        table_score = 0.0
+        for index in sampled:
+            page = pdf[index]
+            try:
+                text_page = page.get_textpage()
+                text = text_page.get_text_bounded()
+                text_page.close()
+                chars = len(text.strip())
+                total_chars += chars
+                if chars >= MIN_TEXT_CHARS_PER_PAGE:
+                    text_pages += 1
+                image_area += _image_area_ratio(page)
+                table_score += _table_score(page, text)
+            finally:
+                page.close()
+
+        profile["text_coverage"] = text_pages / len(sampled)
+        profile["text_chars_per_page"] = total_chars / len(sampled)
+        profile["image_ratio"] = image_area / len(sampled)
+        profile["table_likelihood"] = table_score / len(sampled)
+    finally:
+        pdf.close()
+    return profile
+
+
+def _image_area_ratio(page) -> float:
+    """Fraction of a page's area covered by image objects (capped at 1)."""
+    width, height = page.get_size()
+    page_area = width * height
+    if page_area <= 0:
+        return 0.0
+    covered = 0.0
+    for obj in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE,), max_depth=2):
+        left, bottom, right, top = obj.get_pos()
+        covered += max(0.0, right - left) * max(0.0, top - bottom)
+    return min(1.0, covered / page_area)
+
+
+def _table_score(page, text: str) -> float:
+    """Score how table-like a page is from numeric rows and ruling lines."""
+    lines = [line.split() for line in text.splitlines()]
+    rows = [tokens for tokens in lines if len(tokens) >= 3]
+    numeric_rows = sum(
+        1 for tokens in rows
+        if sum(1 for token in tokens if _NUMERIC_TOKEN.search(token)) * 2 >= len(tokens)
+    )
+    numeric_ratio = numeric_rows / len(rows) if rows else 0.0
+    paths = sum(1 for _ in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_PATH,), max_depth=2))
+    return max(numeric_ratio, min(1.0, paths / TABLE_PATH_OBJECTS))
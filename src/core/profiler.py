@@ -0,0 +1,183 @@
+"""Opt-in per-job profiling: sampled CPU stacks and an allocation snapshot."""
+
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from src.core.metrics import metrics
+from src.core.output_store import get_output_store
+
+logger = logging.getLogger(__name__)
+
+# Profile every conversion
+PROFILE_ALL = os.getenv("MARKIT_PROFILE", "0") == "1"
+# Fraction of conversions to profile when not profiling everything
+PROFILE_SAMPLE_RATE = float(os.getenv("MARKIT_PROFILE_SAMPLE_RATE", "0"))
+# Milliseconds between stack samples
+PROFILE_INTERVAL_MS = float(os.getenv("MARKIT_PROFILE_INTERVAL_MS", "10"))
+# Allocation sites listed in the snapshot
+ALLOCATION_TOP_N = 50
+# Profiles remembered for the Admin tab
+RECENT_PROFILES = 20
+
+_ui_enabled = threading.Event()
+_recent: "deque[str]" = deque(maxlen=RECENT_PROFILES)
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def set_profiling_enabled(enabled: bool) -> None:
+    """Turn profiling of every conversion on or off at runtime (Admin tab)."""
+    if enabled:
+        _ui_enabled.set()
+    else:
+        _ui_enabled.clear()
+
+
+def profiling_enabled() -> bool:
+    return PROFILE_ALL or _ui_enabled.is_set()
+
+
+def should_profile(requested: Optional[bool] = None) -> bool:
+    """Decide whether to profile a job; an explicit request wins over the global settings."""
+    if requested is not None:
+        return requested
+    return profiling_enabled() or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+def recent_profiles() -> List[str]:
+    """Paths of the most recent profile archives that still exist, newest first."""
+    return [path for path in reversed(_recent) if os.path.exists(path)]
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="markit-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc() -> Optional[tracemalloc.Snapshot]:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+    return snapshot
+
+
+def _format_allocations(snapshot: Optional[tracemalloc.Snapshot], peak: int) -> str:
+    if snapshot is None:
+        return "tracemalloc was not running\n"
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ])
+    lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB", "", "Live allocations at the end of the job:"]
+    for stat in snapshot.statistics("lineno")[:ALLOCATION_TOP_N]:
+        lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {stat.traceback[0]}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profile_job(archive_path: str, metadata: Dict[str, Any]):
+    """
+    Profile the calling thread for the duration of the block.
+
+    Writes a zip archive with ``stacks.folded`` (sampled CPU stacks),
+    ``allocations.txt`` (top allocation sites) and ``metadata.json``.
+    Allocation tracing is process-wide, so jobs profiled at the same time
+    appear in each other's snapshots.
+
+    Args:
+        archive_path: Where to write the profile archive
+        metadata: Job details to store alongside the profile
+    """
+    sampler = StackSampler(threading.get_ident())
+    _start_tracemalloc()
+    tracemalloc.reset_peak()
+    started = time.time()
+    sampler.start()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        sampler.stop()
+        elapsed = time.time() - started
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        snapshot = _stop_tracemalloc()
+        metadata = dict(metadata, started_at=started, duration_seconds=round(elapsed, 3),
+                        samples=sampler.samples, sample_interval_ms=PROFILE_INTERVAL_MS,
+                        peak_traced_bytes=peak, error=error)
+        try:
+            with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("stacks.folded", sampler.folded())
+                archive.writestr("allocations.txt", _format_allocations(snapshot, peak))
+                archive.writestr("metadata.json", json.dumps(metadata, indent=2, default=str))
+            _recent.append(archive_path)
+            store = get_output_store()
+            if os.path.dirname(os.path.abspath(archive_path)) == os.path.abspath(store.directory):
+                store.register(archive_path)
+            metrics.inc("profiler.jobs_profiled")
+            logger.info(f"Profile written to {archive_path} ({sampler.samples} samples, {elapsed:.2f}s)")
+        except Exception as e:
+            logger.error(f"Could not write profile {archive_path}: {e}")
+
+
+def profile_archive_path(output_path: Optional[Union[str, Path]]) -> str:
+    """Place the archive next to the job's output file, or in the output store."""
+    if output_path:
+        return f"{os.path.splitext(str(output_path))[0]}.profile.zip"
+    return get_output_store().create_path(suffix=".profile.zip")
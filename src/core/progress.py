@@ -0,0 +1,184 @@
+"""Per-conversion progress events: pages done, current stage, throughput and ETA."""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds of history used for the moving-average page rate
+PROGRESS_WINDOW_SECONDS = float(os.getenv("MARKIT_PROGRESS_WINDOW_SECONDS", "30"))
+
+# A progress event: stage, pages_done, total_pages, pages_per_second, eta_seconds, elapsed
+ProgressEvent = Dict[str, Any]
+
+
+class ProgressTracker:
+    """
+    Tracks one conversion's progress and passes every change to a callback.
+
+    The page rate is a moving average over the last PROGRESS_WINDOW_SECONDS,
+    so the ETA follows the current speed rather than the start-up cost of
+    loading models. Thread-safe; callback errors are logged and ignored.
+    """
+
+    def __init__(self, callback: Optional[Callable[[ProgressEvent], None]] = None,
+                 total_pages: Optional[int] = None, window_seconds: float = PROGRESS_WINDOW_SECONDS):
+        self.callback = callback
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._stage = "starting"
+        self._pages_done = 0
+        self._total_pages = total_pages
+        self._samples = deque([(self._started, 0)])
+
+    def set_total(self, total_pages: Optional[int]) -> None:
+        """Set the number of pages the conversion will process."""
+        with self._lock:
+            self._total_pages = total_pages
+        self._emit()
+
+    def stage(self, name: str) -> None:
+        """Move to a new stage, e.g. "converting" or "saving"."""
+        with self._lock:
+            self._stage = name
+        self._emit()
+
+    def advance(self, pages: int = 1) -> None:
+        """Record that ``pages`` more pages are done."""
+        self._set_done(lambda done: done + pages)
+
+    def reach(self, pages_done: int) -> None:
+        """Record that at least ``pages_done`` pages are done."""
+        self._set_done(lambda done: max(done, pages_done))
+
+    def _set_done(self, update: Callable[[int], int]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            done = update(self._pages_done)
+            if self._total_pages is not None:
+                done = min(done, self._total_pages)
+            if done == self._pages_done:
+                return
+            self._pages_done = done
+            self._samples.append((now, done))
+            while len(self._samples) > 2 and self._samples[1][0] < now - self.window_seconds:
+                self._samples.popleft()
+        self._emit()
+
+    def event(self) -> ProgressEvent:
+        """The current progress as a plain dict."""
+        now = time.monotonic()
+        with self._lock:
+            first_time, first_done = self._samples[0]
+            last_time, last_done = self._samples[-1]
+            rate = None
+            if last_done > first_done and last_time > first_time:
+                rate = (last_done - first_done) / (last_time - first_time)
+            eta = None
+            if rate and self._total_pages is not None:
+                # Count the time since the last page against the remaining pages
+                eta = max(0.0, (self._total_pages - self._pages_done) / rate - (now - last_time))
+            return {
+                "stage": self._stage,
+                "pages_done": self._pages_done,
+                "total_pages": self._total_pages,
+                "pages_per_second": round(rate, 3) if rate else None,
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+                "elapsed": round(now - self._started, 1),
+            }
+
+    def _emit(self) -> None:
+        if self.callback is None:
+            return
+        try:
+            self.callback(self.event())
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
+
+
+def describe(event: Optional[ProgressEvent]) -> str:
+    """One-line summary of a progress event, e.g. "Converting: 12/40 pages, ~20s left"."""
+    if not event:
+        return "Starting"
+    text = event["stage"].capitalize()
+    if event.get("total_pages"):
+        text += f": {event['pages_done']}/{event['total_pages']} pages"
+    if event.get("pages_per_second"):
+        text += f", {event['pages_per_second']:.1f} pages/s"
+    if event.get("eta_seconds") is not None:
+        text += f", ~{event['eta_seconds']:.0f}s left"
+    return text
+
+
+_current = threading.local()
+
+
+@contextmanager
+def tracking(tracker: Optional[ProgressTracker]):
+    """Make ``tracker`` receive the page reports made on this thread."""
+    previous = getattr(_current, "tracker", None)
+    _current.tracker = tracker
+    try:
+        yield tracker
+    finally:
+        _current.tracker = previous
+
+
+def current_tracker() -> Optional[ProgressTracker]:
+    """The tracker set with tracking() on this thread, if any."""
+    return getattr(_current, "tracker", None)
+
+
+def report_pages(pages: int = 1) -> None:
+    """Report finished pages to this thread's tracker, if there is one."""
+    tracker = current_tracker()
+    if tracker is not None:
+        tracker.advance(pages)
+
+
+def report_stage(name: str) -> None:
+    """Report a new stage to this thread's tracker, if there is one."""
+    tracker = current_tracker()
+    if tracker is not None:
+        tracker.stage(name)
+
+
+_docling_hook_installed = False
+_docling_hook_lock = threading.Lock()
+
+
+def install_docling_page_hook() -> bool:
+    """
+    Count pages as Docling's layout model processes them.
+
+    Docling runs the layout model once per page on the converting thread,
+    so wrapping LayoutPredictor.predict gives per-page progress without
+    changing the pipeline.
+
+    Returns:
+        bool: True if the hook is installed
+    """
+    global _docling_hook_installed
+    with _docling_hook_lock:
+        if _docling_hook_installed:
+            return True
+        try:
+            from docling_ibm_models.layoutmodel.layout_predictor import LayoutPredictor
+        except ImportError:
+            return False
+        predict = LayoutPredictor.predict
+
+        def predict_and_report(self, orig_img):
+            predictions = list(predict(self, orig_img))
+            report_pages(1)
+            return predictions
+
+        LayoutPredictor.predict = predict_and_report
+        _docling_hook_installed = True
+    return True
@@ -0,0 +1,434 @@
+"""Page-count-aware job scheduling with admission control and ETAs."""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+from src.core.preflight import analyse_document, estimate_page_cost
+
+logger = logging.getLogger(__name__)
+
+# "sjf" (shortest job first) or "wfq" (weighted fair queuing across users)
+SCHEDULER_POLICY = os.getenv("MARKIT_SCHEDULER_POLICY", "sjf").lower()
+# Estimated seconds of cost forgiven per second a job has waited under "sjf", so large
+# jobs cannot be starved by a steady stream of small ones; 0 for plain shortest job first
+SJF_AGING = float(os.getenv("MARKIT_SJF_AGING", "1.0"))
+# Estimated seconds of queued + running work above which new jobs are refused
+MAX_BACKLOG_SECONDS = float(os.getenv("MARKIT_MAX_BACKLOG_SECONDS", "1800"))
+# "reject" refuses jobs over the backlog limit; "defer" queues them behind all admitted work
+ADMISSION_MODE = os.getenv("MARKIT_ADMISSION_MODE", "reject").lower()
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".markit", "throughput.json")
+THROUGHPUT_HISTORY_PATH = os.getenv("MARKIT_THROUGHPUT_HISTORY_PATH", DEFAULT_HISTORY_PATH)
+
+# Weight given to the newest observation in the seconds-per-page average
+HISTORY_SMOOTHING = 0.3
+
+# Scanned pages cost this much more than text pages when OCR is enabled
+SCANNED_PAGE_FACTOR = 1.5
+
+NO_OCR_METHODS = {"no_ocr", "none"}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a job would push the estimated backlog over the limit."""
+
+    def __init__(self, backlog_seconds: float, limit_seconds: float):
+        self.backlog_seconds = backlog_seconds
+        self.limit_seconds = limit_seconds
+        super().__init__(
+            f"Server is busy: about {backlog_seconds:.0f}s of work is queued "
+            f"(limit {limit_seconds:.0f}s). Please try again later."
+        )
+
+
+class ThroughputHistory:
+    """
+    Observed seconds per page for each parser/OCR combination.
+
+    Called from the event loop, record() only updates the averages in
+    memory; the file is written on an executor thread, and records that
+    arrive while a write is pending go out with it.
+    """
+
+    def __init__(self, path: Optional[str] = THROUGHPUT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_pending = False
+        self._seconds_per_page: Dict[str, float] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._seconds_per_page = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not load throughput history from {path}: {e}")
+
+    @staticmethod
+    def _key(parser_name: str, ocr_method_id: str) -> str:
+        return f"{parser_name}/{ocr_method_id}"
+
+    def seconds_per_page(self, parser_name: str, ocr_method_id: str) -> float:
+        """Return the observed seconds per page, or the built-in estimate."""
+        with self._lock:
+            observed = self._seconds_per_page.get(self._key(parser_name, ocr_method_id))
+        return observed if observed is not None else estimate_page_cost(parser_name, ocr_method_id)
+
+    def record(self, parser_name: str, ocr_method_id: str, pages: int, seconds: float) -> None:
+        """Fold a finished job into the moving average and schedule a save."""
+        if pages <= 0 or seconds <= 0:
+            return
+        key = self._key(parser_name, ocr_method_id)
+        observed = seconds / pages
+        with self._lock:
+            previous = self._seconds_per_page.get(key)
+            self._seconds_per_page[key] = (
+                observed if previous is None
+                else HISTORY_SMOOTHING * observed + (1 - HISTORY_SMOOTHING) * previous
+            )
+            if not self.path or self._save_pending:
+                return
+            self._save_pending = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        loop.run_in_executor(None, self.save)
+
+    def save(self) -> None:
+        """Write the current averages to disk."""
+        with self._lock:
+            self._save_pending = False
+            snapshot = dict(self._seconds_per_page)
+        if not self.path:
+            return
+        with self._save_lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning(f"Could not save throughput history: {e}")
+
+
+def estimate_job_cost(file_path: Union[str, Path], parser_name: str, ocr_method_id: str,
+                      history: Optional["ThroughputHistory"] = None,
+                      page_range: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Estimate how long a conversion will take from cheap document metadata.
+
+    Args:
+        page_range: Optional 1-based page selection; only the selected pages are counted
+
+    Returns:
+        dict with keys: pages, file_size, scanned_ratio, seconds
+    """
+    history = history or get_throughput_history()
+    profile = analyse_document(file_path)
+    pages = profile["page_count"]
+    if page_range and profile["file_type"] == ".pdf":
+        from src.parsers.gemini_payload import parse_page_range
+        pages = len(parse_page_range(page_range, pages))
+    scanned_ratio = 1.0 - profile["text_coverage"] if profile["file_type"] == ".pdf" else 0.0
+    seconds = pages * history.seconds_per_page(parser_name, ocr_method_id)
+    if ocr_method_id not in NO_OCR_METHODS:
+        seconds *= 1 + scanned_ratio * (SCANNED_PAGE_FACTOR - 1)
+    return {
+        "pages": pages,
+        "file_size": profile["file_size"],
+        "scanned_ratio": scanned_ratio,
+        "seconds": seconds,
+    }
+
+
+class ScheduledJob:
+    """
+    A conversion waiting for, or holding, a scheduler slot.
+
+    Awaiting it waits for a slot, runs the job and returns its result.
+    """
+
+    def __init__(self, scheduler: "JobScheduler", runner: Callable, estimate: Dict[str, Any],
+                 user: str, parser_name: str, ocr_method_id: str, speculative: bool = False):
+        self.scheduler = scheduler
+        self.runner = runner
+        self.estimate = estimate
+        self.user = user
+        self.parser_name = parser_name
+        self.ocr_method_id = ocr_method_id
+        self.speculative = speculative
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.job = None  # ConversionJob once started
+        self.sort_key = None
+        self._started = asyncio.get_running_loop().create_future()
+
+    @property
+    def started(self) -> bool:
+        return self.job is not None
+
+    def eta(self) -> float:
+        """Estimated seconds until this job finishes."""
+        return self.scheduler.eta(self)
+
+    def position(self) -> int:
+        """1-based queue position, or 0 once running."""
+        return self.scheduler.position(self)
+
+    def progress(self) -> Optional[Dict[str, Any]]:
+        """Latest progress event of the running conversion, or None."""
+        return self.job.progress() if self.job is not None else None
+
+    def promote(self) -> None:
+        """Turn a speculative job into a normal one; see JobScheduler.promote()."""
+        self.scheduler.promote(self)
+
+    async def wait_started(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the job gets a slot; returns False on timeout."""
+        try:
+            await asyncio.wait_for(asyncio.shield(self._started), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait(self):
+        await self._started
+        if self.job is None:
+            return "Conversion cancelled.", None
+        return await self.job
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    async def cancel(self):
+        """Remove the job from the queue, or cancel it if already running."""
+        if self.job is not None:
+            await self.job.cancel()
+        else:
+            self.scheduler.remove(self)
+            if not self._started.done():
+                self._started.set_result(None)
+
+    def _start(self) -> None:
+        self.started_at = time.time()
+        self.job = self.runner()
+        self.job.add_done_callback(self._finished)
+        self._started.set_result(None)
+
+    def _finished(self, future) -> None:
+        elapsed = time.time() - self.started_at
+        succeeded = (not future.cancelled() and future.exception() is None
+                     and not self.job.cancelled() and future.result()[1] is not None)
+        upgrade = _pending_upgrade(future.result()[0]) if succeeded else None
+        if upgrade is None:
+            self.scheduler.release(self, elapsed if succeeded else None)
+            return
+        # A hedged job's thorough branch is still converting; keep the slot until it settles
+        loop = asyncio.get_running_loop()
+
+        def upgraded(result):
+            upgraded_elapsed = time.time() - self.started_at if result.result() is not None else None
+            try:
+                loop.call_soon_threadsafe(self.scheduler.release, self, upgraded_elapsed)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        upgrade.add_done_callback(upgraded)
+
+
+def _pending_upgrade(content):
+    """The unsettled upgrade future of a hedged fast result, or None."""
+    metadata = getattr(content, "metadata", None)
+    upgrade = metadata.get("upgrade") if isinstance(metadata, dict) else None
+    return upgrade if upgrade is not None and not upgrade.done() else None
+
+
+class JobScheduler:
+    """
+    Orders conversions by estimated cost and limits how much work is accepted.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, slots: int, policy: str = SCHEDULER_POLICY,
+                 max_backlog_seconds: float = MAX_BACKLOG_SECONDS,
+                 admission_mode: str = ADMISSION_MODE,
+                 history: Optional[ThroughputHistory] = None, aging: float = SJF_AGING):
+        self.slots = max(1, slots)
+        self.policy = policy
+        self.aging = aging
+        self.max_backlog_seconds = max_backlog_seconds
+        self.admission_mode = admission_mode
+        self.history = history or get_throughput_history()
+        self._queue = []
+        self._running = set()
+        self._counter = itertools.count()
+        self._virtual_time = 0.0
+        self._user_finish: Dict[str, float] = {}
+        self._epoch = time.time()
+
+    def backlog_seconds(self) -> float:
+        """Estimated seconds of work queued plus the remainder of running work (speculative jobs excluded)."""
+        now = time.time()
+        running = sum(max(0.0, job.estimate["seconds"] - (now - job.started_at))
+                      for job in self._running if not job.speculative)
+        queued = sum(job.estimate["seconds"] for _, _, job in self._queue if not job.speculative)
+        return running + queued
+
+    def is_idle(self) -> bool:
+        """True if a slot is free and nothing is waiting for one."""
+        return not self._queue and len(self._running) < self.slots
+
+    def submit(self, runner: Callable, estimate: Dict[str, Any], user: str = "anonymous",
+               parser_name: str = "", ocr_method_id: str = "", speculative: bool = False) -> ScheduledJob:
+        """
+        Queue a job.
+
+        Speculative jobs are queued behind all other work, are not counted
+        against the backlog limit and are cancelled when a normal job needs
+        their slot.
+
+        Args:
+            runner: Callable that starts the job and returns a ConversionJob
+            estimate: Cost estimate from estimate_job_cost()
+            user: Identifier used for fair queuing
+            parser_name: Parser name, for throughput history
+            ocr_method_id: OCR method ID, for throughput history
+            speculative: Run the job only with otherwise idle capacity
+
+        Raises:
+            AdmissionRejected: If the backlog limit would be exceeded in reject mode
+        """
+        if speculative:
+            job = ScheduledJob(self, runner, estimate, user, parser_name, ocr_method_id, speculative=True)
+            job.sort_key = (2, estimate["seconds"])
+            heapq.heappush(self._queue, (job.sort_key, next(self._counter), job))
+            logger.info(f"Queued speculative job for {user}: {estimate['pages']} pages")
+            self._dispatch()
+            return job
+
+        backlog = self.backlog_seconds()
+        over_limit = backlog + estimate["seconds"] > self.max_backlog_seconds and (self._queue or self._running)
+        if over_limit and self.admission_mode != "defer":
+            raise AdmissionRejected(backlog, self.max_backlog_seconds)
+
+        job = ScheduledJob(self, runner, estimate, user, parser_name, ocr_method_id)
+        # Deferred jobs go behind everything that was admitted normally
+        job.sort_key = (1 if over_limit else 0, self._rank(job))
+        heapq.heappush(self._queue, (job.sort_key, next(self._counter), job))
+        logger.info(
+            f"Queued job for {user}: {estimate['pages']} pages, ~{estimate['seconds']:.1f}s "
+            f"({'deferred' if over_limit else 'admitted'}, backlog ~{backlog:.0f}s)"
+        )
+        self._preempt_speculative()
+        self._dispatch()
+        return job
+
+    def promote(self, job: ScheduledJob) -> None:
+        """Give a speculative job normal priority, e.g. once a user asks for its result."""
+        if not job.speculative:
+            return
+        job.speculative = False
+        if not job.started:
+            self.remove(job)
+            job.sort_key = (0, self._rank(job))
+            heapq.heappush(self._queue, (job.sort_key, next(self._counter), job))
+            self._preempt_speculative()
+            self._dispatch()
+
+    def _rank(self, job: ScheduledJob) -> float:
+        cost = job.estimate["seconds"]
+        if self.policy == "wfq":
+            start = max(self._virtual_time, self._user_finish.get(job.user, 0.0))
+            finish = start + cost
+            self._user_finish[job.user] = finish
+            return finish
+        # Ranking by cost minus aging * time waited orders jobs the same as this
+        # fixed key, so a job queued long enough overtakes smaller newcomers
+        return cost + self.aging * (job.submitted_at - self._epoch)
+
+    def _preempt_speculative(self) -> None:
+        """Cancel running speculative jobs that hold slots normal jobs are waiting for."""
+        waiting = sum(1 for _, _, job in self._queue if not job.speculative)
+        speculative = [job for job in self._running if job.speculative and job.job is not None]
+        # Slots that are free now or will be once already-cancelled jobs stop
+        free = self.slots - len(self._running) + sum(1 for job in speculative if job.job.cancelled())
+        for job in speculative:
+            if waiting <= free:
+                break
+            if not job.job.cancelled():
+                logger.info("Cancelling a speculative job to free its slot")
+                asyncio.ensure_future(job.job.cancel())
+                free += 1
+
+    def remove(self, job: ScheduledJob) -> None:
+        """Drop a queued job."""
+        self._queue = [entry for entry in self._queue if entry[2] is not job]
+        heapq.heapify(self._queue)
+
+    def release(self, job: ScheduledJob, elapsed: Optional[float] = None) -> None:
+        """Free a slot; record throughput for jobs that completed successfully."""
+        self._running.discard(job)
+        if elapsed is not None:
+            self.history.record(job.parser_name, job.ocr_method_id, job.estimate["pages"], elapsed)
+        self._dispatch()
+
+    def position(self, job: ScheduledJob) -> int:
+        if job.started:
+            return 0
+        ordered = sorted(self._queue)
+        for index, (_, _, queued) in enumerate(ordered):
+            if queued is job:
+                return index + 1
+        return 0
+
+    def eta(self, job: ScheduledJob) -> float:
+        """Estimated seconds until the job finishes, assuming work spreads across slots."""
+        now = time.time()
+        if job.started:
+            return max(0.0, job.estimate["seconds"] - (now - job.started_at))
+        running = sum(max(0.0, other.estimate["seconds"] - (now - other.started_at))
+                      for other in self._running if not other.speculative)
+        ahead = 0.0
+        for _, _, queued in sorted(self._queue):
+            if queued is job:
+                break
+            ahead += queued.estimate["seconds"]
+        return (running + ahead) / self.slots + job.estimate["seconds"]
+
+    def _dispatch(self) -> None:
+        while self._queue and len(self._running) < self.slots:
+            _, _, job = heapq.heappop(self._queue)
+            if self.policy == "wfq":
+                self._virtual_time = max(self._virtual_time, job.sort_key[1] - job.estimate["seconds"])
+            self._running.add(job)
+            try:
+                job._start()
+            except Exception as e:
+                logger.error(f"Could not start job: {e}")
+                self._running.discard(job)
+                if not job._started.done():
+                    job._started.set_exception(e)
+
+
+_history: Optional[ThroughputHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_throughput_history() -> ThroughputHistory:
+    """Return the shared throughput history."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = ThroughputHistory()
+    return _history
@@ -0,0 +1,102 @@
+"""Fast, incremental serialisers for converted documents."""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# orjson is optional; it is several times faster than the json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Size of the write buffer used when streaming to disk
+WRITE_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+# Number of chunks written between cancellation checks
+CANCELLATION_CHECK_INTERVAL = 1000
+
+# Maximum number of characters of a streamed output kept for display
+PREVIEW_CHARS = 200000
+
+# Nesting levels of dicts and lists split into separate chunks by iter_json_chunks();
+# a Docling document is a dict of lists (texts, tables, pages, ...) of items
+CHUNK_DEPTH = 2
+
+_compact_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_compact(obj: Any) -> str:
+    """Serialise an object to a single-line JSON string."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode("utf-8")
+    return _compact_encoder.encode(obj)
+
+
+def iter_json_chunks(obj: Any) -> Iterator[str]:
+    """Yield compact JSON text for an object in small chunks."""
+    if ORJSON_AVAILABLE:
+        yield from _iter_orjson(obj, CHUNK_DEPTH)
+        return
+    yield from _compact_encoder.iterencode(obj)
+
+
+def _iter_orjson(obj: Any, depth: int) -> Iterator[str]:
+    """Encode the outer ``depth`` levels of containers piecewise and each item inside them with orjson."""
+    if depth > 0 and isinstance(obj, dict) and obj:
+        yield "{"
+        for index, (key, value) in enumerate(obj.items()):
+            if not isinstance(key, str):
+                key = _compact_encoder.encode(key).strip('"')
+            yield ("," if index else "") + orjson.dumps(key).decode("utf-8") + ":"
+            yield from _iter_orjson(value, depth - 1)
+        yield "}"
+    elif depth > 0 and isinstance(obj, (list, tuple)) and obj:
+        yield "["
+        for index, value in enumerate(obj):
+            if index:
+                yield ","
+            yield from _iter_orjson(value, depth - 1)
+        yield "]"
+    else:
+        yield orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+def write_chunks(chunks: Iterable[str], output_path: str,
+                 check_cancellation=None) -> Optional[str]:
+    """
+    Write text chunks to a file through a large buffer.
+
+    Args:
+        chunks: Iterable of text chunks
+        output_path: Destination file path
+        check_cancellation: Optional callable returning True to abort
+
+    Returns:
+        The first ``PREVIEW_CHARS`` characters written (with a truncation
+        note if the output was longer), or None if cancelled
+    """
+    preview = []
+    preview_len = 0
+    total_len = 0
+    with open(output_path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as out:
+        for index, chunk in enumerate(chunks):
+            if (check_cancellation and index % CANCELLATION_CHECK_INTERVAL == 0
+                    and check_cancellation()):
+                logging.info("Cancellation detected during streaming serialisation")
+                return None
+            out.write(chunk)
+            total_len += len(chunk)
+            if preview_len < PREVIEW_CHARS:
+                preview.append(chunk[:PREVIEW_CHARS - preview_len])
+                preview_len += len(preview[-1])
+    if total_len > preview_len:
+        preview.append(f"\n\n... (output truncated, {total_len:,} characters in download file)")
+    return "".join(preview)
+
+
+def iter_jsonl(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Yield one compact JSON line per record."""
+    for record in records:
+        yield dumps_compact(record) + "\n"
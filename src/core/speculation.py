@@ -0,0 +1,65 @@
+"""Speculative conversion of uploads before the user clicks Convert."""
+
+import logging
+import os
+from typing import Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Start converting uploads with the selected settings before Convert is clicked
+SPECULATIVE_CONVERSION = os.getenv("MARKIT_SPECULATIVE_CONVERSION", "0") == "1"
+# Seconds a finished speculative result waits for the matching Convert click
+SPECULATION_RETAIN_SECONDS = float(os.getenv("MARKIT_SPECULATION_RETAIN_SECONDS", "300"))
+
+
+class SpeculationRegistry:
+    """
+    At most one speculative conversion per session.
+
+    A speculative conversion runs through submit_conversion() like any
+    other, so a Convert click with the same file and settings attaches to
+    it (or picks up its finished result) instead of starting over. When
+    the file or settings change, the old one is detached; it is cancelled
+    unless a real request has already attached to it.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[Hashable, Tuple[tuple, object]] = {}
+
+    async def update(self, session: Hashable, file_path: Optional[str], parser_name: str,
+                     ocr_method_name: str, output_format: str, page_range: Optional[str] = None,
+                     user: str = "anonymous") -> None:
+        """Speculate on the session's current upload and settings, replacing any earlier speculation."""
+        from src.core.converter import submit_conversion
+
+        settings = (file_path, parser_name, ocr_method_name, output_format, (page_range or "").strip())
+        current = self._sessions.get(session)
+        if current is not None and current[0] == settings:
+            return
+        await self.discard(session)
+        if not file_path:
+            return
+        subscription = await submit_conversion(file_path, parser_name, ocr_method_name, output_format,
+                                               user=user, page_range=page_range, speculative=True)
+        self._sessions[session] = (settings, subscription)
+        if subscription is not None:
+            logger.info(f"Speculatively converting upload with {parser_name} / {ocr_method_name}")
+
+    async def discard(self, session: Hashable) -> None:
+        """Drop the session's speculation; cancels it if nobody else is waiting for it."""
+        current = self._sessions.pop(session, None)
+        if current is not None and current[1] is not None:
+            await current[1].cancel()
+
+
+_registry: Optional[SpeculationRegistry] = None
+
+
+def get_speculation_registry() -> SpeculationRegistry:
+    """Return the shared speculation registry (created on first use inside the event loop)."""
+    global _registry
+    if _registry is None:
+        _registry = SpeculationRegistry()
+    return _registry
@@ -0,0 +1,104 @@
+"""Keeps a fixed number of worker processes running and replaces recycled ones."""
+
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from src.core.metrics import metrics
+from src.core.worker import RECYCLE_EXIT_CODE
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before restarting a worker that crashed, doubled on each consecutive crash
+CRASH_BACKOFF_SECONDS = 1.0
+MAX_CRASH_BACKOFF_SECONDS = 60.0
+# Seconds a stopping worker gets to drain before it is killed
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("MARKIT_WORKER_DRAIN_SECONDS", "600"))
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+class Supervisor:
+    """
+    Runs ``workers`` worker processes.
+
+    A worker that exits to be recycled is replaced straight away; one that
+    crashes is replaced after a growing back-off. Stopping the supervisor
+    sends SIGTERM to every worker, which then drains its running jobs.
+    """
+
+    def __init__(self, workers: int, worker_args: Optional[List[str]] = None):
+        self.workers = max(1, workers)
+        self.worker_args = worker_args or []
+        self._processes: List[Optional[subprocess.Popen]] = [None] * self.workers
+        self._backoff = [0.0] * self.workers
+        self._restart_at = [0.0] * self.workers
+        self._stop = threading.Event()
+
+    def _spawn(self, slot: int) -> None:
+        command = [sys.executable, "-m", "src.main", "worker", *self.worker_args]
+        self._processes[slot] = subprocess.Popen(command, cwd=str(REPO_ROOT))
+        logger.info(f"Started worker {slot} (pid {self._processes[slot].pid})")
+
+    def _reap(self, slot: int) -> None:
+        process = self._processes[slot]
+        code = process.poll()
+        if code is None:
+            return
+        self._processes[slot] = None
+        if code == RECYCLE_EXIT_CODE:
+            metrics.inc("supervisor.recycled")
+            logger.info(f"Worker {slot} (pid {process.pid}) recycled")
+            self._backoff[slot] = 0.0
+            self._restart_at[slot] = 0.0
+        else:
+            metrics.inc("supervisor.crashed")
+            self._backoff[slot] = min(MAX_CRASH_BACKOFF_SECONDS, (self._backoff[slot] * 2) or CRASH_BACKOFF_SECONDS)
+            self._restart_at[slot] = time.time() + self._backoff[slot]
+            logger.warning(f"Worker {slot} (pid {process.pid}) exited with {code}; "
+                           f"restarting in {self._backoff[slot]:.0f}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        while not self._stop.wait(1.0 if any(self._processes) else 0.1):
+            for slot in range(self.workers):
+                if self._processes[slot] is not None:
+                    self._reap(slot)
+                if self._processes[slot] is None and time.time() >= self._restart_at[slot]:
+                    self._spawn(slot)
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        running = [process for process in self._processes if process and process.poll() is None]
+        for process in running:
+            process.send_signal(signal.SIGTERM)
+        deadline = time.time() + DRAIN_TIMEOUT_SECONDS
+        for process in running:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"Worker pid {process.pid} did not drain in time; killing it")
+                process.kill()
+
+
+def main(argv=None) -> None:
+    arg_parser = argparse.ArgumentParser(
+        description="Run and recycle conversion workers. Unknown options are passed to each worker."
+    )
+    arg_parser.add_argument("--workers", type=int, default=1, help="Worker processes to keep running")
+    args, worker_args = arg_parser.parse_known_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    supervisor = Supervisor(args.workers, worker_args)
+    signal.signal(signal.SIGTERM, lambda *_: supervisor.stop())
+    signal.signal(signal.SIGINT, lambda *_: supervisor.stop())
+    supervisor.run()
@@ -0,0 +1,240 @@
+"""Worker process that pulls conversions from the shared job queue."""
+
+import argparse
+import ctypes
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.core.cpu_budget import MAX_CONCURRENT_CONVERSIONS
+from src.core.job_queue import JobBroker, LEASE_SECONDS, get_broker, shared_path
+from src.core.metrics import metrics, rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# Seconds between lease renewals; must be well under MARKIT_WORKER_LEASE_SECONDS
+HEARTBEAT_SECONDS = float(os.getenv("MARKIT_WORKER_HEARTBEAT_SECONDS", "5"))
+# Minimum seconds between progress updates written to the queue
+PROGRESS_REPORT_SECONDS = float(os.getenv("MARKIT_WORKER_PROGRESS_SECONDS", "1"))
+# Seconds an idle worker waits before polling the queue again
+POLL_INTERVAL_SECONDS = float(os.getenv("MARKIT_WORKER_POLL_SECONDS", "1"))
+# Recycle a worker after this many jobs (0 = never)
+MAX_JOBS_PER_WORKER = int(os.getenv("MARKIT_WORKER_MAX_JOBS", "0"))
+# Recycle a worker once its resident memory exceeds this many MiB (0 = never)
+MAX_RSS_MB = float(os.getenv("MARKIT_WORKER_MAX_RSS_MB", "0"))
+# Exit status of a worker that stopped to be recycled
+RECYCLE_EXIT_CODE = 75
+
+
+def release_memory() -> None:
+    """Collect garbage and hand freed heap pages back to the OS (glibc only)."""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class Worker:
+    """
+    Runs conversions claimed from a JobBroker.
+
+    Each of ``concurrency`` threads claims a job, converts it with
+    convert_file() and moves the download file into the shared results
+    directory. While a job runs its lease is renewed every
+    HEARTBEAT_SECONDS; the job is stopped if the UI cancels it or the lease
+    is lost to another worker.
+
+    After ``max_jobs`` jobs, or once RSS exceeds ``max_rss_mb``, the worker
+    stops claiming, lets running jobs finish and sets ``recycle_reason`` so
+    that a supervisor can replace the process.
+    """
+
+    def __init__(self, broker: Optional[JobBroker] = None, concurrency: int = MAX_CONCURRENT_CONVERSIONS,
+                 worker_id: Optional[str] = None, max_jobs: int = MAX_JOBS_PER_WORKER,
+                 max_rss_mb: float = MAX_RSS_MB):
+        self.broker = broker or get_broker()
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.jobs_done = 0
+        self.recycle_reason: Optional[str] = None
+        self._stop = threading.Event()
+        self._running = 0
+        self._running_lock = threading.Lock()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; running jobs finish first."""
+        self._stop.set()
+
+    def run(self) -> None:
+        logger.info(f"Worker {self.worker_id} started with {self.concurrency} slots")
+        threads = [
+            threading.Thread(target=self._loop, name=f"markit-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            self._register()
+        for thread in threads:
+            thread.join()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def _register(self) -> None:
+        try:
+            with self._running_lock:
+                running, jobs_done = self._running, self.jobs_done
+            self.broker.register_worker(self.worker_id, {
+                "host": socket.gethostname(), "pid": os.getpid(),
+                "slots": self.concurrency, "running": running,
+                "jobs_done": jobs_done, "rss_bytes": rss_bytes(),
+            })
+        except Exception as e:
+            logger.warning(f"Could not register worker: {e}")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.broker.claim(self.worker_id, LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(POLL_INTERVAL_SECONDS)
+                continue
+            with self._running_lock:
+                self._running += 1
+            try:
+                self.process(job)
+            finally:
+                with self._running_lock:
+                    self._running -= 1
+                    self.jobs_done += 1
+                self._check_recycle()
+
+    def _check_recycle(self) -> None:
+        """Drain and stop once the job or memory limit is reached."""
+        with self._running_lock:
+            idle = self._running == 0
+            jobs_done = self.jobs_done
+        if idle:
+            release_memory()
+        rss_mb = rss_bytes() / 1024 / 1024
+        metrics.set_gauge("worker.rss_bytes", int(rss_mb * 1024 * 1024))
+        reason = None
+        if self.max_jobs and jobs_done >= self.max_jobs:
+            reason = f"{jobs_done} jobs done"
+        elif self.max_rss_mb and rss_mb > self.max_rss_mb:
+            reason = f"RSS {rss_mb:.0f} MiB over {self.max_rss_mb:.0f} MiB"
+        if reason and self.recycle_reason is None:
+            self.recycle_reason = reason
+            logger.info(f"Recycling worker {self.worker_id} ({reason}); draining running jobs")
+            self.stop()
+
+    def _keep_alive(self, job_id: str, cancellation_flag: threading.Event, lease_lost: threading.Event,
+                    finished: threading.Event) -> None:
+        while not finished.wait(HEARTBEAT_SECONDS):
+            try:
+                if not self.broker.heartbeat(job_id, self.worker_id, LEASE_SECONDS):
+                    logger.warning(f"Lost the lease on job {job_id}; stopping it")
+                    lease_lost.set()
+                    cancellation_flag.set()
+                    return
+                job = self.broker.get(job_id)
+                if job and job["cancel_requested"]:
+                    logger.info(f"Job {job_id} was cancelled")
+                    cancellation_flag.set()
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+    def process(self, job: Dict[str, Any]) -> None:
+        """Convert one claimed job and record its result."""
+        from src.core.converter import convert_file
+
+        job_id, payload = job["id"], job["payload"]
+        cancellation_flag = threading.Event()
+        lease_lost = threading.Event()
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._keep_alive, args=(job_id, cancellation_flag, lease_lost, finished),
+            name=f"markit-heartbeat-{job_id[:8]}", daemon=True,
+        )
+        heartbeat.start()
+        started = time.time()
+        last_report = {"at": 0.0, "stage": None}
+
+        def report_progress(event):
+            # Stage changes always go through; page updates are rate limited
+            now = time.time()
+            if event["stage"] == last_report["stage"] and now - last_report["at"] < PROGRESS_REPORT_SECONDS:
+                return
+            last_report.update(at=now, stage=event["stage"])
+            try:
+                self.broker.report_progress(job_id, self.worker_id, event)
+            except Exception as e:
+                logger.warning(f"Could not report progress for job {job_id}: {e}")
+
+        try:
+            content, download_path = convert_file(
+                payload["input_path"], payload["parser_name"], payload["ocr_method_name"],
+                payload["output_format"], cancellation_flag=cancellation_flag,
+                page_range=payload.get("page_range"), progress=report_progress,
+            )
+            if lease_lost.is_set():
+                return
+            if download_path is None:
+                self.broker.fail(job_id, self.worker_id, str(content))
+                metrics.inc("worker.jobs_failed")
+                return
+            result_path = shared_path("results", f"{job_id}{Path(download_path).suffix}")
+            shutil.move(download_path, result_path)
+            self.broker.complete(job_id, self.worker_id, {
+                "result_path": result_path, "seconds": round(time.time() - started, 3),
+            })
+            metrics.inc("worker.jobs_completed")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            if not lease_lost.is_set():
+                self.broker.fail(job_id, self.worker_id, f"Error: {e}")
+                metrics.inc("worker.jobs_failed")
+        finally:
+            finished.set()
+            heartbeat.join()
+            # The input belongs to whoever holds the lease now
+            if not lease_lost.is_set():
+                try:
+                    os.unlink(payload["input_path"])
+                except OSError:
+                    pass
+
+
+def main(argv=None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Run conversions from the shared job queue.")
+    arg_parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_CONVERSIONS,
+                            help="Conversions to run at once")
+    arg_parser.add_argument("--worker-id", help="Identifier shown in the queue (default: host-pid-random)")
+    arg_parser.add_argument("--max-jobs", type=int, default=MAX_JOBS_PER_WORKER,
+                            help="Exit for recycling after this many jobs (0 = never)")
+    arg_parser.add_argument("--max-rss-mb", type=float, default=MAX_RSS_MB,
+                            help="Exit for recycling above this RSS (0 = never)")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    worker = Worker(concurrency=args.concurrency, worker_id=args.worker_id,
+                    max_jobs=args.max_jobs, max_rss_mb=args.max_rss_mb)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run()
+    if worker.recycle_reason:
+        sys.exit(RECYCLE_EXIT_CODE)
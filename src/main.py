@@ -1,9 +1,29 @@
-import parsers  # Import all parsers to ensure they're registered
+import os
+import sys
+
+from src.core.cpu_budget import apply_process_limits
+
+# Cap native thread pools before the parsers load torch, OpenCV and tesseract
+apply_process_limits()
 
-from src.ui.ui import launch_ui
+# The parsers package is imported as a top-level module; app.py arranges this too
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import parsers  # Import all parsers to ensure they're registered
 
 
 def main():
+    # "worker" runs a conversion worker instead of the UI; "supervise" runs and recycles several
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        from src.core.worker import main as worker_main
+        worker_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "supervise":
+        from src.core.supervisor import main as supervisor_main
+        supervisor_main(sys.argv[2:])
+        return
+
+    from src.ui.ui import launch_ui
     launch_ui(
         server_name="0.0.0.0",
         server_port=7860,
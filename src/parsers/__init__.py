@@ -5,6 +5,8 @@ from src.parsers.docling_parser import DoclingParser
 from src.parsers.marker_parser import MarkerParser
 from src.parsers.pypdfium_parser import PyPdfiumParser
 from src.parsers.gemini_flash_parser import GeminiFlashParser
+from src.parsers.fast_text_parser import FastTextParser
+from src.parsers.auto_parser import AutoParser
 
 # You can add new parsers here in the future 
 
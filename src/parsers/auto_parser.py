@@ -0,0 +1,158 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple, Union
+import logging
+import time
+
+from src.parsers.parser_interface import DocumentParser, ParseResult
+from src.parsers.parser_registry import ParserRegistry
+from src.core.preflight import analyse_document, estimate_page_cost, IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Parser/OCR combination users typically pick "to be safe"; time savings are
+# reported relative to it
+REFERENCE_ROUTE = ("Docling", "easyocr")
+
+# Routing thresholds
+HIGH_TEXT_COVERAGE = 0.9
+LOW_TEXT_COVERAGE = 0.2
+TABLE_LIKELIHOOD_THRESHOLD = 0.3
+IMAGE_RATIO_THRESHOLD = 0.5
+
+# Quality heuristics applied to a result before accepting it
+MIN_EXTRACTION_RATIO = 0.5  # output chars / text-layer chars
+MAX_REPLACEMENT_CHAR_RATIO = 0.01
+
+# Tried first when only plain text is requested
+TEXT_ONLY_ROUTE = ("Fast Text", "no_ocr")
+
+# Ordered from cheapest to most thorough; a route escalates along this ladder
+ESCALATION_LADDER = [
+    ("PyPdfium", "no_ocr"),
+    ("Docling", "no_ocr"),
+    ("Docling", "tesseract"),
+    ("Docling", "full_force_ocr"),
+]
+
+
+class AutoParser(DocumentParser):
+    """Parser that routes each document to the cheapest adequate parser."""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "Auto"
+
+    @classmethod
+    def supports_page_output(cls) -> bool:
+        return True
+
+    @classmethod
+    def get_supported_ocr_methods(cls) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": "auto",
+                "name": "Auto",
+                "default_params": {}
+            }
+        ]
+
+    @classmethod
+    def get_description(cls) -> str:
+        return "Picks the fastest parser and OCR method expected to give good output"
+
+    def parse(self, file_path: Union[str, Path], ocr_method: Optional[str] = None, **kwargs) -> str:
+        """Analyse the document, then parse it with the cheapest adequate route."""
+        check_cancellation = kwargs.get("check_cancellation")
+        start = time.time()
+        profile = analyse_document(file_path)
+        routes = self.plan_routes(profile, kwargs.get("output_format", "markdown"))
+        logger.info(f"Auto routing {Path(file_path).name}: profile={profile}, routes={routes}")
+
+        result = None
+        for attempt, (parser_name, ocr_method_id) in enumerate(routes):
+            if check_cancellation and check_cancellation():
+                return "Conversion cancelled."
+            parser_class = ParserRegistry.get_parser_class(parser_name)
+            if not parser_class:
+                continue
+            result = parser_class().parse(file_path, ocr_method=ocr_method_id, **kwargs)
+            if result == "Conversion cancelled.":
+                return result
+            is_last = attempt == len(routes) - 1
+            if is_last or self.is_acceptable(result, profile, kwargs.get("output_format", "markdown")):
+                self._log_decision(profile, parser_name, ocr_method_id, attempt, time.time() - start)
+                metadata = dict(getattr(result, "metadata", None) or {})
+                metadata["auto_route"] = {"parser": parser_name, "ocr_method": ocr_method_id,
+                                          "escalations": attempt}
+                return ParseResult(result, output_path=getattr(result, "output_path", None),
+                                   pages=getattr(result, "pages", None), metadata=metadata)
+            logger.info(f"Auto routing: {parser_name}/{ocr_method_id} output failed quality checks, escalating")
+
+        if result is None:
+            raise ValueError("Auto routing found no registered parser for this document")
+        return result
+
+    @classmethod
+    def plan_routes(cls, profile: Dict[str, Any], output_format: str = "markdown") -> List[Tuple[str, str]]:
+        """
+        Choose the first route for a document and the escalation path after it.
+
+        Args:
+            profile: Pre-flight profile from ``analyse_document``
+            output_format: Requested output format
+
+        Returns:
+            Ordered list of (parser name, OCR method id) to try
+        """
+        file_type = profile["file_type"]
+        if file_type in IMAGE_EXTENSIONS:
+            return [("Docling", "tesseract"), ("Docling", "full_force_ocr")]
+        if file_type != ".pdf":
+            return [("Docling", "no_ocr")]
+
+        if profile["text_coverage"] <= LOW_TEXT_COVERAGE:
+            first = ("Docling", "full_force_ocr")
+        elif profile["text_coverage"] < HIGH_TEXT_COVERAGE or profile["image_ratio"] >= IMAGE_RATIO_THRESHOLD:
+            first = ("Docling", "tesseract")
+        elif profile["table_likelihood"] >= TABLE_LIKELIHOOD_THRESHOLD:
+            first = ("Docling", "no_ocr")
+        else:
+            first = ("PyPdfium", "no_ocr")
+        routes = ESCALATION_LADDER[ESCALATION_LADDER.index(first):]
+        # Plain text of a born-digital PDF needs no layout models at all
+        if output_format.lower() == "text" and first == ("PyPdfium", "no_ocr"):
+            routes = [TEXT_ONLY_ROUTE] + routes
+        return routes
+
+    @classmethod
+    def is_acceptable(cls, result: str, profile: Dict[str, Any], output_format: str = "markdown") -> bool:
+        """Cheap quality heuristics on a conversion result."""
+        pages = getattr(result, "pages", None)
+        text = "\n".join(pages) if pages else str(result)
+        if not text.strip():
+            return False
+        if text.count("\ufffd") > MAX_REPLACEMENT_CHAR_RATIO * len(text):
+            return False
+        # Structured formats are much longer than the text layer, so only
+        # compare lengths for plain-text-like output
+        if pages or output_format.lower() in ("markdown", "text"):
+            expected = profile["text_chars_per_page"] * profile["page_count"]
+            if expected and len(text) < MIN_EXTRACTION_RATIO * expected:
+                return False
+        return True
+
+    @staticmethod
+    def _log_decision(profile: Dict[str, Any], parser_name: str, ocr_method_id: str,
+                      escalations: int, elapsed: float) -> None:
+        """Log the chosen route and the estimated time saved against the reference route."""
+        reference = estimate_page_cost(*REFERENCE_ROUTE) * profile["page_count"]
+        saved = reference - elapsed
+        logger.info(
+            f"Auto routing chose {parser_name}/{ocr_method_id} after {escalations} escalation(s): "
+            f"{elapsed:.2f}s vs ~{reference:.2f}s estimated for {REFERENCE_ROUTE[0]}/{REFERENCE_ROUTE[1]} "
+            f"(saved ~{saved:.2f}s)"
+        )
+
+
+# Register the parser with the registry
+ParserRegistry.register(AutoParser)
@@ -0,0 +1,142 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import json
+import re
+
+from src.parsers.parser_interface import ParseResult
+from src.core.serialization import iter_json_chunks, iter_jsonl, write_chunks
+
+
+def iter_page_records(doc) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one record per page of a Docling document.
+
+    Documents without page information (e.g. office formats) are
+    returned as a single page.
+    """
+    page_numbers = sorted(doc.pages.keys()) if doc.pages else []
+    if not page_numbers:
+        yield {"page": 1, "content": doc.export_to_markdown()}
+        return
+    for page_no in page_numbers:
+        yield {"page": page_no, "content": doc.export_to_markdown(page_no=page_no)}
+
+
+def export_pages(doc) -> List[str]:
+    """Return the Markdown content of each page of a Docling document."""
+    return [record["content"] for record in iter_page_records(doc)]
+
+
+_REF = re.compile(r"^#/(\w+)/(\d+)$")
+
+
+def merge_documents(parts: Sequence[Tuple[Any, Sequence[int]]]):
+    """
+    Join Docling documents converted from parts of one PDF into a single document.
+
+    Args:
+        parts: (document, page numbers) pairs in page order, where the page
+            numbers are the original 1-based numbers of the document's pages
+
+    Returns:
+        The merged ``DoclingDocument``, or None if there are no parts
+    """
+    if not parts:
+        return None
+    first, first_pages = parts[0]
+    if len(parts) == 1 and list(first_pages) == sorted(first.pages.keys()):
+        return first
+    merged = None
+    for doc, page_numbers in parts:
+        data = doc.export_to_dict()
+        page_map = dict(zip(sorted(doc.pages.keys()), page_numbers))
+        offsets = {name: len(merged[name]) if merged else 0
+                   for name, items in data.items() if isinstance(items, list)}
+        data = _rebase(data, offsets, page_map)
+        if merged is None:
+            merged = data
+            continue
+        for name in offsets:
+            merged[name].extend(data[name])
+        for name in ("body", "furniture"):
+            if name in data:
+                merged[name]["children"].extend(data[name]["children"])
+        merged["pages"].update(data["pages"])
+    return type(first).model_validate(merged)
+
+
+def _rebase(value, offsets: Dict[str, int], page_map: Dict[int, int]):
+    """Shift item references by ``offsets`` and renumber pages with ``page_map``."""
+    if isinstance(value, dict):
+        rebased = {}
+        for key, item in value.items():
+            if key in ("$ref", "self_ref", "cref") and isinstance(item, str):
+                match = _REF.match(item)
+                if match and match.group(1) in offsets:
+                    item = f"#/{match.group(1)}/{int(match.group(2)) + offsets[match.group(1)]}"
+                rebased[key] = item
+            elif key == "page_no" and isinstance(item, int):
+                rebased[key] = page_map.get(item, item)
+            elif key == "pages" and isinstance(item, dict):
+                rebased[key] = {str(page_map.get(int(number), int(number))): _rebase(page, offsets, page_map)
+                                for number, page in item.items()}
+            else:
+                rebased[key] = _rebase(item, offsets, page_map)
+        return rebased
+    if isinstance(value, list):
+        return [_rebase(item, offsets, page_map) for item in value]
+    return value
+
+
+def export_document(doc, output_format: str = "markdown",
+                    output_path: Optional[str] = None,
+                    check_cancellation=None,
+                    with_pages: bool = False) -> str:
+    """
+    Export a Docling document in the requested output format.
+
+    JSON and JSON Lines output is streamed straight to ``output_path`` when
+    one is given, so the full serialised text is never held in memory.
+
+    Args:
+        doc: The converted ``DoclingDocument``
+        output_format: Output format (markdown, json, jsonl, text, document_tags)
+        output_path: Optional file to stream JSON/JSON Lines output into
+        check_cancellation: Optional callable returning True to abort
+        with_pages: Also attach the Markdown content of each page
+
+    Returns:
+        str: The content, or a ``ParseResult`` when streamed to disk or
+        when pages were requested
+    """
+    content = _export(doc, output_format.lower(), output_path, check_cancellation)
+    if with_pages and content != "Conversion cancelled.":
+        output_path = content.output_path if isinstance(content, ParseResult) else None
+        return ParseResult(content, output_path=output_path, pages=export_pages(doc))
+    return content
+
+
+def _export(doc, output_format: str, output_path: Optional[str],
+            check_cancellation) -> str:
+    """Serialise a Docling document in a single output format."""
+    if output_format == "json":
+        if output_path:
+            return _stream(iter_json_chunks(doc.export_to_dict()), output_path, check_cancellation)
+        return json.dumps(doc.export_to_dict(), ensure_ascii=False, indent=2)
+    elif output_format == "jsonl":
+        if output_path:
+            return _stream(iter_jsonl(iter_page_records(doc)), output_path, check_cancellation)
+        return "".join(iter_jsonl(iter_page_records(doc)))
+    elif output_format == "text":
+        return doc.export_to_text()
+    elif output_format == "document_tags":
+        return doc.export_to_document_tokens()
+    else:
+        return doc.export_to_markdown()
+
+
+def _stream(chunks, output_path: str, check_cancellation=None) -> str:
+    """Stream chunks to a file and wrap the preview in a ParseResult."""
+    preview = write_chunks(chunks, output_path, check_cancellation)
+    if preview is None:
+        return "Conversion cancelled."
+    return ParseResult(preview, output_path=output_path)
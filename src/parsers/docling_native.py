@@ -0,0 +1,56 @@
+from pathlib import Path
+from typing import Union
+import threading
+
+from docling.datamodel.base_models import InputFormat
+from docling.document_converter import DocumentConverter
+
+from src.parsers.docling_export import export_document
+
+# File extensions handled by Docling's native (model-free) backends
+NATIVE_FORMATS = {
+    ".docx": InputFormat.DOCX,
+    ".pptx": InputFormat.PPTX,
+    ".xlsx": InputFormat.XLSX,
+    ".html": InputFormat.HTML,
+    ".htm": InputFormat.HTML,
+    ".md": InputFormat.MD,
+}
+
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def is_native_document(file_path: Union[str, Path]) -> bool:
+    """Return True if the file can be converted without layout models."""
+    return Path(file_path).suffix.lower() in NATIVE_FORMATS
+
+
+def _get_converter() -> DocumentConverter:
+    """Shared converter; the simple pipeline holds no models, so it is safe to reuse."""
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            _converter = DocumentConverter(allowed_formats=sorted(set(NATIVE_FORMATS.values()), key=str))
+    return _converter
+
+
+def convert_native(file_path: Union[str, Path], **kwargs) -> str:
+    """
+    Convert an office, HTML or Markdown document with Docling's native backends.
+
+    Args:
+        file_path: Path to the document
+        **kwargs: Parser options (output_format, output_path, check_cancellation, with_pages)
+
+    Returns:
+        str: The content in the requested output format
+    """
+    result = _get_converter().convert(Path(file_path))
+    return export_document(
+        result.document,
+        output_format=kwargs.get("output_format", "markdown"),
+        output_path=kwargs.get("output_path"),
+        check_cancellation=kwargs.get("check_cancellation"),
+        with_pages=kwargs.get("with_pages", False),
+    )
@@ -1,11 +1,16 @@
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union
-import json
 import os
 import shutil
 
-from src.parsers.parser_interface import DocumentParser
+from src.parsers.parser_interface import DocumentParser, ParseResult
 from src.parsers.parser_registry import ParserRegistry
+from src.parsers.docling_export import export_document, export_pages, merge_documents
+from src.parsers.docling_native import is_native_document, convert_native
+from src.services.batch_inference import install_layout_batching
+from src.core.progress import install_docling_page_hook
+from src.core.model_optimization import is_cpu_optimised, apply_model_dir, optimise_converter
+from src.core.page_isolation import CANCELLED, convert_pages, page_count, page_subset
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.base_models import InputFormat
 from docling.datamodel.pipeline_options import (
@@ -24,6 +29,10 @@ class DoclingParser(DocumentParser):
     def get_name(cls) -> str:
         return "Docling"
     
+    @classmethod
+    def supports_page_output(cls) -> bool:
+        return True
+    
     @classmethod
     def get_supported_ocr_methods(cls) -> List[Dict[str, Any]]:
         return [
@@ -61,11 +70,32 @@ class DoclingParser(DocumentParser):
     
     def parse(self, file_path: Union[str, Path], ocr_method: Optional[str] = None, **kwargs) -> str:
         """Parse a document using Docling."""
+        # Office, HTML and Markdown files need no layout or OCR models
+        if is_native_document(file_path):
+            return convert_native(file_path, **kwargs)
+        
         # Special case for full force OCR
         if ocr_method == "full_force_ocr":
-            return self._apply_full_force_ocr(file_path)
+            return self._apply_full_force_ocr(file_path, **kwargs)
         
         # Regular Docling parsing
+        converter = self.build_converter(ocr_method, **kwargs)
+        
+        # Convert the document
+        result = converter.convert(Path(file_path))
+        doc = result.document
+        
+        # Return the content in the requested format
+        return export_document(
+            doc,
+            output_format=kwargs.get("output_format", "markdown"),
+            output_path=kwargs.get("output_path"),
+            check_cancellation=kwargs.get("check_cancellation"),
+            with_pages=kwargs.get("with_pages", False),
+        )
+    
+    def build_converter(self, ocr_method: Optional[str] = None, **kwargs) -> DocumentConverter:
+        """Create a DocumentConverter for PDFs with the given OCR method and job options."""
         pipeline_options = PdfPipelineOptions()
         pipeline_options.do_table_structure = True
         pipeline_options.table_structure_options.do_cell_matching = True
@@ -76,9 +106,6 @@ class DoclingParser(DocumentParser):
         elif ocr_method == "easyocr":
             pipeline_options.do_ocr = True
             pipeline_options.ocr_options.lang = kwargs.get("languages", ["en"])
-            pipeline_options.accelerator_options = AcceleratorOptions(
-                num_threads=4, device=AcceleratorDevice.AUTO
-            )
         elif ocr_method == "easyocr_cpu":
             pipeline_options.do_ocr = True
             pipeline_options.ocr_options.lang = kwargs.get("languages", ["en"])
@@ -90,6 +117,16 @@ class DoclingParser(DocumentParser):
             pipeline_options.do_ocr = True
             pipeline_options.ocr_options = TesseractCliOcrOptions()
         
+        # Use the thread allotment from the CPU budget
+        pipeline_options.accelerator_options = AcceleratorOptions(
+            num_threads=kwargs.get("num_threads", 4), device=AcceleratorDevice.AUTO
+        )
+        
+        # Optionally load models from the local model directory
+        cpu_optimised = is_cpu_optimised(self.get_name(), kwargs)
+        if cpu_optimised:
+            apply_model_dir(pipeline_options)
+        
         # Create the converter
         converter = DocumentConverter(
             format_options={
@@ -99,23 +136,20 @@ class DoclingParser(DocumentParser):
             }
         )
         
-        # Convert the document
-        result = converter.convert(Path(file_path))
-        doc = result.document
+        # Swap in the int8 / ONNX models before converting
+        if cpu_optimised:
+            optimise_converter(converter, InputFormat.PDF)
         
-        # Return the content in the requested format
-        output_format = kwargs.get("output_format", "markdown")
-        if output_format.lower() == "json":
-            return json.dumps(doc.export_to_dict(), ensure_ascii=False, indent=2)
-        elif output_format.lower() == "text":
-            return doc.export_to_text()
-        elif output_format.lower() == "document_tags":
-            return doc.export_to_document_tokens()
-        else:
-            return doc.export_to_markdown()
+        return converter
     
-    def _apply_full_force_ocr(self, file_path: Union[str, Path]) -> str:
-        """Apply full force OCR to a document."""
+    def _apply_full_force_ocr(self, file_path: Union[str, Path], num_threads: int = 4, **kwargs) -> str:
+        """
+        Apply full force OCR to a document.
+
+        PDFs are converted a few pages at a time; pages that fail are
+        retried and then converted with the regular Tesseract CLI pipeline,
+        so one bad page only costs that page.
+        """
         input_doc = Path(file_path)
         file_extension = input_doc.suffix.lower()
         
@@ -127,6 +161,9 @@ class DoclingParser(DocumentParser):
         pipeline_options.do_ocr = True
         pipeline_options.do_table_structure = True
         pipeline_options.table_structure_options.do_cell_matching = True
+        pipeline_options.accelerator_options = AcceleratorOptions(
+            num_threads=num_threads, device=AcceleratorDevice.AUTO
+        )
         
         # Find tesseract executable
         tesseract_path = shutil.which("tesseract") or "/usr/bin/tesseract"
@@ -145,17 +182,70 @@ class DoclingParser(DocumentParser):
         if file_extension in ['.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp']:
             print(f"Processing as image file: {file_extension}")
             format_options[InputFormat.IMAGE] = PdfFormatOption(pipeline_options=pipeline_options)
+            
+            # A single image has no pages to isolate; fall back for the whole file
+            try:
+                converter = DocumentConverter(format_options=format_options)
+                result = converter.convert(input_doc)
+                return result.document.export_to_markdown()
+            except Exception as e:
+                print(f"Error with standard OCR: {e}")
+                print(f"Attempting fallback to tesseract_cli OCR...")
+                return self.parse(file_path, ocr_method="tesseract_cli", num_threads=num_threads)
+        
+        converter = DocumentConverter(format_options=format_options)
+        fallback_converter = None
+        total_pages = page_count(input_doc)
+        # Converted documents by first page, merged for export once every unit is done
+        documents = {}
         
-        # Try full force OCR with standard options
-        try:
-            converter = DocumentConverter(format_options=format_options)
-            result = converter.convert(input_doc)
-            return result.document.export_to_markdown()
-        except Exception as e:
-            print(f"Error with standard OCR: {e}")
-            print(f"Attempting fallback to tesseract_cli OCR...")
-            return self.parse(file_path, ocr_method="tesseract_cli")
+        def keep(indices, doc):
+            pages = export_pages(doc)
+            if len(pages) != len(indices):
+                raise ValueError(f"expected {len(indices)} pages, got {len(pages)}")
+            documents[indices[0]] = (doc, [index + 1 for index in indices])
+            return pages
+        
+        def force_ocr(indices):
+            with page_subset(input_doc, indices, total_pages) as path:
+                return keep(indices, converter.convert(Path(path)).document)
+        
+        def tesseract_cli(indices):
+            nonlocal fallback_converter
+            if fallback_converter is None:
+                fallback_converter = self.build_converter("tesseract_cli", num_threads=num_threads)
+            with page_subset(input_doc, indices, total_pages) as path:
+                return keep(indices, fallback_converter.convert(Path(path)).document)
+        
+        result = convert_pages(
+            range(total_pages),
+            [("full_force_ocr", force_ocr), ("tesseract_cli", tesseract_cli)],
+            check_cancellation=kwargs.get("check_cancellation"),
+        )
+        if result == CANCELLED:
+            return result
+        
+        # Markdown keeps the placeholders of failed pages; other formats come from the merged document
+        output_format = kwargs.get("output_format", "markdown").lower()
+        merged = merge_documents([documents[first] for first in sorted(documents)])
+        if output_format == "markdown" or merged is None:
+            return result
+        content = export_document(
+            merged,
+            output_format=output_format,
+            output_path=kwargs.get("output_path"),
+            check_cancellation=kwargs.get("check_cancellation"),
+        )
+        if content == CANCELLED:
+            return content
+        return ParseResult(content, output_path=getattr(content, "output_path", None),
+                           pages=result.pages, metadata=result.metadata)
+
+# Share layout-model batches across concurrent conversions
+install_layout_batching()
 
+# Report per-page progress from the layout model
+install_docling_page_hook()
 
 # Register the parser with the registry
 ParserRegistry.register(DoclingParser) 
\ No newline at end of file
@@ -0,0 +1,359 @@
+"""Text-only PDF parser that reads pdfium's text layer without any layout models."""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple, Union
+import ctypes
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+from src.parsers.parser_interface import DocumentParser, ParseResult
+from src.parsers.parser_registry import ParserRegistry
+from src.core.serialization import iter_json_chunks, iter_jsonl, write_chunks
+from src.core.progress import report_pages
+
+logger = logging.getLogger(__name__)
+
+# Documents with at least this many pages are split across worker processes
+PARALLEL_MIN_PAGES = int(os.getenv("MARKIT_FAST_TEXT_PARALLEL_MIN_PAGES", "64"))
+MAX_WORKERS = int(os.getenv("MARKIT_FAST_TEXT_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# A paragraph is a heading if its font is this much larger than the body text
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_CHARS = 200
+MAX_HEADING_LEVELS = 3
+
+# A vertical gap larger than this many font sizes starts a new paragraph
+PARAGRAPH_GAP_RATIO = 1.6
+
+# Lines: (left, baseline, right, font size, text); paragraphs: (font size, text)
+Line = Tuple[float, float, float, float, str]
+Paragraph = Tuple[float, str]
+
+
+def _read_lines(textpage) -> List[Line]:
+    """Read the lines of a text page with the position and size of their first character."""
+    count = textpage.count_chars()
+    if count <= 0:
+        return []
+    text = textpage.get_text_range(0, count)
+    x, y = ctypes.c_double(), ctypes.c_double()
+    lines = []
+    offset = 0
+    # pdfium separates its lines with generated "\r\n" characters, so string
+    # offsets line up with character indices
+    for raw in text.split("\r\n"):
+        stripped = raw.strip()
+        if stripped:
+            first = offset + len(raw) - len(raw.lstrip())
+            last = offset + len(raw.rstrip()) - 1
+            pdfium_c.FPDFText_GetCharOrigin(textpage, first, x, y)
+            right = textpage.get_charbox(last)[2]
+            size = pdfium_c.FPDFText_GetFontSize(textpage, first) or 1.0
+            lines.append((x.value, y.value, right, size, stripped))
+        offset += len(raw) + 2
+    return lines
+
+
+def _find_gutter(lines: List[Line], page_width: float) -> Optional[float]:
+    """Return the x position between two text columns, if the page has them."""
+    if len(lines) < 8:
+        return None
+    best, best_crossing = None, None
+    for step in range(int(page_width * 0.35), int(page_width * 0.65), 2):
+        gutter = float(step)
+        left = sum(1 for l, _, r, _, _ in lines if r <= gutter)
+        right = sum(1 for l, _, r, _, _ in lines if l >= gutter)
+        crossing = len(lines) - left - right
+        if left < 0.25 * len(lines) or right < 0.25 * len(lines):
+            continue
+        if best_crossing is None or crossing < best_crossing:
+            best, best_crossing = gutter, crossing
+    # Full-width lines (titles, footers) may cross the gutter, body text may not
+    if best is None or best_crossing > 0.2 * len(lines):
+        return None
+    return best
+
+
+def _merge_baselines(lines: List[Line]) -> List[Line]:
+    """Sort lines top to bottom and join fragments that share a baseline."""
+    merged: List[Line] = []
+    for line in sorted(lines, key=lambda line: -line[1]):
+        if merged and abs(merged[-1][1] - line[1]) < 0.3 * min(merged[-1][3], line[3]):
+            prev = merged[-1]
+            first, second = (prev, line) if prev[0] <= line[0] else (line, prev)
+            merged[-1] = (first[0], prev[1], max(prev[2], line[2]), max(prev[3], line[3]),
+                          f"{first[4]} {second[4]}")
+        else:
+            merged.append(line)
+    return merged
+
+
+def _reading_order(lines: List[Line], page_width: float) -> List[List[Line]]:
+    """
+    Order lines for reading, returning runs of lines from the same column.
+
+    Two-column pages are read column by column between full-width lines.
+    """
+    gutter = _find_gutter(lines, page_width)
+    if gutter is None:
+        return [_merge_baselines(lines)]
+
+    runs: List[List[Line]] = []
+    left: List[Line] = []
+    right: List[Line] = []
+
+    def flush():
+        for column in (left, right):
+            if column:
+                runs.append(_merge_baselines(column))
+                column.clear()
+
+    for line in sorted(lines, key=lambda line: -line[1]):
+        if line[2] <= gutter + 2:
+            left.append(line)
+        elif line[0] >= gutter - 2:
+            right.append(line)
+        else:
+            flush()
+            runs.append([line])
+    flush()
+    return runs
+
+
+def _join(text: str, continuation: str) -> str:
+    # pdfium reports soft hyphens at line ends as U+FFFE
+    if text.endswith("\ufffe"):
+        return text[:-1] + continuation
+    if text.endswith("-") and continuation[:1].islower():
+        return text[:-1] + continuation
+    return f"{text} {continuation}"
+
+
+def _paragraphs(runs: List[List[Line]]) -> List[Paragraph]:
+    """Group consecutive lines of the same size and spacing into paragraphs."""
+    paragraphs: List[Paragraph] = []
+    for run in runs:
+        previous = None
+        for line in run:
+            _, baseline, _, size, text = line
+            if (previous is not None and abs(previous[3] - size) < 0.5
+                    and previous[1] - baseline < PARAGRAPH_GAP_RATIO * size):
+                paragraphs[-1] = (paragraphs[-1][0], _join(paragraphs[-1][1], text))
+            else:
+                paragraphs.append((size, text))
+            previous = line
+    return paragraphs
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[List[Paragraph]]:
+    """Extract the paragraphs of pages ``start`` to ``stop - 1``."""
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        pages = []
+        for index in range(start, stop):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                lines = _read_lines(textpage)
+                pages.append(_paragraphs(_reading_order(lines, page.get_width())))
+            finally:
+                textpage.close()
+                page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Shared worker processes.
+
+    Workers come from a forkserver (or are spawned where that is missing)
+    rather than forked, so they never inherit locks or model threads held
+    by the app at the time of the fork.
+    """
+    global _pool
+    if MAX_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                # Import the parsers once in the server instead of in every worker
+                context.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+    return _pool
+
+
+def extract_pages(file_path: Union[str, Path], workers: int = 1, check_cancellation=None) -> Optional[List[List[Paragraph]]]:
+    """
+    Extract paragraphs for every page, fanning large documents out over processes.
+
+    Args:
+        file_path: Path to the PDF
+        workers: Number of worker processes to use
+        check_cancellation: Optional callable returning True to stop early
+
+    Returns:
+        list of paragraphs per page, or None if cancelled
+    """
+    file_path = str(file_path)
+    pdf = pdfium.PdfDocument(file_path)
+    page_count = len(pdf)
+    pdf.close()
+
+    pool = _get_pool() if workers > 1 and page_count >= PARALLEL_MIN_PAGES else None
+    if pool is None:
+        ranges = [(start, min(start + PARALLEL_MIN_PAGES, page_count))
+                  for start in range(0, page_count, PARALLEL_MIN_PAGES)]
+        pages = []
+        for start, stop in ranges:
+            if check_cancellation and check_cancellation():
+                return None
+            pages.extend(extract_page_range(file_path, start, stop))
+            report_pages(stop - start)
+        return pages
+
+    # A few chunks per worker keeps them busy when pages differ in cost
+    chunk = max(1, math.ceil(page_count / (min(workers, MAX_WORKERS) * 4)))
+    futures = [pool.submit(extract_page_range, file_path, start, min(start + chunk, page_count))
+               for start in range(0, page_count, chunk)]
+    pages = []
+    for future in futures:
+        if check_cancellation and check_cancellation():
+            for pending in futures:
+                pending.cancel()
+            return None
+        chunk_pages = future.result()
+        pages.extend(chunk_pages)
+        report_pages(len(chunk_pages))
+    return pages
+
+
+def heading_levels(pages: List[List[Paragraph]]) -> Dict[float, int]:
+    """Map font sizes noticeably larger than the body text to heading levels."""
+    # Body size: the font size covering the median character
+    chars_by_size: Dict[float, int] = {}
+    for paragraphs in pages:
+        for size, text in paragraphs:
+            chars_by_size[round(size, 1)] = chars_by_size.get(round(size, 1), 0) + len(text)
+    total = sum(chars_by_size.values())
+    if not total:
+        return {}
+    seen = 0
+    for body in sorted(chars_by_size):
+        seen += chars_by_size[body]
+        if seen * 2 >= total:
+            break
+    heading_sizes = sorted(
+        {round(size, 1) for paragraphs in pages for size, text in paragraphs
+         if size >= body * HEADING_SIZE_RATIO and len(text) <= MAX_HEADING_CHARS},
+        reverse=True,
+    )
+    return {size: min(level + 1, MAX_HEADING_LEVELS) for level, size in enumerate(heading_sizes)}
+
+
+class FastTextParser(DocumentParser):
+    """Parser that reads the PDF text layer directly, without layout or table models."""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "Fast Text"
+
+    @classmethod
+    def supports_page_output(cls) -> bool:
+        return True
+
+    @classmethod
+    def get_supported_ocr_methods(cls) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": "no_ocr",
+                "name": "No OCR",
+                "default_params": {}
+            }
+        ]
+
+    @classmethod
+    def get_description(cls) -> str:
+        return "Very fast text extraction for born-digital PDFs (no tables, images or OCR)"
+
+    def parse(self, file_path: Union[str, Path], ocr_method: Optional[str] = None, **kwargs) -> str:
+        """Extract text from a PDF's text layer with basic headings."""
+        if Path(file_path).suffix.lower() != ".pdf":
+            raise ValueError("Fast Text only supports PDF files")
+        check_cancellation = kwargs.get("check_cancellation")
+        output_format = kwargs.get("output_format", "markdown").lower()
+
+        pages = extract_pages(file_path, workers=kwargs.get("num_threads", 1),
+                              check_cancellation=check_cancellation)
+        if pages is None:
+            return "Conversion cancelled."
+        levels = heading_levels(pages)
+
+        output_path = kwargs.get("output_path")
+        if output_format == "json":
+            document = {"pages": [
+                {"page": number, "blocks": [self._block(size, text, levels) for size, text in paragraphs]}
+                for number, paragraphs in enumerate(pages, start=1)
+            ]}
+            if output_path:
+                preview = write_chunks(iter_json_chunks(document), output_path, check_cancellation)
+                if preview is None:
+                    return "Conversion cancelled."
+                return ParseResult(preview, output_path=output_path)
+            return "".join(iter_json_chunks(document))
+
+        markdown = output_format != "text"
+        page_texts = [self._render(paragraphs, levels, markdown) for paragraphs in pages]
+        records = [{"page": number, "content": text} for number, text in enumerate(page_texts, start=1)]
+
+        if output_format == "jsonl":
+            if output_path:
+                preview = write_chunks(iter_jsonl(records), output_path, check_cancellation)
+                if preview is None:
+                    return "Conversion cancelled."
+                return ParseResult(preview, output_path=output_path, pages=page_texts)
+            return ParseResult("".join(iter_jsonl(records)), pages=page_texts)
+
+        content = "\n\n".join(text for text in page_texts if text)
+        if output_format == "document_tags":
+            content = f"<doc>\n{content}\n</doc>"
+        if kwargs.get("with_pages"):
+            return ParseResult(content, pages=page_texts)
+        return content
+
+    @staticmethod
+    def _block(size: float, text: str, levels: Dict[float, int]) -> Dict[str, Any]:
+        level = levels.get(round(size, 1))
+        if level and len(text) <= MAX_HEADING_CHARS:
+            return {"type": "heading", "level": level, "text": text}
+        return {"type": "paragraph", "text": text}
+
+    @classmethod
+    def _render(cls, paragraphs: List[Paragraph], levels: Dict[float, int], markdown: bool) -> str:
+        parts = []
+        for size, text in paragraphs:
+            block = cls._block(size, text, levels)
+            if markdown and block["type"] == "heading":
+                parts.append(f"{'#' * block['level']} {text}")
+            else:
+                parts.append(text)
+        return "\n\n".join(parts)
+
+
+# Register the parser with the registry
+ParserRegistry.register(FastTextParser)
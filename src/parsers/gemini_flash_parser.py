@@ -9,6 +9,9 @@ import io
 
 from src.parsers.parser_interface import DocumentParser
 from src.parsers.parser_registry import ParserRegistry
+from src.parsers.gemini_payload import PayloadSource, build_payload, parse_page_range, PAYLOAD_MODE
+from src.parsers.fast_text_parser import FastTextParser, extract_page_range, heading_levels
+from src.core.page_isolation import convert_pages
 
 # Import the Google Gemini API client
 try:
@@ -19,6 +22,10 @@ except ImportError:
 
 # Load API key from environment variable
 api_key = os.getenv("GOOGLE_API_KEY")
+# Alternative API endpoint, e.g. the local stub in src/tools/gemini_stub.py
+api_endpoint = os.getenv("MARKIT_GEMINI_ENDPOINT")
+# PDF pages sent per request; a failed request is retried page by page
+PAGES_PER_REQUEST = int(os.getenv("MARKIT_GEMINI_PAGES_PER_REQUEST", "10"))
 
 # Check if API key is available and print a message if not
 if not api_key:
@@ -31,6 +38,10 @@ class GeminiFlashParser(DocumentParser):
     def get_name(cls) -> str:
         return "Gemini Flash"
 
+    @classmethod
+    def supports_page_range(cls) -> bool:
+        return True
+
     @classmethod
     def get_supported_ocr_methods(cls) -> List[Dict[str, Any]]:
         return [
@@ -46,7 +57,15 @@ class GeminiFlashParser(DocumentParser):
         return "Gemini Flash 2.0 parser for converting documents and images to markdown"
     
     def parse(self, file_path: Union[str, Path], ocr_method: Optional[str] = None, **kwargs) -> str:
-        """Parse a document using Gemini Flash 2.0."""
+        """
+        Parse a document using Gemini Flash 2.0.
+
+        Pass page_range="1-3, 7" to convert only those pages and
+        payload_mode to override MARKIT_GEMINI_PAYLOAD for this call.
+        PDFs are sent PAGES_PER_REQUEST pages at a time; pages whose
+        request keeps failing fall back to the PDF text layer, and the
+        result's metadata lists the status of every page.
+        """
         if not GEMINI_AVAILABLE:
             raise ImportError(
                 "The Google Gemini API client is not installed. "
@@ -62,55 +81,100 @@ class GeminiFlashParser(DocumentParser):
         
         try:
             # Configure the Gemini API with the API key
-            genai.configure(api_key=api_key)
+            if api_endpoint:
+                genai.configure(api_key=api_key, transport="rest",
+                                client_options={"api_endpoint": api_endpoint})
+            else:
+                genai.configure(api_key=api_key)
             
             # Determine file type based on extension
             file_path = Path(file_path)
             file_extension = file_path.suffix.lower()
             
-            # Read the file content
-            file_content = file_path.read_bytes()
-            
             # Determine MIME type based on file extension
             mime_type = self._get_mime_type(file_extension)
             
             # Create a multipart content with the file
             model = genai.GenerativeModel('gemini-2.0-flash')
+            payload_mode = kwargs.get("payload_mode") or PAYLOAD_MODE
             
-            # Set up the prompt
-            prompt = """
-            Convert this document to markdown format. 
-            Preserve the structure, headings, lists, tables, and formatting as much as possible.
-            For images, include a brief description in markdown image syntax.
-            """
+            if mime_type != "application/pdf":
+                return self._convert(model, file_path, mime_type, None, payload_mode)
             
-            # Generate the response
-            response = model.generate_content(
-                contents=[
-                    prompt,
-                    {
-                        "mime_type": mime_type,
-                        "data": file_content
-                    }
-                ],
-                generation_config={
-                    "temperature": 0.2,
-                    "top_p": 0.95,
-                    "top_k": 40,
-                    "max_output_tokens": 8192,
-                }
-            )
-            
-            # Extract the markdown text from the response
-            markdown_text = response.text
-            
-            return markdown_text
+            # Read and open the PDF once for all of its requests
+            with PayloadSource(file_path) as source:
+                return self._convert_pdf(model, source, mime_type, payload_mode, **kwargs)
             
         except Exception as e:
             error_message = f"Error parsing document with Gemini Flash: {str(e)}"
             print(error_message)
             return f"# Error\n\n{error_message}\n\nPlease check your API key and try again."
     
+    def _convert_pdf(self, model, source: PayloadSource, mime_type: str, payload_mode: str, **kwargs):
+        """Convert a PDF a few pages per request so a failing request only costs those pages."""
+        file_path = source.file_path
+        total = source.page_count()
+        pages = parse_page_range(kwargs.get("page_range"), total)
+        
+        def gemini(indices):
+            spec = ",".join(str(index + 1) for index in indices)
+            # Sending the original file would convert every page, not just this unit's
+            mode = "subset" if payload_mode == "original" and len(indices) < total else payload_mode
+            return self._convert(model, file_path, mime_type, spec, mode, source)
+        
+        def text_layer(indices):
+            texts = []
+            for index in indices:
+                paragraphs = extract_page_range(str(file_path), index, index + 1)
+                text = FastTextParser._render(paragraphs[0], heading_levels(paragraphs), True)
+                if not text.strip():
+                    raise ValueError("page has no text layer")
+                texts.append(text)
+            return texts
+        
+        result = convert_pages(pages, [("gemini", gemini), ("text_layer", text_layer)],
+                               unit_size=PAGES_PER_REQUEST,
+                               check_cancellation=kwargs.get("check_cancellation"))
+        failed = getattr(result, "metadata", {}).get("failed_pages", [])
+        if failed and len(failed) == len(pages):
+            raise RuntimeError(result.metadata["page_status"][0]["error"])
+        return result
+    
+    def _convert(self, model, file_path: Path, mime_type: str, page_range: Optional[str],
+                 payload_mode: str, source: Optional[PayloadSource] = None) -> str:
+        """Send one request to Gemini and return its Markdown."""
+        # Only send the requested pages, re-encoded as small as possible
+        parts, _ = build_payload(file_path, mime_type, page_range=page_range, mode=payload_mode, source=source)
+        
+        # Set up the prompt
+        prompt = """
+        Convert this document to markdown format. 
+        Preserve the structure, headings, lists, tables, and formatting as much as possible.
+        For images, include a brief description in markdown image syntax.
+        """
+        if len(parts) > 1:
+            prompt += "The images are the document's pages, in order.\n"
+        
+        # Generate the response
+        response = model.generate_content(
+            contents=[prompt] + [
+                {
+                    "mime_type": part_mime_type,
+                    "data": data
+                }
+                for part_mime_type, data in parts
+            ],
+            generation_config={
+                "temperature": 0.2,
+                "top_p": 0.95,
+                "top_k": 40,
+                "max_output_tokens": 8192,
+            }
+        )
+        
+        # Extract the markdown text from the response
+        return response.text
+    
     def _get_mime_type(self, file_extension: str) -> str:
         """Get the MIME type for a file extension."""
         mime_types = {
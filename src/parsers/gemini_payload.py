@@ -0,0 +1,204 @@
+"""Shrink documents before they are uploaded to Gemini."""
+
+import io
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import pypdfium2 as pdfium
+from PIL import Image
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# "auto", "original", "subset" (selected pages, unused objects dropped) or "images" (rendered pages)
+PAYLOAD_MODE = os.getenv("MARKIT_GEMINI_PAYLOAD", "auto").lower()
+# Longest side of a rendered or re-encoded page image, in pixels
+MAX_IMAGE_PX = int(os.getenv("MARKIT_GEMINI_MAX_IMAGE_PX", "1600"))
+JPEG_QUALITY = int(os.getenv("MARKIT_GEMINI_JPEG_QUALITY", "80"))
+# Pages with less text than this are treated as scanned when choosing the "auto" mode
+SCANNED_TEXT_CHARS = 50
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".tif"}
+
+# A list of (mime_type, bytes) parts to send in order
+Payload = List[Tuple[str, bytes]]
+
+
+def parse_page_range(spec: Optional[str], page_count: int) -> List[int]:
+    """
+    Turn a 1-based page selection such as "1-3, 7, 10-" into 0-based indices.
+
+    An empty selection means every page.
+
+    Raises:
+        ValueError: If the selection is malformed or selects no page
+    """
+    if not spec or not spec.strip():
+        return list(range(page_count))
+    selected = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, dash, stop = part.partition("-")
+        try:
+            first = int(start) if start else 1
+            last = (int(stop) if stop else page_count) if dash else first
+        except ValueError:
+            raise ValueError(f"Invalid page selection: {spec!r}")
+        selected.update(range(max(1, first) - 1, min(last, page_count)))
+    if not selected:
+        raise ValueError(f"Page selection {spec!r} matches none of the {page_count} pages")
+    return sorted(selected)
+
+
+def _encode_image(image: Image.Image) -> bytes:
+    image.thumbnail((MAX_IMAGE_PX, MAX_IMAGE_PX))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _render_pages(pdf: pdfium.PdfDocument, pages: List[int]) -> Payload:
+    parts = []
+    for index in pages:
+        page = pdf[index]
+        width, height = page.get_size()
+        scale = MAX_IMAGE_PX / max(width, height, 1)
+        bitmap = page.render(scale=scale, grayscale=False)
+        parts.append(("image/jpeg", _encode_image(bitmap.to_pil())))
+        page.close()
+    return parts
+
+
+def _subset_pdf(pdf: pdfium.PdfDocument, pages: List[int]) -> Payload:
+    """
+    Copy the selected pages into a new document; objects they do not use are left behind.
+
+    Fonts of the kept pages are not stripped, as their text would become unreadable.
+    """
+    subset = pdfium.PdfDocument.new()
+    subset.import_pages(pdf, pages)
+    buffer = io.BytesIO()
+    subset.save(buffer)
+    subset.close()
+    return [("application/pdf", buffer.getvalue())]
+
+
+def _mostly_scanned(pdf: pdfium.PdfDocument, pages: List[int]) -> bool:
+    scanned = 0
+    for index in pages:
+        page = pdf[index]
+        textpage = page.get_textpage()
+        if textpage.count_chars() < SCANNED_TEXT_CHARS:
+            scanned += 1
+        textpage.close()
+        page.close()
+    return scanned * 2 > len(pages)
+
+
+class PayloadSource:
+    """
+    A document read (and for PDFs, opened) once for several build_payload()
+    calls, e.g. one per group of pages. Close it when done.
+
+    The document's size is counted in ``gemini.original_bytes`` once here;
+    each build_payload() call adds only what it sends.
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        self.file_path = Path(file_path)
+        self.original = self.file_path.read_bytes()
+        self._pdf = None
+        metrics.inc("gemini.original_bytes", len(self.original))
+
+    @property
+    def pdf(self) -> "pdfium.PdfDocument":
+        if self._pdf is None:
+            self._pdf = pdfium.PdfDocument(self.original)
+        return self._pdf
+
+    def page_count(self) -> int:
+        return len(self.pdf)
+
+    def close(self) -> None:
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def __enter__(self) -> "PayloadSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def build_payload(file_path: Union[str, Path], mime_type: str, page_range: Optional[str] = None,
+                  mode: str = PAYLOAD_MODE, source: Optional[PayloadSource] = None) -> Tuple[Payload, Dict[str, Any]]:
+    """
+    Prepare the parts to upload for a document.
+
+    PDFs are cut down to the selected pages and, in "images" mode (or
+    "auto" mode for mostly scanned documents), rendered to JPEG pages no
+    larger than MAX_IMAGE_PX. Large images are downscaled. Whatever is
+    prepared, the original file is sent instead if it would be smaller and
+    covers the same pages.
+
+    Args:
+        file_path: Path to the document
+        mime_type: MIME type of the document
+        page_range: 1-based page selection, e.g. "1-3, 7" (PDFs only)
+        mode: Payload mode, see MARKIT_GEMINI_PAYLOAD
+        source: The document already read by the caller; read here if omitted
+
+    Returns:
+        tuple: (parts, stats) where stats has original_bytes, sent_bytes,
+        mode, pages and seconds
+    """
+    started = time.perf_counter()
+    file_path = Path(file_path)
+    owns_source = source is None
+    if owns_source:
+        source = PayloadSource(file_path)
+    original = source.original
+    parts: Payload = [(mime_type, original)]
+    used_mode, pages = "original", None
+
+    if mode != "original" and mime_type == "application/pdf":
+        try:
+            pdf = source.pdf
+            page_count = len(pdf)
+            pages = parse_page_range(page_range, page_count)
+            if mode == "images" or (mode == "auto" and _mostly_scanned(pdf, pages)):
+                parts, used_mode = _render_pages(pdf, pages), "images"
+            else:
+                parts, used_mode = _subset_pdf(pdf, pages), "subset"
+        finally:
+            if owns_source:
+                source.close()
+        if len(pages) == page_count and sum(len(data) for _, data in parts) >= len(original):
+            parts, used_mode = [(mime_type, original)], "original"
+    elif mode != "original" and file_path.suffix.lower() in IMAGE_EXTENSIONS:
+        with Image.open(io.BytesIO(original)) as image:
+            if max(image.size) > MAX_IMAGE_PX:
+                encoded = _encode_image(image.copy())
+                if len(encoded) < len(original):
+                    parts, used_mode = [("image/jpeg", encoded)], "images"
+
+    sent = sum(len(data) for _, data in parts)
+    stats = {
+        "original_bytes": len(original),
+        "sent_bytes": sent,
+        "mode": used_mode,
+        "pages": len(pages) if pages is not None else None,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    metrics.inc("gemini.sent_bytes", sent)
+    logger.info(f"Gemini payload for {file_path.name}: {len(original)} -> {sent} bytes "
+                f"({used_mode}, {stats['seconds']}s)")
+    return parts, stats
@@ -0,0 +1,107 @@
+"""Shared Marker models that are only loaded when a conversion needs them."""
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+from src.core.metrics import metrics, rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# Marker artifact name -> (module, class); the same set marker.models.create_model_dict() builds
+MARKER_MODELS = {
+    "layout_model": ("surya.layout", "LayoutPredictor"),
+    "texify_model": ("surya.texify", "TexifyPredictor"),
+    "recognition_model": ("surya.recognition", "RecognitionPredictor"),
+    "table_rec_model": ("surya.table_rec", "TableRecPredictor"),
+    "detection_model": ("surya.detection", "DetectionPredictor"),
+    "inline_detection_model": ("surya.detection", "InlineDetectionPredictor"),
+    "ocr_error_model": ("surya.ocr_error", "OCRErrorPredictor"),
+}
+
+# Models loaded up front for each OCR method; everything else loads on first use
+PRELOAD = {
+    "no_ocr": ["layout_model"],
+    "force_ocr": ["layout_model", "detection_model", "recognition_model"],
+}
+
+
+class LazyModel:
+    """
+    Stands in for a Marker predictor until something uses it.
+
+    Marker hands every artifact to its builders and processors up front,
+    but most are only called for some documents (OCR, tables, equations).
+    The real predictor is created on the first call or attribute read.
+    Attributes set before that (e.g. ``disable_tqdm``) are applied once it
+    loads.
+    """
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_markit_name", name)
+        object.__setattr__(self, "_markit_model", None)
+        object.__setattr__(self, "_markit_pending", {})
+        object.__setattr__(self, "_markit_lock", threading.Lock())
+
+    @property
+    def loaded(self) -> bool:
+        return self._markit_model is not None
+
+    def load(self) -> Any:
+        """Create the predictor if needed, recording its load time and memory."""
+        if self._markit_model is not None:
+            return self._markit_model
+        with self._markit_lock:
+            if self._markit_model is None:
+                name = self._markit_name
+                module_name, class_name = MARKER_MODELS[name]
+                rss_before = rss_bytes()
+                started = time.perf_counter()
+                model = getattr(importlib.import_module(module_name), class_name)()
+                seconds = time.perf_counter() - started
+                rss_delta = max(0, rss_bytes() - rss_before)
+                for attribute, value in self._markit_pending.items():
+                    setattr(model, attribute, value)
+                metrics.set_gauge(f"marker.models.{name}.load_seconds", round(seconds, 3))
+                metrics.set_gauge(f"marker.models.{name}.rss_bytes", rss_delta)
+                metrics.inc("marker.models_loaded")
+                logger.info(f"Loaded Marker {name} in {seconds:.1f}s (+{rss_delta / 2**20:.0f} MiB RSS)")
+                object.__setattr__(self, "_markit_model", model)
+        return self._markit_model
+
+    def __getattr__(self, attribute: str) -> Any:
+        pending = self.__dict__.get("_markit_pending", {})
+        if self.__dict__.get("_markit_model") is None and attribute in pending:
+            return pending[attribute]
+        return getattr(self.load(), attribute)
+
+    def __setattr__(self, attribute: str, value: Any) -> None:
+        with self._markit_lock:
+            if self._markit_model is None:
+                self._markit_pending[attribute] = value
+                return
+        setattr(self._markit_model, attribute, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+
+_models: Dict[str, LazyModel] = {name: LazyModel(name) for name in MARKER_MODELS}
+
+
+def get_model_dict(ocr_method: str = "no_ocr") -> Dict[str, LazyModel]:
+    """
+    Marker's artifact dict with the models this OCR method needs loaded.
+
+    The models are shared by every conversion in the process.
+    """
+    for name in PRELOAD.get(ocr_method, PRELOAD["no_ocr"]):
+        _models[name].load()
+    return dict(_models)
+
+
+def loaded_models() -> List[str]:
+    """Names of the models loaded so far."""
+    return [name for name, model in _models.items() if model.loaded]
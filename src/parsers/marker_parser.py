@@ -3,14 +3,19 @@ from typing import Dict, List, Optional, Any, Union
 import subprocess
 import tempfile
 import os
+import re
 import json
 
-from src.parsers.parser_interface import DocumentParser
+from src.parsers.parser_interface import DocumentParser, ParseResult
 from src.parsers.parser_registry import ParserRegistry
+from src.core.serialization import iter_jsonl, write_chunks
+from src.parsers.marker_models import get_model_dict
 from marker.converters.pdf import PdfConverter
-from marker.models import create_model_dict
 from marker.output import text_from_rendered
 
+# Separator Marker inserts before each page when paginate_output is enabled
+PAGE_SEPARATOR_PATTERN = re.compile(r"\n\n\{(\d+)\}-{48}\n\n")
+
 
 class MarkerParser(DocumentParser):
     """Parser implementation using Marker."""
@@ -19,6 +24,10 @@ class MarkerParser(DocumentParser):
     def get_name(cls) -> str:
         return "Marker"
     
+    @classmethod
+    def supports_page_output(cls) -> bool:
+        return True
+    
     @classmethod
     def get_supported_ocr_methods(cls) -> List[Dict[str, Any]]:
         return [
@@ -37,17 +46,45 @@ class MarkerParser(DocumentParser):
     def parse(self, file_path: Union[str, Path], ocr_method: Optional[str] = None, **kwargs) -> str:
         """Parse a document using Marker."""
         force_ocr = ocr_method == "force_ocr"
+        output_format = kwargs.get("output_format", "markdown")
+        with_pages = kwargs.get("with_pages", False)
+        paginate = output_format.lower() == "jsonl" or with_pages
         
+        # Shared models; those this configuration does not need load only if a document uses them
         converter = PdfConverter(
-            artifact_dict=create_model_dict(),
-            config={"force_ocr": force_ocr}
+            artifact_dict=get_model_dict("force_ocr" if force_ocr else "no_ocr"),
+            config={"force_ocr": force_ocr, "paginate_output": paginate}
         )
         rendered = converter(str(file_path))
         content, _, _ = text_from_rendered(rendered)
         
+        # Strip Marker's page separators but keep the per-page split
+        records = None
+        if paginate:
+            records = self._split_pages(content)
+            pages = [record["content"] for record in records]
+            content = "\n\n".join(pages)
+        
         # Format the content based on the requested output format
-        output_format = kwargs.get("output_format", "markdown")
-        if output_format.lower() == "json":
+        result = self._format(content, output_format, records, **kwargs)
+        if with_pages and result != "Conversion cancelled.":
+            output_path = result.output_path if isinstance(result, ParseResult) else None
+            return ParseResult(result, output_path=output_path, pages=pages)
+        return result
+    
+    def _format(self, content: str, output_format: str,
+                records: Optional[List[Dict[str, Any]]] = None, **kwargs) -> str:
+        """Format Marker Markdown output in the requested output format."""
+        if output_format.lower() == "jsonl":
+            output_path = kwargs.get("output_path")
+            if output_path:
+                preview = write_chunks(iter_jsonl(records), output_path,
+                                       kwargs.get("check_cancellation"))
+                if preview is None:
+                    return "Conversion cancelled."
+                return ParseResult(preview, output_path=output_path)
+            return "".join(iter_jsonl(records))
+        elif output_format.lower() == "json":
             return json.dumps({"content": content}, ensure_ascii=False, indent=2)
         elif output_format.lower() == "text":
             return content.replace("#", "").replace("*", "").replace("_", "")
@@ -55,6 +92,18 @@ class MarkerParser(DocumentParser):
             return f"<doc>\n{content}\n</doc>"
         else:
             return content
+    
+    @staticmethod
+    def _split_pages(content: str) -> List[Dict[str, Any]]:
+        """Split paginated Marker output into one record per page."""
+        parts = PAGE_SEPARATOR_PATTERN.split(content)
+        if len(parts) == 1:
+            return [{"page": 1, "content": content.strip()}]
+        # parts = [preamble, page_id, page_content, page_id, page_content, ...]
+        return [
+            {"page": int(page_id) + 1, "content": page_content.strip()}
+            for page_id, page_content in zip(parts[1::2], parts[2::2])
+        ]
 
 
 # Register the parser with the registry
@@ -3,6 +3,29 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any, Union
 
 
+class ParseResult(str):
+    """
+    String result of a parse that can carry extra data alongside the content.
+
+    Behaves exactly like ``str`` so callers that only need the text keep
+    working, while callers that know about it can read the extra attributes.
+
+    Attributes:
+        output_path: Path of a file the parser already wrote the full output to
+        pages: Optional list of per-page content strings
+        metadata: Free-form dictionary with parser-specific details
+    """
+
+    def __new__(cls, content: str = "", output_path: Optional[str] = None,
+                pages: Optional[List[str]] = None,
+                metadata: Optional[Dict[str, Any]] = None):
+        obj = super().__new__(cls, content)
+        obj.output_path = output_path
+        obj.pages = pages
+        obj.metadata = metadata or {}
+        return obj
+
+
 class DocumentParser(ABC):
     """Base interface for all document parsers in the system."""
     
@@ -44,4 +67,14 @@ class DocumentParser(ABC):
     @classmethod
     def get_description(cls) -> str:
         """Return a description of this parser"""
-        return f"{cls.get_name()} document parser" 
\ No newline at end of file
+        return f"{cls.get_name()} document parser"
+    
+    @classmethod
+    def supports_page_output(cls) -> bool:
+        """Return True if parse() returns per-page content when called with with_pages=True"""
+        return False
+    
+    @classmethod
+    def supports_page_range(cls) -> bool:
+        """Return True if parse() can convert only the pages selected with page_range"""
+        return False 
\ No newline at end of file
@@ -29,6 +29,12 @@ class ParserRegistry:
         """Get a specific parser class by name"""
         return cls._parsers.get(name)
     
+    @classmethod
+    def supports_page_range(cls, name: str) -> bool:
+        """Return True if the parser can convert a selection of pages"""
+        parser_class = cls._parsers.get(name)
+        return bool(parser_class and parser_class.supports_page_range())
+    
     @classmethod
     def get_parser_names(cls) -> List[str]:
         """Get a list of all registered parser names"""
@@ -1,13 +1,17 @@
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union
-import json
 import pypdfium2 as pdfium
 
 from src.parsers.parser_interface import DocumentParser
 from src.parsers.parser_registry import ParserRegistry
+from src.parsers.docling_export import export_document
+from src.parsers.docling_native import is_native_document, convert_native
+from src.services.batch_inference import install_layout_batching
+from src.core.progress import install_docling_page_hook
+from src.core.model_optimization import is_cpu_optimised, apply_model_dir, optimise_converter
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
+from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions, AcceleratorDevice
 from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
 
 
@@ -18,6 +22,10 @@ class PyPdfiumParser(DocumentParser):
     def get_name(cls) -> str:
         return "PyPdfium"
     
+    @classmethod
+    def supports_page_output(cls) -> bool:
+        return True
+    
     @classmethod
     def get_supported_ocr_methods(cls) -> List[Dict[str, Any]]:
         return [
@@ -35,6 +43,27 @@ class PyPdfiumParser(DocumentParser):
     
     def parse(self, file_path: Union[str, Path], ocr_method: Optional[str] = None, **kwargs) -> str:
         """Parse a document using PyPdfium."""
+        # Office, HTML and Markdown files need no layout or OCR models
+        if is_native_document(file_path):
+            return convert_native(file_path, **kwargs)
+        
+        converter = self.build_converter(ocr_method, **kwargs)
+        
+        # Convert the document
+        result = converter.convert(Path(file_path))
+        doc = result.document
+        
+        # Return the content in the requested format
+        return export_document(
+            doc,
+            output_format=kwargs.get("output_format", "markdown"),
+            output_path=kwargs.get("output_path"),
+            check_cancellation=kwargs.get("check_cancellation"),
+            with_pages=kwargs.get("with_pages", False),
+        )
+    
+    def build_converter(self, ocr_method: Optional[str] = None, **kwargs) -> DocumentConverter:
+        """Create a DocumentConverter for PDFs with the given OCR method and job options."""
         pipeline_options = PdfPipelineOptions()
         pipeline_options.do_table_structure = True
         pipeline_options.table_structure_options.do_cell_matching = True
@@ -48,6 +77,17 @@ class PyPdfiumParser(DocumentParser):
         else:
             pipeline_options.do_ocr = False
         
+        # Use the thread allotment from the CPU budget
+        if "num_threads" in kwargs:
+            pipeline_options.accelerator_options = AcceleratorOptions(
+                num_threads=kwargs["num_threads"], device=AcceleratorDevice.AUTO
+            )
+        
+        # Optionally load models from the local model directory
+        cpu_optimised = is_cpu_optimised(self.get_name(), kwargs)
+        if cpu_optimised:
+            apply_model_dir(pipeline_options)
+        
         # Create the converter
         converter = DocumentConverter(
             format_options={
@@ -58,21 +98,18 @@ class PyPdfiumParser(DocumentParser):
             }
         )
         
-        # Convert the document
-        result = converter.convert(Path(file_path))
-        doc = result.document
+        # Swap in the int8 / ONNX models before converting
+        if cpu_optimised:
+            optimise_converter(converter, InputFormat.PDF)
         
-        # Return the content in the requested format
-        output_format = kwargs.get("output_format", "markdown")
-        if output_format.lower() == "json":
-            return json.dumps(doc.export_to_dict(), ensure_ascii=False, indent=2)
-        elif output_format.lower() == "text":
-            return doc.export_to_text()
-        elif output_format.lower() == "document_tags":
-            return doc.export_to_document_tokens()
-        else:
-            return doc.export_to_markdown()
+        return converter
+
+
+# Share layout-model batches across concurrent conversions
+install_layout_batching()
 
+# Report per-page progress from the layout model
+install_docling_page_hook()
 
 # Register the parser with the registry
 ParserRegistry.register(PyPdfiumParser) 
\ No newline at end of file
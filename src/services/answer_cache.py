@@ -0,0 +1,243 @@
+"""Cache of document chat answers keyed by document content and question."""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".markit", "chat_cache.db")
+CHAT_CACHE_PATH = os.getenv("MARKIT_CHAT_CACHE_PATH", DEFAULT_CACHE_PATH)
+# Answers are shared by everyone asking about the same document, so the cache is opt-in
+CHAT_CACHE_ENABLED = os.getenv("MARKIT_CHAT_CACHE_ENABLED", "0") == "1"
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("MARKIT_CHAT_CACHE_MAX_ENTRIES", "10000"))
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("MARKIT_CHAT_CACHE_TTL_SECONDS", "86400"))
+# Also answer questions phrased differently from a cached one (needs an embedding model)
+CHAT_CACHE_SEMANTIC = os.getenv("MARKIT_CHAT_CACHE_SEMANTIC", "0") == "1"
+# Cosine similarity above which two questions about a document count as the same
+CHAT_CACHE_SIMILARITY = float(os.getenv("MARKIT_CHAT_CACHE_SIMILARITY", "0.92"))
+# Cached questions per document compared against a new one
+SEMANTIC_CANDIDATES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    document_hash TEXT NOT NULL,
+    context_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    embedding BLOB,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answers_document ON answers(document_hash, model, context_hash);
+CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers(last_used);
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+def normalise_question(question: str) -> str:
+    """Fold case, width and whitespace and drop trailing punctuation."""
+    text = unicodedata.normalize("NFKC", question or "").casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?!.")
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def conversation_hash(messages: List[Dict[str, str]]) -> str:
+    """Identity of the earlier turns an answer depends on; empty for a fresh conversation."""
+    if not messages:
+        return ""
+    return _digest(*(f"{m['role']}:{m['content']}" for m in messages))
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """
+    SQLite-backed store of chat answers.
+
+    Answers are keyed by the document's content hash, the chat model, the
+    normalised question and the earlier turns of the conversation, so only
+    an identical question in an identical conversation is answered from
+    the cache. With an embedding function, a question that opens a
+    conversation can also match a differently phrased cached one; question
+    embeddings are cached too. Entries expire after ``ttl_seconds`` and
+    the least recently used are evicted above ``max_entries``.
+    """
+
+    def __init__(self, db_path: str = CHAT_CACHE_PATH, max_entries: int = CHAT_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = CHAT_CACHE_TTL_SECONDS,
+                 embed: Optional[Callable[[str], List[float]]] = None,
+                 embedding_model: str = "", similarity: float = CHAT_CACHE_SIMILARITY):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embed = embed
+        self.embedding_model = embedding_model
+        self.similarity = similarity
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, document: str, question: str, previous_turns: List[Dict[str, str]],
+            model: str) -> Optional[str]:
+        """Return a cached answer, or None; records hit and miss metrics."""
+        document_hash = _digest(document)
+        context_hash = conversation_hash(previous_turns)
+        normalised = normalise_question(question)
+        key = _digest(document_hash, context_hash, model, normalised)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT answer FROM answers WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+        if row is not None:
+            self._record("hits")
+            return row[0]
+
+        # Near-duplicates only for questions that open a conversation
+        if self.embed is not None and not context_hash:
+            answer = self._semantic_get(document_hash, model, normalised, now)
+            if answer is not None:
+                self._record("semantic_hits")
+                return answer
+        self._record("misses")
+        return None
+
+    def put(self, document: str, question: str, previous_turns: List[Dict[str, str]],
+            model: str, answer: str) -> None:
+        """Store an answer and evict expired and least recently used entries."""
+        document_hash = _digest(document)
+        context_hash = conversation_hash(previous_turns)
+        normalised = normalise_question(question)
+        embedding = None
+        if self.embed is not None and not context_hash:
+            vector = self._embedding(normalised)
+            embedding = array("f", vector).tobytes() if vector else None
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, document_hash, context_hash, model, question, answer, "
+                "embedding, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (_digest(document_hash, context_hash, model, normalised), document_hash, context_hash,
+                 model, normalised, answer, embedding, now, now),
+            )
+            self._conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl_seconds,))
+            self._conn.execute("DELETE FROM embeddings WHERE last_used <= ?", (now - self.ttl_seconds,))
+            for table in ("answers", "embeddings"):
+                count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                if count > self.max_entries:
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE key IN "
+                        f"(SELECT key FROM {table} ORDER BY last_used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+
+    def _semantic_get(self, document_hash: str, model: str, normalised: str, now: float) -> Optional[str]:
+        vector = self._embedding(normalised)
+        if not vector:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, answer, embedding FROM answers WHERE document_hash = ? AND model = ? "
+                "AND context_hash = '' AND embedding IS NOT NULL AND created_at > ? "
+                "ORDER BY last_used DESC LIMIT ?",
+                (document_hash, model, now - self.ttl_seconds, SEMANTIC_CANDIDATES),
+            ).fetchall()
+        best, best_score = None, self.similarity
+        for key, answer, blob in rows:
+            score = _cosine(vector, array("f", blob))
+            if score >= best_score:
+                best, best_score = (key, answer), score
+        if best is None:
+            return None
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, best[0]))
+        return best[1]
+
+    def _embedding(self, normalised: str) -> Optional[List[float]]:
+        """Embed a normalised question, reusing earlier embeddings of the same text."""
+        key = _digest(self.embedding_model, normalised)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (now, key))
+        if row is not None:
+            metrics.inc("chat.embedding_cache.hits")
+            return list(array("f", row[0]))
+        metrics.inc("chat.embedding_cache.misses")
+        try:
+            vector = list(self.embed(normalised))
+        except Exception as e:
+            logger.warning(f"Could not embed chat question: {e}")
+            return None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                (key, array("f", vector).tobytes(), now),
+            )
+        return vector
+
+    @staticmethod
+    def _record(outcome: str) -> None:
+        metrics.inc(f"chat.cache.{outcome}")
+        hits = metrics.get("chat.cache.hits") + metrics.get("chat.cache.semantic_hits")
+        total = hits + metrics.get("chat.cache.misses")
+        metrics.set_gauge("chat.cache.hit_rate", round(hits / total, 3) if total else 0.0)
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache(embed: Optional[Callable[[str], List[float]]] = None,
+                     embedding_model: str = "") -> Optional[AnswerCache]:
+    """
+    Return the shared answer cache, or None if it is disabled (the default) or unavailable.
+
+    ``embed`` is used for near-duplicate matching when
+    MARKIT_CHAT_CACHE_SEMANTIC=1; only the first call's arguments count.
+    """
+    global _cache
+    if not CHAT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = AnswerCache(CHAT_CACHE_PATH, embed=embed if CHAT_CACHE_SEMANTIC else None,
+                                     embedding_model=embedding_model)
+            except Exception as e:
+                logger.error(f"Could not open chat cache at {CHAT_CACHE_PATH}: {e}")
+                return None
+    return _cache
@@ -0,0 +1,224 @@
+"""Shared in-process batching of model inference across concurrent conversions."""
+
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Replaces LayoutPredictor.predict with a reimplementation of its internals, so it is opt-in
+BATCH_INFERENCE_ENABLED = os.getenv("MARKIT_BATCH_INFERENCE", "0") == "1"
+MAX_BATCH_SIZE = int(os.getenv("MARKIT_BATCH_MAX_SIZE", "8"))
+# Longest time the first request of a batch waits for others to join
+MAX_BATCH_WAIT_MS = float(os.getenv("MARKIT_BATCH_MAX_WAIT_MS", "10"))
+
+
+class InferenceBatcher:
+    """
+    Collects single-item inference requests from many threads and runs them
+    through the model in dynamically sized batches.
+
+    A request never waits longer than ``max_wait_ms`` for other requests to
+    arrive, so a lone job only pays that deadline on top of its own inference.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], name: str,
+                 max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_BATCH_WAIT_MS):
+        self.run_batch = run_batch
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=f"markit-batch-{name}", daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Any:
+        """Queue an item and block until its result is ready."""
+        if self._closed:
+            raise RuntimeError(f"{self.name} batcher is closed")
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Stop the worker thread once the requests already queued have run."""
+        self._closed = True
+        self._queue.put(None)
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._execute(batch)
+            # Drop references to the finished requests before blocking again
+            del batch, entry
+            if stop:
+                return
+
+    def _execute(self, batch) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = self.run_batch(items)
+        except Exception as e:
+            logger.error(f"Batched {self.name} inference failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        if len(results) != len(items):
+            # Never leave a caller waiting on an unresolved future
+            error = RuntimeError(f"Batched {self.name} inference returned {len(results)} results "
+                                 f"for {len(items)} items")
+            logger.error(str(error))
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        metrics.inc(f"batch_inference.{self.name}.batches")
+        metrics.inc(f"batch_inference.{self.name}.items", len(items))
+        metrics.set_gauge(f"batch_inference.{self.name}.last_batch_size", len(items))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+# --- Docling layout model -------------------------------------------------
+
+# Layout model -> {(device, threshold, image size): batcher}; entries go away with the model
+_layout_batchers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_layout_lock = threading.Lock()
+_layout_installed = False
+
+
+def _layout_key(predictor) -> Any:
+    """Predictors sharing a model object batch together only if their inference settings match."""
+    return (str(getattr(predictor, "_device", "")), getattr(predictor, "_threshold", None),
+            getattr(predictor, "_image_size", None))
+
+
+def _run_layout_batch(requests: List[Any]) -> List[List[Dict[str, Any]]]:
+    """Run a batch of (predictor, page image) requests through their shared layout model."""
+    import numpy as np
+    import torch
+    from PIL import Image
+
+    # Every request in a batch has the same model and inference settings
+    predictor = requests[0][0]
+    images = [image for _, image in requests]
+    pil_images = [
+        (img if isinstance(img, Image.Image) else Image.fromarray(np.asarray(img))).convert("RGB")
+        for img in images
+    ]
+    resize = {"height": predictor._image_size, "width": predictor._image_size}
+    with torch.inference_mode():
+        inputs = predictor._image_processor(
+            images=pil_images, return_tensors="pt", size=resize
+        ).to(predictor._device)
+        outputs = predictor._model(**inputs)
+        results = predictor._image_processor.post_process_object_detection(
+            outputs,
+            target_sizes=torch.tensor([img.size[::-1] for img in pil_images]),
+            threshold=predictor._threshold,
+        )
+
+    batch_predictions = []
+    for result, img in zip(results, pil_images):
+        w, h = img.size
+        predictions = []
+        for score, label_id, box in zip(result["scores"], result["labels"], result["boxes"]):
+            label_str = predictor._classes_map[int(label_id.item()) + 1]
+            if label_str in predictor._black_classes:
+                continue
+            left, top, right, bottom = [float(b.item()) for b in box]
+            predictions.append({
+                "l": min(w, max(0, left)),
+                "t": min(h, max(0, top)),
+                "r": min(w, max(0, right)),
+                "b": min(h, max(0, bottom)),
+                "label": label_str,
+                "confidence": float(score.item()),
+            })
+        batch_predictions.append(predictions)
+    return batch_predictions
+
+
+def _get_layout_batcher(predictor) -> InferenceBatcher:
+    model = predictor._model
+    key = _layout_key(predictor)
+    with _layout_lock:
+        batchers = _layout_batchers.get(model)
+        if batchers is None:
+            batchers = {}
+            _layout_batchers[model] = batchers
+            # Stop the worker threads when the model is garbage collected
+            weakref.finalize(model, _close_batchers, batchers)
+        batcher = batchers.get(key)
+        if batcher is None:
+            batcher = InferenceBatcher(_run_layout_batch, name="layout")
+            batchers[key] = batcher
+    return batcher
+
+
+def _close_batchers(batchers: Dict[Any, InferenceBatcher]) -> None:
+    for batcher in batchers.values():
+        batcher.close()
+
+
+def install_layout_batching() -> bool:
+    """
+    Route every Docling layout prediction through a shared batcher.
+
+    Relies on the LayoutPredictor internals of docling-ibm-models 3.4; if
+    they are not present the original per-page predict() is kept.
+
+    Returns:
+        bool: True if batching is active
+    """
+    global _layout_installed
+    if not BATCH_INFERENCE_ENABLED:
+        return False
+    with _layout_lock:
+        if _layout_installed:
+            return True
+        try:
+            from docling_ibm_models.layoutmodel.layout_predictor import LayoutPredictor
+        except ImportError:
+            return False
+        original_predict = LayoutPredictor.predict
+        required = ("_image_processor", "_model", "_device", "_threshold", "_classes_map",
+                    "_black_classes", "_image_size")
+
+        def batched_predict(self, orig_img):
+            if not all(hasattr(self, attr) for attr in required):
+                return original_predict(self, orig_img)
+            try:
+                return _get_layout_batcher(self).submit((self, orig_img))
+            except Exception:
+                # Fall back to the unbatched path so the page still converts
+                return list(original_predict(self, orig_img))
+
+        LayoutPredictor.predict = batched_predict
+        _layout_installed = True
+    logger.info(f"Batched layout inference enabled (max batch {MAX_BATCH_SIZE}, max wait {MAX_BATCH_WAIT_MS}ms)")
+    return True
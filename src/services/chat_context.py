@@ -0,0 +1,214 @@
+"""Token budgeting for document chat: document context and conversation history."""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Tokens available for the document in each request
+DOCUMENT_TOKEN_BUDGET = int(os.getenv("MARKIT_CHAT_DOCUMENT_TOKENS", "60000"))
+# Tokens available for earlier conversation turns in each request
+HISTORY_TOKEN_BUDGET = int(os.getenv("MARKIT_CHAT_HISTORY_TOKENS", "4000"))
+# Most recent messages that are always sent verbatim
+RECENT_MESSAGES = int(os.getenv("MARKIT_CHAT_RECENT_MESSAGES", "6"))
+# Older messages are summarised in blocks of this size, each block only once
+SUMMARY_BLOCK_MESSAGES = int(os.getenv("MARKIT_CHAT_SUMMARY_BLOCK", "6"))
+
+DOCUMENT_CHUNK_TOKENS = 400
+# Rough characters per token when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encodings: Dict[str, object] = {}
+_encodings_lock = threading.Lock()
+
+
+def _get_encoding(model: str):
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Count tokens locally, estimating from length if tiktoken is missing."""
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_get_encoding(model).encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """Cut text down to at most ``max_tokens`` tokens."""
+    if max_tokens <= 0:
+        return ""
+    if TIKTOKEN_AVAILABLE:
+        encoding = _get_encoding(model)
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+def _terms(text: str) -> List[str]:
+    return [term for term in re.findall(r"\w+", text.lower()) if len(term) > 2]
+
+
+def _split_chunks(document: str, model: str) -> List[Tuple[str, int]]:
+    """Split a document into paragraph-aligned chunks of roughly DOCUMENT_CHUNK_TOKENS."""
+    chunks: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for paragraph in re.split(r"\n\s*\n", document):
+        tokens = count_tokens(paragraph, model)
+        if current and current_tokens + tokens > DOCUMENT_CHUNK_TOKENS:
+            chunks.append(("\n\n".join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append(("\n\n".join(current), current_tokens))
+    return chunks
+
+
+def select_document_context(document: str, question: str, budget: int = DOCUMENT_TOKEN_BUDGET,
+                            model: str = "gpt-4o") -> str:
+    """
+    Fit a document into a token budget.
+
+    Documents within budget are sent whole. Larger documents are split into
+    chunks; the opening chunk and the chunks sharing most terms with the
+    question are kept, in document order.
+    """
+    if count_tokens(document, model) <= budget:
+        return document
+    chunks = _split_chunks(document, model)
+    question_terms = set(_terms(question))
+
+    def score(index: int) -> float:
+        terms = _terms(chunks[index][0])
+        if not terms:
+            return 0.0
+        return sum(1 for term in terms if term in question_terms) / len(terms) ** 0.5
+
+    order = [0] + sorted(range(1, len(chunks)), key=score, reverse=True)
+    selected, used = set(), 0
+    for index in order:
+        tokens = chunks[index][1]
+        if used + tokens > budget:
+            continue
+        selected.add(index)
+        used += tokens
+    if not selected:
+        return truncate_to_tokens(document, budget, model)
+    parts = []
+    previous = None
+    for index in sorted(selected):
+        if previous is not None and index != previous + 1:
+            parts.append("[...]")
+        parts.append(chunks[index][0])
+        previous = index
+    return "\n\n".join(parts)
+
+
+class HistoryCompactor:
+    """
+    Keeps recent messages verbatim and replaces older ones with summaries.
+
+    Older messages are summarised in fixed blocks, and each block's summary
+    is cached, so a long conversation costs at most one summary call every
+    SUMMARY_BLOCK_MESSAGES messages. Without a summariser, older messages
+    are shortened locally instead.
+    """
+
+    def __init__(self, summarise: Optional[Callable[[List[Dict[str, str]]], str]] = None,
+                 history_budget: int = HISTORY_TOKEN_BUDGET, recent_messages: int = RECENT_MESSAGES,
+                 block_messages: int = SUMMARY_BLOCK_MESSAGES, model: str = "gpt-4o",
+                 cache_size: int = 1024):
+        self.summarise = summarise
+        self.history_budget = history_budget
+        self.recent_messages = recent_messages
+        self.block_messages = max(1, block_messages)
+        self.model = model
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compact(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Return the messages to send for ``history`` within the history budget."""
+        history = [{"role": m["role"], "content": str(m.get("content") or "")} for m in history]
+        # Whole blocks of older messages are summarised; the remainder stays verbatim
+        older_count = max(0, len(history) - self.recent_messages)
+        older_count -= older_count % self.block_messages
+        older, recent = history[:older_count], history[older_count:]
+
+        summaries = [self._summarise_block(older[i:i + self.block_messages])
+                     for i in range(0, len(older), self.block_messages)]
+        recent_tokens = sum(self._message_tokens(m) for m in recent)
+
+        # Spend what is left of the budget on the newest summaries
+        remaining = self.history_budget - recent_tokens
+        kept: List[str] = []
+        for summary in reversed(summaries):
+            tokens = count_tokens(summary, self.model) + MESSAGE_OVERHEAD_TOKENS
+            if tokens > remaining:
+                break
+            kept.insert(0, summary)
+            remaining -= tokens
+
+        # Drop the oldest verbatim messages if they alone exceed the budget
+        while recent and recent_tokens > self.history_budget and len(recent) > 1:
+            recent_tokens -= self._message_tokens(recent.pop(0))
+
+        messages = []
+        if kept:
+            messages.append({"role": "system",
+                             "content": "Summary of earlier conversation:\n" + "\n".join(kept)})
+        return messages + recent
+
+    def _message_tokens(self, message: Dict[str, str]) -> int:
+        return count_tokens(message["content"], self.model) + MESSAGE_OVERHEAD_TOKENS
+
+    def _summarise_block(self, block: List[Dict[str, str]]) -> str:
+        key = hashlib.sha256(
+            "\x00".join(f"{m['role']}:{m['content']}" for m in block).encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        summary = None
+        if self.summarise is not None:
+            try:
+                summary = self.summarise(block)
+            except Exception as e:
+                logger.warning(f"Could not summarise chat history, shortening instead: {e}")
+        if not summary:
+            summary = "\n".join(
+                f"- {m['role']}: {truncate_to_tokens(m['content'], 60, self.model)}" for m in block
+            )
+        with self._lock:
+            self._cache[key] = summary
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return summary
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = "gpt-4o") -> int:
+    """Tokens a list of chat messages will use as a prompt."""
+    return sum(count_tokens(m["content"], model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
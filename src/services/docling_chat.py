@@ -1,5 +1,14 @@
 import openai
 import os
+import logging
+
+from src.core.metrics import metrics
+from src.services.answer_cache import get_answer_cache
+from src.services.chat_context import (
+    HistoryCompactor,
+    count_message_tokens,
+    select_document_context,
+)
 
 # Load API key from environment variable
 openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -8,22 +17,89 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 if not openai.api_key:
     print("Warning: OPENAI_API_KEY environment variable not found. Chat functionality may not work.")
 
+CHAT_MODEL = os.getenv("MARKIT_CHAT_MODEL", "gpt-4o-2024-08-06")
+# Model used to summarise older turns; empty to shorten them locally instead
+SUMMARY_MODEL = os.getenv("MARKIT_CHAT_SUMMARY_MODEL", "gpt-4o-mini")
+# Model used to embed questions for near-duplicate answer cache matches
+EMBEDDING_MODEL = os.getenv("MARKIT_CHAT_EMBEDDING_MODEL", "text-embedding-3-small")
+
+
+def _summarise_turns(messages):
+    """Summarise a block of older chat messages with the summary model."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = openai.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": "Summarise this part of a conversation about a document in a few "
+                                          "short bullet points. Keep facts, names and numbers."},
+            {"role": "user", "content": transcript},
+        ],
+        max_tokens=200,
+    )
+    return response.choices[0].message.content
+
+
+def _embed_question(text):
+    """Embed a chat question with the embedding model."""
+    response = openai.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    return response.data[0].embedding
+
+
+_history_compactor = HistoryCompactor(
+    summarise=_summarise_turns if SUMMARY_MODEL else None,
+    model=CHAT_MODEL,
+)
+
+
 def chat_with_document(message, history, document_text_state):
     history = history or []
+    previous_turns = _history_compactor.compact(history)
     history.append({"role": "user", "content": message})
 
-    context = f"Document: {document_text_state}\n\nUser: {message}"
+    document_text = document_text_state or ""
+    answer_cache = get_answer_cache(embed=_embed_question, embedding_model=EMBEDDING_MODEL)
+    if answer_cache is not None:
+        cached = answer_cache.get(document_text, message, previous_turns, CHAT_MODEL)
+        if cached is not None:
+            logging.info("Chat turn answered from cache")
+            history.append({"role": "assistant", "content": cached})
+            return history, history
+
+    # Only the parts of the document that fit the budget are sent
+    document_context = select_document_context(document_text, message, model=CHAT_MODEL)
+    context = f"Document: {document_context}"
+    messages = (
+        [{"role": "system", "content": context}]
+        + previous_turns
+        + [{"role": "user", "content": message}]
+    )
+
+    prompt_tokens = count_message_tokens(messages, CHAT_MODEL)
+    metrics.inc("chat.turns")
+    metrics.inc("chat.prompt_tokens", prompt_tokens)
+    metrics.set_gauge("chat.last_prompt_tokens", prompt_tokens)
+    logging.info(f"Chat turn: {prompt_tokens} prompt tokens ({len(previous_turns)} history messages)")
 
     # Add error handling for API calls
     try:
         response = openai.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[{"role": "system", "content": context}] + history
+            model=CHAT_MODEL,
+            messages=messages
         )
         reply = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.inc("chat.billed_prompt_tokens", usage.prompt_tokens)
+            metrics.inc("chat.completion_tokens", usage.completion_tokens)
     except Exception as e:
         reply = f"Error: Could not generate response. Please check your OpenAI API key. Details: {str(e)}"
         print(f"OpenAI API error: {str(e)}")
-    
+    else:
+        if answer_cache is not None and reply:
+            try:
+                answer_cache.put(document_text, message, previous_turns, CHAT_MODEL, reply)
+            except Exception as e:
+                logging.warning(f"Could not cache chat answer: {e}")
+
     history.append({"role": "assistant", "content": reply})
     return history, history
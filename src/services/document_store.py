@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Location of the library database. The library is shared by every visitor and has no
+# per-user scoping, so it is off unless MARKIT_LIBRARY_ENABLED=1 (single-user deployments)
+DEFAULT_LIBRARY_PATH = os.path.join(os.path.expanduser("~"), ".markit", "library.db")
+LIBRARY_PATH = os.getenv("MARKIT_LIBRARY_PATH", DEFAULT_LIBRARY_PATH)
+LIBRARY_ENABLED = os.getenv("MARKIT_LIBRARY_ENABLED", "0") == "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    content_hash TEXT,
+    parser TEXT,
+    ocr_method TEXT,
+    output_format TEXT,
+    page_count INTEGER NOT NULL DEFAULT 0,
+    duration REAL,
+    created_at REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash);
+
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    page_no INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    UNIQUE(document_id, page_no)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    content, content='pages', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_fts(pages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+class DocumentStore:
+    """Persistent library of converted documents with a full-text index."""
+
+    def __init__(self, db_path: str = LIBRARY_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def add_document(self, filename: str, pages: List[str],
+                     parser: Optional[str] = None,
+                     ocr_method: Optional[str] = None,
+                     output_format: Optional[str] = None,
+                     duration: Optional[float] = None,
+                     content_hash: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Store a converted document page by page.
+
+        Args:
+            filename: Original file name
+            pages: Content of each page, in order
+            parser: Name of the parser used
+            ocr_method: Name of the OCR method used
+            output_format: Output format of the conversion
+            duration: Conversion time in seconds
+            content_hash: Hash of the source file
+            metadata: Any additional metadata to keep with the document
+
+        Returns:
+            int: ID of the stored document
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO documents (filename, content_hash, parser, ocr_method, output_format, "
+                "page_count, duration, created_at, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (filename, content_hash, parser, ocr_method, output_format, len(pages),
+                 duration, time.time(), json.dumps(metadata or {})),
+            )
+            document_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO pages (document_id, page_no, content) VALUES (?, ?, ?)",
+                [(document_id, page_no, content) for page_no, content in enumerate(pages, start=1)],
+            )
+        return document_id
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Full-text search over all stored pages.
+
+        Args:
+            query: Free-text query; every term must match
+            limit: Maximum number of results
+
+        Returns:
+            List of matching pages, best match first
+        """
+        match = self._to_match_expression(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.id AS document_id, d.filename, d.parser, d.ocr_method, p.page_no, "
+                "snippet(pages_fts, 0, '[', ']', ' ... ', 12) AS snippet, bm25(pages_fts) AS rank "
+                "FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid "
+                "JOIN documents d ON d.id = p.document_id "
+                "WHERE pages_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_page(self, document_id: int, page_no: int) -> Optional[str]:
+        """Return the content of a single page without loading the rest of the document."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM pages WHERE document_id = ? AND page_no = ?",
+                (document_id, page_no),
+            ).fetchone()
+        return row["content"] if row else None
+
+    def get_document(self, document_id: int) -> Optional[Dict[str, Any]]:
+        """Return the metadata of a stored document."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE id = ?", (document_id,)
+            ).fetchone()
+        if not row:
+            return None
+        document = dict(row)
+        document["metadata"] = json.loads(document["metadata"] or "{}")
+        return document
+
+    def list_documents(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Return stored documents, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, filename, parser, ocr_method, page_count, duration, created_at "
+                "FROM documents ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_document(self, document_id: int) -> None:
+        """Remove a document and its pages from the library."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE document_id = ?", (document_id,))
+            self._conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_match_expression(query: str) -> str:
+        """Quote each term so user input cannot inject FTS5 query syntax."""
+        terms = [term.replace('"', '""') for term in query.split()]
+        return " ".join(f'"{term}"' for term in terms if term)
+
+
+_store: Optional[DocumentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_document_store() -> Optional[DocumentStore]:
+    """Return the shared document store, or None if the library is disabled."""
+    global _store
+    if not LIBRARY_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = DocumentStore(LIBRARY_PATH)
+            except Exception as e:
+                logger.error(f"Could not open document library at {LIBRARY_PATH}: {e}")
+                return None
+    return _store
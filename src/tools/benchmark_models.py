@@ -0,0 +1,102 @@
+"""
+Compare the CPU-optimised (int8 / ONNX) models against fp32.
+
+Usage:
+    python -m src.tools.benchmark_models document.pdf [more.pdf ...] \\
+        --parser Docling --ocr "No OCR" --runs 3
+"""
+
+import argparse
+import difflib
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+from src import parsers  # noqa: F401  (registers the parsers)
+from src.parsers.parser_registry import ParserRegistry
+
+
+def _time_parse(file_path: str, parser_name: str, ocr_method_name: str,
+                cpu_optimised: bool, runs: int) -> Dict[str, Any]:
+    # Building the converter loads (and quantises) the models, so it is timed
+    # with the first conversion as the cold run. The timed runs reuse that
+    # converter, so they measure inference only.
+    parser_class = ParserRegistry.get_parser_class(parser_name)
+    if parser_class is None or not hasattr(parser_class, "build_converter"):
+        raise SystemExit(f"{parser_name} does not use Docling's models")
+    ocr_method_id = ParserRegistry.get_ocr_method_id(parser_name, ocr_method_name)
+
+    started = time.perf_counter()
+    converter = parser_class().build_converter(ocr_method_id, cpu_optimised=cpu_optimised)
+    content = converter.convert(file_path).document.export_to_markdown()
+    cold_seconds = time.perf_counter() - started
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        content = converter.convert(file_path).document.export_to_markdown()
+        timings.append(time.perf_counter() - started)
+    return {
+        "cold_seconds": cold_seconds,
+        "mean_seconds": statistics.mean(timings),
+        "content": content,
+    }
+
+
+def compare_outputs(reference: str, candidate: str) -> Dict[str, Any]:
+    """Summarise how far the optimised output drifts from the fp32 output."""
+    ref_lines = reference.splitlines()
+    cand_lines = candidate.splitlines()
+    matcher = difflib.SequenceMatcher(None, ref_lines, cand_lines, autojunk=False)
+    changed = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+    return {
+        "similarity": round(matcher.ratio(), 4),
+        "changed_lines": changed,
+        "reference_tables": reference.count("\n|---") + reference.count("\n| ---"),
+        "candidate_tables": candidate.count("\n|---") + candidate.count("\n| ---"),
+        "diff_sample": list(difflib.unified_diff(ref_lines, cand_lines, lineterm="", n=0))[:20],
+    }
+
+
+def benchmark(files: List[str], parser_name: str, ocr_method_name: str, runs: int) -> List[Dict[str, Any]]:
+    """
+    Convert each file with fp32 and CPU-optimised models.
+
+    Returns:
+        list of per-file reports with timings, speedup and output differences
+    """
+    reports = []
+    for file_path in files:
+        fp32 = _time_parse(file_path, parser_name, ocr_method_name, False, runs)
+        optimised = _time_parse(file_path, parser_name, ocr_method_name, True, runs)
+        reports.append({
+            "file": file_path,
+            "fp32_seconds": round(fp32["mean_seconds"], 3),
+            "optimised_seconds": round(optimised["mean_seconds"], 3),
+            "speedup": round(fp32["mean_seconds"] / max(optimised["mean_seconds"], 1e-9), 2),
+            "fp32_cold_seconds": round(fp32["cold_seconds"], 3),
+            "optimised_cold_seconds": round(optimised["cold_seconds"], 3),
+            "differences": compare_outputs(fp32["content"], optimised["content"]),
+        })
+    return reports
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("files", nargs="+", help="Documents to convert")
+    arg_parser.add_argument("--parser", default="Docling", help="Parser name (default: Docling)")
+    arg_parser.add_argument("--ocr", default="No OCR", help="OCR method display name (default: No OCR)")
+    arg_parser.add_argument("--runs", type=int, default=3, help="Timed runs per mode after a warm-up run")
+    args = arg_parser.parse_args()
+
+    reports = benchmark(args.files, args.parser, args.ocr, max(1, args.runs))
+    for report in reports:
+        diff = report["differences"]
+        print(f"{report['file']}: fp32 {report['fp32_seconds']}s, optimised {report['optimised_seconds']}s "
+              f"-> {report['speedup']}x, similarity {diff['similarity']}, {diff['changed_lines']} lines changed")
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Local stand-in for the Gemini API that records request sizes.
+
+The stub answers generateContent calls with fixed Markdown after a delay
+that models upload time (request bytes / --upload-mbps) plus a fixed
+processing time, and records the size and parts of every request. By
+default it converts the given documents once per payload mode and reports
+bytes sent and end-to-end latency.
+
+Usage:
+    python -m src.tools.gemini_stub scan.pdf report.pdf --pages "1-5" --upload-mbps 20
+
+    # Only run the stub; point the app at it with MARKIT_GEMINI_ENDPOINT
+    python -m src.tools.gemini_stub --serve --port 8765
+"""
+
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MODES = ["original", "subset", "images", "auto"]
+
+
+class _GeminiStubHandler(BaseHTTPRequestHandler):
+    """generateContent endpoint with simulated upload and processing time."""
+
+    upload_mbps = 10.0
+    latency_ms = 500.0
+    requests: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body or b"{}")
+        parts = [part for content in request.get("contents", []) for part in content.get("parts", [])]
+        inline = [part.get("inline_data") or part.get("inlineData") for part in parts]
+        inline = [data for data in inline if data]
+        record = {
+            "path": self.path,
+            "request_bytes": len(body),
+            "parts": len(parts),
+            "inline_bytes": sum(len(base64.b64decode(data["data"])) for data in inline),
+            "mime_types": sorted({data.get("mime_type") or data.get("mimeType") for data in inline}),
+        }
+        with self.lock:
+            self.requests.append(record)
+
+        time.sleep(len(body) / (self.upload_mbps * 1024 * 1024) + self.latency_ms / 1000.0)
+        payload = json.dumps({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": "# Stub\n\nConverted by the Gemini stub."}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": len(body) // 4, "candidatesTokenCount": 10,
+                              "totalTokenCount": len(body) // 4 + 10},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port: int = 0, upload_mbps: float = 10.0, latency_ms: float = 500.0) -> ThreadingHTTPServer:
+    """Start the stub and point the Gemini parser at it."""
+    _GeminiStubHandler.upload_mbps = upload_mbps
+    _GeminiStubHandler.latency_ms = latency_ms
+    server = ThreadingHTTPServer(("127.0.0.1", port), _GeminiStubHandler)
+    threading.Thread(target=server.serve_forever, name="markit-gemini-stub", daemon=True).start()
+    os.environ["MARKIT_GEMINI_ENDPOINT"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("GOOGLE_API_KEY", "gemini-stub")
+    return server
+
+
+def benchmark(documents: List[str], pages: Optional[str]) -> List[Dict[str, Any]]:
+    """Convert each document once per payload mode through the stub."""
+    from src.parsers.gemini_flash_parser import GeminiFlashParser
+
+    parser = GeminiFlashParser()
+    rows = []
+    for document in documents:
+        for mode in MODES:
+            before = len(_GeminiStubHandler.requests)
+            started = time.perf_counter()
+            result = parser.parse(document, page_range=pages, payload_mode=mode)
+            elapsed = time.perf_counter() - started
+            sent = _GeminiStubHandler.requests[before:]
+            rows.append({
+                "document": Path(document).name,
+                "mode": mode,
+                "file_bytes": os.path.getsize(document),
+                "request_bytes": sum(r["request_bytes"] for r in sent),
+                "inline_bytes": sum(r["inline_bytes"] for r in sent),
+                "parts": sum(r["parts"] for r in sent),
+                "seconds": round(elapsed, 3),
+                "ok": str(result).startswith("# Stub"),
+            })
+    return rows
+
+
+def print_rows(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'document':<28}{'mode':<10}{'file MB':>9}{'sent MB':>9}{'parts':>7}{'seconds':>9}")
+    for row in rows:
+        print(f"{row['document'][:27]:<28}{row['mode']:<10}{row['file_bytes'] / 2**20:>9.2f}"
+              f"{row['inline_bytes'] / 2**20:>9.2f}{row['parts']:>7}{row['seconds']:>9.2f}"
+              f"{'' if row['ok'] else '  (failed)'}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("documents", nargs="*", help="Documents to convert")
+    arg_parser.add_argument("--pages", help="Page selection to request, e.g. \"1-5\"")
+    arg_parser.add_argument("--upload-mbps", type=float, default=10.0, help="Simulated upload bandwidth (MiB/s)")
+    arg_parser.add_argument("--latency-ms", type=float, default=500.0, help="Simulated processing time")
+    arg_parser.add_argument("--serve", action="store_true", help="Only run the stub")
+    arg_parser.add_argument("--port", type=int, default=0, help="Port for --serve (default: any free port)")
+    arg_parser.add_argument("--json", help="Also write the results to this file")
+    args = arg_parser.parse_args()
+
+    server = start_stub(args.port, args.upload_mbps, args.latency_ms)
+    if args.serve:
+        print(f"Gemini stub listening; set MARKIT_GEMINI_ENDPOINT={os.environ['MARKIT_GEMINI_ENDPOINT']}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+    if not args.documents:
+        arg_parser.error("give at least one document, or --serve")
+
+    rows = benchmark(args.documents, args.pages)
+    print_rows(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
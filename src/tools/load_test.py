@@ -0,0 +1,295 @@
+"""
+Load test for the conversion and chat flow using a stub parser and a mock LLM.
+
+Simulated clients run upload -> queue -> convert -> render -> download -> chat
+through the same handlers the Gradio UI uses, and the tool reports throughput
+and latency percentiles per stage.
+
+Usage:
+    python -m src.tools.load_test --clients 8 --jobs 4 --pages 10 \\
+        --sleep-ms 200 --cpu-ms 50 --output-kb 64 --llm-latency-ms 300
+
+    # Serve the UI with the stub parser and mock LLM for manual testing
+    python -m src.tools.load_test --serve
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+# Keep load-test artefacts out of the real library, caches and history
+_workdir = tempfile.mkdtemp(prefix="markit-loadtest-")
+os.environ.setdefault("MARKIT_LIBRARY_ENABLED", "0")
+os.environ.setdefault("MARKIT_PAGE_CACHE_ENABLED", "0")
+os.environ.setdefault("MARKIT_OUTPUT_DIR", os.path.join(_workdir, "outputs"))
+os.environ.setdefault("MARKIT_THROUGHPUT_HISTORY_PATH", os.path.join(_workdir, "throughput.json"))
+os.environ.setdefault("OPENAI_API_KEY", "load-test")
+
+# The converter imports the parsers package as a top-level module, as app.py arranges
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pypdfium2 as pdfium
+
+from src.parsers.parser_interface import DocumentParser
+from src.parsers.parser_registry import ParserRegistry
+
+STAGES = ["upload", "queue", "convert", "render", "download", "chat"]
+PERCENTILES = [50, 90, 95, 99]
+
+
+class StubParser(DocumentParser):
+    """
+    Deterministic parser for load tests.
+
+    Sleeps, burns CPU and produces output of a configured size; the output
+    depends only on the input file's bytes.
+    """
+
+    sleep_ms = float(os.getenv("MARKIT_STUB_SLEEP_MS", "200"))
+    cpu_ms = float(os.getenv("MARKIT_STUB_CPU_MS", "50"))
+    output_kb = int(os.getenv("MARKIT_STUB_OUTPUT_KB", "64"))
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "Stub"
+
+    @classmethod
+    def get_supported_ocr_methods(cls) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": "none",
+                "name": "None",
+                "default_params": {}
+            }
+        ]
+
+    @classmethod
+    def get_description(cls) -> str:
+        return "Deterministic stub parser for load testing"
+
+    def parse(self, file_path: Union[str, Path], ocr_method: Optional[str] = None, **kwargs) -> str:
+        with open(file_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).digest()
+
+        # Burn CPU in slices so cancellation is still noticed
+        deadline = time.perf_counter() + self.cpu_ms / 1000.0
+        check_cancellation = kwargs.get("check_cancellation")
+        burn = digest
+        while time.perf_counter() < deadline:
+            burn = hashlib.sha256(burn).digest()
+            if check_cancellation and check_cancellation():
+                return "Conversion cancelled."
+        time.sleep(self.sleep_ms / 1000.0)
+
+        rng = random.Random(digest)
+        words = ["lorem", "ipsum", "dolor", "sit", "amet", "document", "table", "page", "markit"]
+        lines = ["# Stub document"]
+        size = 0
+        while size < self.output_kb * 1024:
+            line = " ".join(rng.choice(words) for _ in range(12))
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines)
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions endpoint with a fixed latency."""
+
+    latency_ms = 300.0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body or b"{}")
+        time.sleep(self.latency_ms / 1000.0)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        payload = json.dumps({
+            "id": "chatcmpl-loadtest",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "This is a mock answer."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": 6,
+                      "total_tokens": prompt_chars // 4 + 6},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_llm(latency_ms: float) -> ThreadingHTTPServer:
+    """Start the mock LLM on a free local port and point the OpenAI client at it."""
+    _MockLLMHandler.latency_ms = latency_ms
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockLLMHandler)
+    threading.Thread(target=server.serve_forever, name="markit-mock-llm", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    import openai
+    openai.base_url = base_url
+    return server
+
+
+def make_document(path: str, pages: int, seed: int) -> str:
+    """Write a blank PDF with the given number of pages; the seed varies its bytes."""
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(pages):
+        pdf.new_page(612 + seed % 7, 792)
+    pdf.save(path)
+    pdf.close()
+    return path
+
+
+class _Request:
+    """Stand-in for gr.Request with a per-client session."""
+
+    def __init__(self, session_hash: str):
+        self.session_hash = session_hash
+        self.username = None
+
+
+async def _client(client_id: int, jobs: int, pages: int, chat_turns: int,
+                  timings: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    from src.core.converter import submit_conversion
+    from src.core.scheduler import AdmissionRejected
+    from src.services.docling_chat import chat_with_document
+    from src.ui.ui import format_markdown_content
+
+    loop = asyncio.get_running_loop()
+    session = _Request(f"loadtest-{client_id}")
+    source = make_document(os.path.join(_workdir, f"client-{client_id}.pdf"), pages, client_id)
+
+    for job_no in range(jobs):
+        # Upload: Gradio copies the file into its cache
+        started = time.perf_counter()
+        upload_path = os.path.join(_workdir, f"upload-{client_id}-{job_no}.pdf")
+        await loop.run_in_executor(None, shutil.copyfile, source, upload_path)
+        timings["upload"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        try:
+            job = await submit_conversion(upload_path, "Stub", "None", "Markdown", user=session.session_hash)
+        except AdmissionRejected:
+            errors["queue"] += 1
+            continue
+        await job.wait_started()
+        timings["queue"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        content, download_path = await job
+        timings["convert"].append(time.perf_counter() - started)
+        if download_path is None:
+            errors["convert"] += 1
+            continue
+
+        started = time.perf_counter()
+        html = f"<div class='output-container'>{format_markdown_content(str(content))}</div>"
+        timings["render"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with open(download_path, "rb") as f:
+            while f.read(1024 * 1024):
+                pass
+        timings["download"].append(time.perf_counter() - started)
+
+        history = []
+        for turn in range(chat_turns):
+            started = time.perf_counter()
+            history, _ = await loop.run_in_executor(
+                None, chat_with_document, f"Question {turn} about the document?", history, html
+            )
+            timings["chat"].append(time.perf_counter() - started)
+            if str(history[-1]["content"]).startswith("Error"):
+                errors["chat"] += 1
+
+
+def summarise(timings: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles (in milliseconds) per stage."""
+    report = {"elapsed_seconds": round(elapsed, 3), "stages": {}}
+    for stage in STAGES:
+        values = sorted(timings[stage])
+        entry = {"count": len(values), "errors": errors[stage],
+                 "throughput_per_second": round(len(values) / elapsed, 3) if elapsed else 0.0}
+        if values:
+            for p in PERCENTILES:
+                index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+                entry[f"p{p}_ms"] = round(values[index] * 1000, 1)
+            entry["mean_ms"] = round(statistics.mean(values) * 1000, 1)
+            entry["max_ms"] = round(values[-1] * 1000, 1)
+        report["stages"][stage] = entry
+    return report
+
+
+async def run_load_test(clients: int, jobs: int, pages: int, chat_turns: int) -> Dict[str, Any]:
+    timings = {stage: [] for stage in STAGES}
+    errors = {stage: 0 for stage in STAGES}
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(i, jobs, pages, chat_turns, timings, errors) for i in range(clients)))
+    return summarise(timings, errors, time.perf_counter() - started)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Elapsed: {report['elapsed_seconds']}s")
+    header = f"{'stage':<10}{'count':>7}{'err':>5}{'/s':>9}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'max':>10}"
+    print(header)
+    for stage, entry in report["stages"].items():
+        row = f"{stage:<10}{entry['count']:>7}{entry['errors']:>5}{entry['throughput_per_second']:>9}"
+        row += "".join(f"{entry.get(f'p{p}_ms', '-'):>10}" for p in PERCENTILES)
+        row += f"{entry.get('max_ms', '-'):>10}"
+        print(row)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--clients", type=int, default=8, help="Concurrent simulated clients")
+    arg_parser.add_argument("--jobs", type=int, default=4, help="Conversions per client")
+    arg_parser.add_argument("--pages", type=int, default=10, help="Pages per test document")
+    arg_parser.add_argument("--chat-turns", type=int, default=2, help="Chat questions per conversion")
+    arg_parser.add_argument("--sleep-ms", type=float, default=StubParser.sleep_ms, help="Stub parser sleep per job")
+    arg_parser.add_argument("--cpu-ms", type=float, default=StubParser.cpu_ms, help="Stub parser CPU time per job")
+    arg_parser.add_argument("--output-kb", type=int, default=StubParser.output_kb, help="Stub parser output size")
+    arg_parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Mock LLM response time")
+    arg_parser.add_argument("--json", help="Also write the report to this file")
+    arg_parser.add_argument("--serve", action="store_true", help="Launch the UI with the stub parser instead")
+    args = arg_parser.parse_args()
+
+    StubParser.sleep_ms = args.sleep_ms
+    StubParser.cpu_ms = args.cpu_ms
+    StubParser.output_kb = args.output_kb
+    ParserRegistry.register(StubParser)
+    start_mock_llm(args.llm_latency_ms)
+
+    if args.serve:
+        from src.ui.ui import launch_ui
+        launch_ui(server_name="127.0.0.1", server_port=7860)
+        return
+
+    report = asyncio.run(run_load_test(args.clients, args.jobs, args.pages, args.chat_turns))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Soak test: run many conversions in one process and report RSS growth per job.
+
+Conversions go through convert_file() exactly as a worker runs them. RSS is
+sampled after every job (after garbage collection) and the growth rate is
+fitted over the jobs after the warm-up, so one-off model loading does not
+count as a leak.
+
+Usage:
+    python -m src.tools.soak_test --jobs 2000 --parser PyPdfium --ocr "No OCR" --pages 5
+    python -m src.tools.soak_test --jobs 5000 --stub --max-growth-kb 8
+
+Exits with status 1 if the growth rate exceeds --max-growth-kb.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, List
+
+# Reuse the load test's isolated environment (temp output dir, no library or page cache)
+from src.tools.load_test import StubParser, make_document, _workdir
+
+from src.core.metrics import rss_bytes
+from src.core.worker import release_memory
+
+
+def growth_per_job(samples: List[int]) -> float:
+    """Least-squares slope of RSS over job number, in bytes per job."""
+    n = len(samples)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(samples) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(samples))
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    return covariance / variance
+
+
+def soak(jobs: int, parser_name: str, ocr_method_name: str, output_format: str,
+         documents: List[str], warmup: int, report_every: int) -> Dict[str, Any]:
+    from src.core.converter import convert_file
+    from src.core.output_store import get_output_store
+
+    samples: List[int] = []
+    failures = 0
+    started = time.perf_counter()
+    baseline = rss_bytes()
+    for job_no in range(jobs):
+        content, download_path = convert_file(documents[job_no % len(documents)], parser_name,
+                                              ocr_method_name, output_format)
+        if download_path is None:
+            failures += 1
+        else:
+            # Downloads are not what we are measuring; keep the output directory small
+            get_output_store().discard(download_path)
+        del content
+        release_memory()
+        samples.append(rss_bytes())
+        if report_every and (job_no + 1) % report_every == 0:
+            print(f"{job_no + 1:>7} jobs  RSS {samples[-1] / 1024 / 1024:8.1f} MiB  "
+                  f"{(job_no + 1) / (time.perf_counter() - started):6.1f} jobs/s", flush=True)
+
+    measured = samples[warmup:] if len(samples) > warmup + 1 else samples
+    return {
+        "jobs": jobs,
+        "failures": failures,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "rss_start_mb": round(baseline / 1024 / 1024, 1),
+        "rss_after_warmup_mb": round(measured[0] / 1024 / 1024, 1),
+        "rss_end_mb": round(samples[-1] / 1024 / 1024, 1),
+        "rss_peak_mb": round(max(samples) / 1024 / 1024, 1),
+        "growth_kb_per_job": round(growth_per_job(measured) / 1024, 3),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--jobs", type=int, default=1000, help="Conversions to run")
+    arg_parser.add_argument("--parser", default="PyPdfium", help="Parser to use")
+    arg_parser.add_argument("--ocr", default="No OCR", help="OCR method display name")
+    arg_parser.add_argument("--format", default="Markdown", help="Output format display name")
+    arg_parser.add_argument("--stub", action="store_true", help="Use the load test's stub parser")
+    arg_parser.add_argument("--documents", nargs="*", help="Documents to cycle through (default: generated)")
+    arg_parser.add_argument("--pages", type=int, default=5, help="Pages per generated document")
+    arg_parser.add_argument("--warmup", type=int, default=20, help="Jobs excluded from the growth fit")
+    arg_parser.add_argument("--report-every", type=int, default=100, help="Progress line interval (0 = off)")
+    arg_parser.add_argument("--max-growth-kb", type=float, help="Fail if RSS grows faster than this per job")
+    arg_parser.add_argument("--json", help="Also write the report to this file")
+    args = arg_parser.parse_args()
+
+    parser_name, ocr_method_name = args.parser, args.ocr
+    if args.stub:
+        from src.parsers.parser_registry import ParserRegistry
+        StubParser.sleep_ms = 0
+        StubParser.cpu_ms = 0
+        ParserRegistry.register(StubParser)
+        parser_name, ocr_method_name = "Stub", "None"
+
+    documents = args.documents or [
+        make_document(os.path.join(_workdir, f"soak-{seed}.pdf"), args.pages, seed) for seed in range(4)
+    ]
+    report = soak(args.jobs, parser_name, ocr_method_name, args.format, documents,
+                  args.warmup, args.report_every)
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    shutil.rmtree(_workdir, ignore_errors=True)
+    if args.max_growth_kb is not None and report["growth_kb_per_job"] > args.max_growth_kb:
+        print(f"RSS grew {report['growth_kb_per_job']} KiB per job (limit {args.max_growth_kb})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
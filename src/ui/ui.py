@@ -1,31 +1,53 @@
+import asyncio
+import os
 import gradio as gr
 import markdown
-import threading
-import time
 import logging
-from src.core.converter import convert_file, set_cancellation_flag, is_conversion_in_progress
+from src.core.converter import OUTPUT_FORMATS, submit_conversion
+from src.core.scheduler import AdmissionRejected
+from src.core.metrics import metrics
+from src.core.progress import describe as describe_progress
+from src.core.speculation import SPECULATIVE_CONVERSION, get_speculation_registry
+from src.core.output_store import OUTPUT_TTL_SECONDS, SWEEP_INTERVAL_SECONDS, get_output_store
+from src.core.profiler import profiling_enabled, set_profiling_enabled, recent_profiles
 from src.services.docling_chat import chat_with_document
+from src.services.document_store import LIBRARY_ENABLED, get_document_store
 from src.parsers.parser_registry import ParserRegistry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Add a global variable to track cancellation state
-conversion_cancelled = threading.Event()
+# Conversion jobs currently queued or running, keyed by Gradio session
+active_jobs = {}
 
-# Pass the cancellation flag to the converter module
-set_cancellation_flag(conversion_cancelled)
+# Seconds between queue position / ETA refreshes while a job waits
+ETA_REFRESH_INTERVAL = 2.0
+# Seconds between page progress refreshes while a job runs
+PROGRESS_REFRESH_INTERVAL = 1.0
 
-# Add a background thread to monitor cancellation
-def monitor_cancellation():
-    """Background thread to monitor cancellation and update UI if needed"""
-    logger.info("Starting cancellation monitor thread")
-    while is_conversion_in_progress():
-        if conversion_cancelled.is_set():
-            logger.info("Cancellation detected by monitor thread")
-        time.sleep(0.1)  # Check every 100ms
-    logger.info("Cancellation monitor thread ending")
+# Signed-in users (Gradio auth or Hugging Face OAuth) who may see metrics and toggle profiling;
+# without any, the Admin tab is not rendered
+ADMIN_USERS = {name.strip() for name in os.getenv("MARKIT_ADMIN_USERS", "").split(",") if name.strip()}
+
+def is_admin(request: gr.Request) -> bool:
+    """Return True if the request comes from a signed-in admin user."""
+    return bool(request and request.username and request.username in ADMIN_USERS)
+
+def handle_show_admin(request: gr.Request):
+    """Show the Admin tab to admins."""
+    return gr.update(visible=is_admin(request))
+
+def handle_refresh_admin(request: gr.Request):
+    """Return the metrics and recent profiles, for admins only."""
+    if not is_admin(request):
+        return None, None
+    return metrics.snapshot(), recent_profiles() or None
+
+def handle_set_profiling(enabled, request: gr.Request):
+    """Switch process-wide profiling on or off, for admins only."""
+    if is_admin(request):
+        set_profiling_enabled(enabled)
 
 def format_markdown_content(content):
     if not content:
@@ -35,87 +57,145 @@ def format_markdown_content(content):
     html_content = markdown.markdown(str(content), extensions=['tables'])
     return html_content
 
-# Function to run conversion in a separate thread
-def run_conversion_thread(file_path, parser_name, ocr_method_name, output_format):
-    """Run the conversion in a separate thread and return the thread object"""
-    global conversion_cancelled
-    
-    # Reset the cancellation flag
-    conversion_cancelled.clear()
-    
-    # Create a container for the results
-    results = {"content": None, "download_file": None, "error": None}
-    
-    def conversion_worker():
-        try:
-            content, download_file = convert_file(file_path, parser_name, ocr_method_name, output_format)
-            results["content"] = content
-            results["download_file"] = download_file
-        except Exception as e:
-            logger.error(f"Error during conversion: {str(e)}")
-            results["error"] = str(e)
-    
-    # Create and start the thread
-    thread = threading.Thread(target=conversion_worker)
-    thread.daemon = True
-    thread.start()
-    
-    return thread, results
+def format_queue_status(job):
+    """Describe a queued job's position and ETA."""
+    shared = " Someone else is converting the same file; you will share their result." if job.shared else ""
+    return (
+        f"<div class='output-container'>Queued (position {job.position()}, "
+        f"{job.estimate['pages']} pages). Estimated time to result: ~{job.eta():.0f}s.{shared}</div>"
+    )
 
-def handle_convert(file_path, parser_name, ocr_method_name, output_format, is_cancelled):
+def format_progress_status(job, event):
+    """Describe a running job's page progress and ETA."""
+    status = describe_progress(event)
+    if not (event and event.get("eta_seconds") is not None):
+        # No page rate yet; fall back to the scheduler's cost estimate
+        status += f". Estimated time to result: ~{job.eta():.0f}s"
+    return f"<div class='output-container'>{status}.</div>"
+
+async def handle_convert(file_path, parser_name, ocr_method_name, output_format, page_range, is_cancelled,
+                         request: gr.Request, progress=gr.Progress()):
     """Handle file conversion."""
-    global conversion_cancelled
-    
     # Check if we should cancel before starting
     if is_cancelled:
         logger.info("Conversion cancelled before starting")
-        return "Conversion cancelled.", None, gr.update(visible=False), gr.update(visible=True), gr.update(visible=False), None
+        yield "Conversion cancelled.", None, gr.update(visible=True), gr.update(visible=False)
+        return
     
-    logger.info("Starting conversion with cancellation flag cleared")
+    session = request.session_hash if request else None
+    user = (request.username or session) if request else "anonymous"
     
-    # Start the conversion in a separate thread
-    thread, results = run_conversion_thread(file_path, parser_name, ocr_method_name, output_format)
-    
-    # Start the monitoring thread
-    monitor_thread = threading.Thread(target=monitor_cancellation)
-    monitor_thread.daemon = True
-    monitor_thread.start()
-    
-    # Wait for the thread to complete or be cancelled
-    while thread.is_alive():
-        # Check if cancellation was requested
-        if conversion_cancelled.is_set():
-            logger.info("Cancellation detected, waiting for thread to finish")
-            # Give the thread a chance to clean up
-            thread.join(timeout=0.5)
-            if thread.is_alive():
-                logger.warning("Thread did not finish within timeout")
-            return "Conversion cancelled.", None, gr.update(visible=False), gr.update(visible=True), gr.update(visible=False), None
-        
-        # Sleep briefly to avoid busy waiting
-        time.sleep(0.1)
-    
-    # Thread has completed, check results
-    if results["error"]:
-        return f"Error: {results['error']}", None, gr.update(visible=False), gr.update(visible=True), gr.update(visible=False), None
-    
-    content = results["content"]
-    download_file = results["download_file"]
+    # Queue the conversion; the scheduler decides when it runs
+    try:
+        job = await submit_conversion(file_path, parser_name, ocr_method_name, output_format, user=user,
+                                      page_range=page_range)
+    except AdmissionRejected as e:
+        logger.warning(f"Conversion rejected: {str(e)}")
+        yield str(e), None, gr.update(visible=True), gr.update(visible=False)
+        return
+    finally:
+        # A matching speculative conversion has been joined above; any other one is no longer needed
+        if SPECULATIVE_CONVERSION:
+            await get_speculation_registry().discard(session)
+    active_jobs[session] = job
+    try:
+        # Show the queue position and ETA until the job gets a slot
+        while not await job.wait_started(timeout=ETA_REFRESH_INTERVAL):
+            yield format_queue_status(job), None, gr.update(visible=False), gr.update(visible=True)
+        # Then show pages done and the ETA until it finishes
+        result = asyncio.ensure_future(job.wait())
+        while not result.done():
+            event = job.progress()
+            if event and event.get("total_pages"):
+                progress((event["pages_done"], event["total_pages"]), desc=describe_progress(event), unit="pages")
+            yield format_progress_status(job, event), None, gr.update(visible=False), gr.update(visible=True)
+            await asyncio.wait({result}, timeout=PROGRESS_REFRESH_INTERVAL)
+        content, download_file = result.result()
+    except Exception as e:
+        logger.error(f"Error during conversion: {str(e)}")
+        yield f"Error: {str(e)}", None, gr.update(visible=True), gr.update(visible=False)
+        return
+    finally:
+        if active_jobs.get(session) is job:
+            del active_jobs[session]
     
     # If conversion returned a cancellation message
     if content == "Conversion cancelled.":
-        logger.info("Converter returned cancellation message")
-        return content, None, gr.update(visible=False), gr.update(visible=True), gr.update(visible=False), None
+        logger.info("Conversion was cancelled")
+        yield content, None, gr.update(visible=True), gr.update(visible=False)
+        return
     
     # Format the content and wrap it in the scrollable container
     formatted_content = format_markdown_content(str(content))
+    failed_pages = getattr(content, "metadata", {}).get("failed_pages")
+    if failed_pages:
+        pages_text = ", ".join(str(page) for page in failed_pages)
+        formatted_content = (f"<p><em>Pages {pages_text} could not be converted and are marked "
+                             f"in the output.</em></p>{formatted_content}")
     html_output = f"<div class='output-container'>{formatted_content}</div>"
     
     logger.info("Conversion completed successfully")
-    return html_output, download_file, gr.update(visible=False), gr.update(visible=True), gr.update(visible=False), None
+    if download_file:
+        # Shared and retained results are served many times; keep them longest
+        get_output_store().touch(download_file)
+    
+    # A hedged conversion returns the fast result first; swap in the thorough one when it lands
+    upgrade = getattr(content, "metadata", {}).get("upgrade")
+    if upgrade is None:
+        yield html_output, download_file, gr.update(visible=True), gr.update(visible=False)
+        return
+    note = "<p><em>Showing a quick preview; the full-quality result will replace it when ready.</em></p>"
+    yield (f"<div class='output-container'>{note}{formatted_content}</div>", download_file,
+           gr.update(visible=True), gr.update(visible=False))
+    upgraded = await asyncio.wrap_future(upgrade)
+    if upgraded is not None:
+        html_output = f"<div class='output-container'>{format_markdown_content(str(upgraded))}</div>"
+    yield html_output, download_file, gr.update(visible=True), gr.update(visible=False)
+
+async def handle_speculate(file_path, parser_name, ocr_method_name, output_format, page_range,
+                           request: gr.Request):
+    """Start converting an upload before Convert is clicked (MARKIT_SPECULATIVE_CONVERSION=1)."""
+    # Changing the provider also resets the OCR option; skip the stale combination
+    if ocr_method_name not in ParserRegistry.get_ocr_options(parser_name):
+        return
+    session = request.session_hash if request else None
+    user = (request.username or session) if request else "anonymous"
+    try:
+        await get_speculation_registry().update(session, file_path, parser_name, ocr_method_name,
+                                                output_format, page_range, user=user)
+    except Exception as e:
+        logger.warning(f"Speculative conversion not started: {str(e)}")
+
+def handle_library_search(query):
+    """Search the converted-document library."""
+    store = get_document_store()
+    if store is None or not query or not query.strip():
+        return []
+    try:
+        results = store.search(query)
+    except Exception as e:
+        logger.error(f"Library search failed: {str(e)}")
+        return []
+    return [
+        [r["document_id"], r["filename"], r["page_no"], r["parser"], r["ocr_method"], r["snippet"]]
+        for r in results
+    ]
+
+def handle_open_page(document_id, page_no):
+    """Show a single page of a stored document."""
+    store = get_document_store()
+    if store is None:
+        return "<div class='output-container'>Document library is disabled.</div>"
+    if document_id is None or page_no is None:
+        return "<div class='output-container'></div>"
+    content = store.get_page(int(document_id), int(page_no))
+    if content is None:
+        return "<div class='output-container'>Page not found.</div>"
+    return f"<div class='output-container'>{format_markdown_content(content)}</div>"
 
 def create_ui():
-    with gr.Blocks(css="""
+    # Let Gradio expire its copies of download files on the same schedule as the output store
+    with gr.Blocks(delete_cache=(int(SWEEP_INTERVAL_SECONDS), int(OUTPUT_TTL_SECONDS)), css="""
         /* Simple output container with only one scrollbar */
         .output-container {
             max-height: 420px;  /* Changed from 600px to 70% of original height */
@@ -146,15 +226,14 @@ def create_ui():
         
         # State to track if cancellation is requested
         cancel_requested = gr.State(False)
-        # State to store the conversion thread
-        conversion_thread = gr.State(None)
-        # State to store the output format (fixed to Markdown)
-        output_format_state = gr.State("Markdown")
 
         with gr.Tabs():
             with gr.Tab("Upload and Convert"):
                 # File input first
-                file_input = gr.File(label="Upload PDF", type="filepath")
+                file_input = gr.File(
+                    label="Upload PDF, image, Word, PowerPoint, Excel, HTML or Markdown",
+                    type="filepath"
+                )
                 
                 # Provider and OCR options below the file input
                 with gr.Row(elem_classes=["provider-options-row"]):
@@ -178,6 +257,19 @@ def create_ui():
                             value=default_ocr,
                             interactive=True
                         )
+                    with gr.Column(scale=1):
+                        output_format_dropdown = gr.Dropdown(
+                            label="Output Format",
+                            choices=list(OUTPUT_FORMATS),
+                            value="Markdown",
+                            interactive=True
+                        )
+                
+                # Page selection for parsers that upload the document (Gemini Flash)
+                page_range_input = gr.Textbox(
+                    label="Pages to convert (e.g. 1-3, 7; empty for all)",
+                    visible=ParserRegistry.supports_page_range(default_parser)
+                )
                 
                 # Simple output container with just one scrollbar
                 file_display = gr.HTML(
@@ -198,6 +290,29 @@ def create_ui():
                 text_input = gr.Textbox(placeholder="Type here...")
                 clear_btn = gr.Button("Clear")
 
+            with gr.Tab("Library", visible=LIBRARY_ENABLED):
+                search_input = gr.Textbox(label="Search", placeholder="Search converted documents...")
+                search_results = gr.Dataframe(
+                    headers=["Document", "File", "Page", "Parser", "OCR", "Match"],
+                    interactive=False
+                )
+                with gr.Row():
+                    library_document_id = gr.Number(label="Document", precision=0)
+                    library_page_no = gr.Number(label="Page", value=1, precision=0)
+                    open_page_button = gr.Button("Open Page")
+                library_page_display = gr.HTML(value="<div class='output-container'></div>")
+
+            if ADMIN_USERS:
+                # Hidden until an admin's page loads; the handlers check the user again
+                with gr.Tab("Admin", visible=False) as admin_tab:
+                    metrics_display = gr.JSON(label="Metrics")
+                    refresh_metrics_button = gr.Button("Refresh")
+                    profiling_checkbox = gr.Checkbox(
+                        label="Profile conversions (CPU stacks and allocations)",
+                        value=profiling_enabled()
+                    )
+                    profiles_display = gr.File(label="Recent profiles", file_count="multiple", interactive=False)
+
         # Event handlers
         provider_dropdown.change(
             lambda p: gr.Dropdown(choices=ParserRegistry.get_ocr_options(p), 
@@ -205,47 +320,53 @@ def create_ui():
             inputs=[provider_dropdown],
             outputs=[ocr_dropdown]
         )
+        provider_dropdown.change(
+            lambda p: gr.update(visible=ParserRegistry.supports_page_range(p)),
+            inputs=[provider_dropdown],
+            outputs=[page_range_input]
+        )
+
+        # Optionally start converting as soon as the file and settings are known
+        if SPECULATIVE_CONVERSION:
+            speculation_inputs = [file_input, provider_dropdown, ocr_dropdown, output_format_dropdown, page_range_input]
+            for trigger in (file_input.change, provider_dropdown.change, ocr_dropdown.change,
+                            output_format_dropdown.change, page_range_input.blur):
+                trigger(fn=handle_speculate, inputs=speculation_inputs, outputs=[], concurrency_limit=None)
 
-        # Reset cancel flag when starting conversion
-        def start_conversion():
-            global conversion_cancelled
-            conversion_cancelled.clear()
-            logger.info("Starting conversion with cancellation flag cleared")
+        # Show the cancel button when starting conversion
+        def start_conversion_ui():
+            logger.info("Starting conversion")
             return gr.update(visible=False), gr.update(visible=True), False
 
-        # Set cancel flag and terminate thread when cancel button is clicked
-        def request_cancellation(thread):
-            global conversion_cancelled
-            conversion_cancelled.set()
-            logger.info("Cancel button clicked, cancellation flag set")
-            
-            # Try to join the thread with a timeout
-            if thread is not None:
-                logger.info(f"Attempting to join conversion thread: {thread}")
-                thread.join(timeout=0.5)
-                if thread.is_alive():
-                    logger.warning("Thread did not finish within timeout")
+        # Cancel this session's conversion when the cancel button is clicked
+        async def request_cancellation(request: gr.Request):
+            logger.info("Cancel button clicked")
+            job = active_jobs.get(request.session_hash if request else None)
+            if job is not None:
+                await job.cancel()
             
             # Add immediate feedback to the user
-            return gr.update(visible=True), gr.update(visible=False), True, None
+            return gr.update(visible=True), gr.update(visible=False), True
 
         # Start conversion sequence
         convert_button.click(
-            fn=start_conversion,
+            fn=start_conversion_ui,
             inputs=[],
             outputs=[convert_button, cancel_button, cancel_requested],
             queue=False  # Execute immediately
         ).then(
             fn=handle_convert,
-            inputs=[file_input, provider_dropdown, ocr_dropdown, output_format_state, cancel_requested],
-            outputs=[file_display, file_download, convert_button, cancel_button, conversion_thread]
+            inputs=[file_input, provider_dropdown, ocr_dropdown, output_format_dropdown, page_range_input,
+                    cancel_requested],
+            outputs=[file_display, file_download, convert_button, cancel_button],
+            concurrency_limit=None  # Jobs are bounded by the converter's scheduler
         )
         
         # Handle cancel button click
         cancel_button.click(
             fn=request_cancellation,
-            inputs=[conversion_thread],
-            outputs=[convert_button, cancel_button, cancel_requested, conversion_thread],
+            inputs=[],
+            outputs=[convert_button, cancel_button, cancel_requested],
             queue=False  # Execute immediately
         )
 
@@ -261,6 +382,37 @@ def create_ui():
             outputs=[chatbot, chatbot]
         )
 
+        search_input.submit(
+            fn=handle_library_search,
+            inputs=[search_input],
+            outputs=[search_results]
+        )
+
+        open_page_button.click(
+            fn=handle_open_page,
+            inputs=[library_document_id, library_page_no],
+            outputs=[library_page_display]
+        )
+
+        if ADMIN_USERS:
+            demo.load(
+                fn=handle_show_admin,
+                inputs=[],
+                outputs=[admin_tab]
+            )
+
+            refresh_metrics_button.click(
+                fn=handle_refresh_admin,
+                inputs=[],
+                outputs=[metrics_display, profiles_display]
+            )
+
+            profiling_checkbox.change(
+                fn=handle_set_profiling,
+                inputs=[profiling_checkbox],
+                outputs=[]
+            )
+
         clear_btn.click(
             lambda: ([], []),
             None,
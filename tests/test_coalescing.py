@@ -0,0 +1,117 @@
+"""Tests for single-flight coalescing of identical conversions."""
+
+import asyncio
+
+from src.core.coalescing import CANCELLED_RESULT, SingleFlight
+
+
+class FakeJob:
+    """Stands in for a ScheduledJob: finishes when ``finish()`` is called."""
+
+    def __init__(self):
+        self._result = asyncio.get_running_loop().create_future()
+        self.cancel_calls = 0
+
+    def finish(self, result):
+        self._result.set_result(result)
+
+    async def wait(self):
+        return await self._result
+
+    async def cancel(self):
+        self.cancel_calls += 1
+        if not self._result.done():
+            self._result.set_result(CANCELLED_RESULT)
+
+
+def starter(jobs):
+    def start():
+        job = FakeJob()
+        jobs.append(job)
+        return job
+    return start
+
+
+def test_identical_requests_share_one_job():
+    async def run():
+        coalescer, jobs = SingleFlight(), []
+        first = coalescer.join("key", starter(jobs))
+        second = coalescer.join("key", starter(jobs))
+        assert len(jobs) == 1
+        assert first.shared and second.shared
+        jobs[0].finish(("content", "/tmp/out.md"))
+        return await first, await second, coalescer.is_running("key")
+
+    first, second, running = asyncio.run(run())
+    assert first == second == ("content", "/tmp/out.md")
+    assert not running
+
+
+def test_different_keys_start_separate_jobs():
+    async def run():
+        coalescer, jobs = SingleFlight(), []
+        coalescer.join("a", starter(jobs))
+        coalescer.join("b", starter(jobs))
+        return len(jobs)
+
+    assert asyncio.run(run()) == 2
+
+
+def test_job_is_cancelled_only_when_every_subscriber_cancels():
+    async def run():
+        coalescer, jobs = SingleFlight(), []
+        first = coalescer.join("key", starter(jobs))
+        second = coalescer.join("key", starter(jobs))
+        await first.cancel()
+        cancelled_after_one = jobs[0].cancel_calls
+        first_result = await first
+        await second.cancel()
+        return cancelled_after_one, first_result, jobs[0].cancel_calls, coalescer.is_available("key")
+
+    cancelled_after_one, first_result, cancel_calls, available = asyncio.run(run())
+    assert cancelled_after_one == 0
+    assert first_result == CANCELLED_RESULT
+    assert cancel_calls == 1
+    assert not available
+
+
+def test_request_after_completion_starts_a_new_job():
+    async def run():
+        coalescer, jobs = SingleFlight(), []
+        first = coalescer.join("key", starter(jobs))
+        jobs[0].finish(("content", "/tmp/out.md"))
+        await first
+        await asyncio.sleep(0)
+        coalescer.join("key", starter(jobs))
+        return len(jobs)
+
+    assert asyncio.run(run()) == 2
+
+
+def test_retained_result_is_reused_until_it_expires():
+    async def run():
+        coalescer, jobs = SingleFlight(), []
+        first = coalescer.join("key", starter(jobs), retain_seconds=0.05)
+        jobs[0].finish(("content", "/tmp/out.md"))
+        await first
+        late = coalescer.join("key", starter(jobs))
+        reused = await late, len(jobs)
+        await asyncio.sleep(0.1)
+        return reused, coalescer.is_available("key")
+
+    (result, job_count), available = asyncio.run(run())
+    assert result == ("content", "/tmp/out.md")
+    assert job_count == 1
+    assert not available
+
+
+def test_failed_result_is_not_retained():
+    async def run():
+        coalescer, jobs = SingleFlight(), []
+        first = coalescer.join("key", starter(jobs), retain_seconds=60)
+        jobs[0].finish(("Error: could not convert", None))
+        await first
+        await asyncio.sleep(0)
+        return coalescer.is_available("key")
+
+    assert not asyncio.run(run())
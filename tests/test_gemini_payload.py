@@ -0,0 +1,39 @@
+"""Tests for the 1-based page selection parser used by page_range."""
+
+import pytest
+
+pytest.importorskip("src.parsers", reason="parser dependencies are not installed")
+
+from src.parsers.gemini_payload import parse_page_range
+
+
+def test_empty_selection_means_every_page():
+    assert parse_page_range(None, 3) == [0, 1, 2]
+    assert parse_page_range("  ", 3) == [0, 1, 2]
+
+
+def test_single_pages_and_ranges():
+    assert parse_page_range("1-3, 7", 10) == [0, 1, 2, 6]
+
+
+def test_open_ended_ranges():
+    assert parse_page_range("8-", 10) == [7, 8, 9]
+    assert parse_page_range("-2", 10) == [0, 1]
+
+
+def test_overlapping_parts_are_merged_and_sorted():
+    assert parse_page_range("5, 2-4, 3", 10) == [1, 2, 3, 4]
+
+
+def test_selection_is_clamped_to_the_document():
+    assert parse_page_range("0-2, 9-20", 10) == [0, 1, 8, 9]
+
+
+def test_malformed_selection_raises():
+    with pytest.raises(ValueError):
+        parse_page_range("one-two", 10)
+
+
+def test_selection_outside_the_document_raises():
+    with pytest.raises(ValueError):
+        parse_page_range("11-12", 10)
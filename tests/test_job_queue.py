@@ -0,0 +1,99 @@
+"""Tests for the SQLite job broker's leases, retries and cancellation."""
+
+import time
+
+from src.core.job_queue import CANCELLED, DONE, FAILED, QUEUED, RUNNING, SQLiteBroker
+
+
+def make_broker(tmp_path, **kwargs):
+    return SQLiteBroker(str(tmp_path / "queue.sqlite"), **kwargs)
+
+
+def expire_lease():
+    time.sleep(0.05)
+
+
+def test_jobs_are_claimed_oldest_first(tmp_path):
+    broker = make_broker(tmp_path)
+    first = broker.enqueue({"n": 1})
+    second = broker.enqueue({"n": 2})
+    assert broker.claim("w1")["id"] == first
+    assert broker.claim("w2")["id"] == second
+    assert broker.claim("w3") is None
+
+
+def test_live_lease_is_not_redelivered(tmp_path):
+    broker = make_broker(tmp_path)
+    job_id = broker.enqueue({})
+    broker.claim("w1", lease_seconds=60)
+    assert broker.claim("w2") is None
+    assert broker.heartbeat(job_id, "w1")
+    assert not broker.heartbeat(job_id, "w2")
+
+
+def test_expired_lease_is_redelivered_to_another_worker(tmp_path):
+    broker = make_broker(tmp_path)
+    job_id = broker.enqueue({})
+    broker.claim("w1", lease_seconds=0.01)
+    expire_lease()
+    job = broker.claim("w2")
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    # The first worker no longer owns the job
+    assert not broker.complete(job_id, "w1", {"result_path": "x"})
+    assert broker.complete(job_id, "w2", {"result_path": "x"})
+    assert broker.get(job_id)["status"] == DONE
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    broker = make_broker(tmp_path, max_attempts=2)
+    job_id = broker.enqueue({})
+    for worker in ("w1", "w2"):
+        broker.claim(worker, lease_seconds=0.01)
+        expire_lease()
+    assert broker.claim("w3") is None
+    job = broker.get(job_id)
+    assert job["status"] == FAILED
+    assert job["result"] == {"error": "Worker stopped responding"}
+
+
+def test_cancelling_a_queued_job(tmp_path):
+    broker = make_broker(tmp_path)
+    job_id = broker.enqueue({})
+    broker.cancel(job_id)
+    assert broker.get(job_id)["status"] == CANCELLED
+    assert broker.claim("w1") is None
+
+
+def test_cancelling_a_running_job_asks_its_worker_to_stop(tmp_path):
+    broker = make_broker(tmp_path)
+    job_id = broker.enqueue({})
+    broker.claim("w1", lease_seconds=60)
+    broker.cancel(job_id)
+    job = broker.get(job_id)
+    assert job["status"] == RUNNING
+    assert job["cancel_requested"]
+
+
+def test_cancelled_job_with_expired_lease_is_finished(tmp_path):
+    broker = make_broker(tmp_path)
+    input_path = tmp_path / "input.pdf"
+    input_path.write_bytes(b"%PDF")
+    job_id = broker.enqueue({"input_path": str(input_path)})
+    broker.claim("w1", lease_seconds=0.01)
+    broker.cancel(job_id)
+    expire_lease()
+    other = broker.enqueue({})
+    assert broker.claim("w2")["id"] == other
+    assert broker.get(job_id)["status"] == CANCELLED
+    assert not input_path.exists()
+
+
+def test_progress_is_only_recorded_for_the_owner(tmp_path):
+    broker = make_broker(tmp_path)
+    job_id = broker.enqueue({})
+    assert broker.get(job_id)["status"] == QUEUED
+    broker.claim("w1", lease_seconds=60)
+    broker.report_progress(job_id, "w2", {"pages_done": 9})
+    broker.report_progress(job_id, "w1", {"pages_done": 3})
+    assert broker.get(job_id)["progress"] == {"pages_done": 3}
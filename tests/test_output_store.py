@@ -0,0 +1,106 @@
+"""Tests for the output store's TTL, quota eviction and adoption of untracked files."""
+
+import os
+import time
+
+from src.core.output_store import OutputStore
+
+
+def write(store, size, suffix=".md"):
+    path = store.create_path(suffix=suffix)
+    with open(path, "w") as f:
+        f.write("x" * size)
+    return path
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_expired_files_are_swept(tmp_path):
+    store = OutputStore(str(tmp_path), ttl_seconds=60, quota_bytes=10_000)
+    short = write(store, 10)
+    store.register(short, ttl_seconds=0)
+    kept = write(store, 10)
+    store.register(kept)
+    store.sweep()
+    assert not os.path.exists(short)
+    assert os.path.exists(kept)
+    assert store.bytes_held() == 10
+
+
+def test_least_recently_used_file_is_evicted_over_quota(tmp_path):
+    store = OutputStore(str(tmp_path), ttl_seconds=60, quota_bytes=250)
+    first = write(store, 100)
+    store.register(first)
+    second = write(store, 100)
+    store.register(second)
+    store.touch(first)
+    third = write(store, 100)
+    store.register(third)
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+    assert os.path.exists(third)
+
+
+def test_newest_file_is_not_evicted_even_over_quota(tmp_path):
+    store = OutputStore(str(tmp_path), ttl_seconds=60, quota_bytes=100)
+    older = write(store, 50)
+    store.register(older)
+    newest = write(store, 500)
+    store.register(newest)
+    assert not os.path.exists(older)
+    assert os.path.exists(newest)
+
+
+def test_served_file_is_not_evicted(tmp_path):
+    store = OutputStore(str(tmp_path), ttl_seconds=60, quota_bytes=150)
+    served = write(store, 100)
+    store.register(served)
+    other = write(store, 100)
+    store.register(other)
+    assert not os.path.exists(served)
+    # Serving a file exempts it from the next eviction
+    kept = write(store, 100)
+    store.register(kept)
+    store.touch(kept)
+    store.quota_bytes = 50
+    store.sweep()
+    assert os.path.exists(kept)
+    assert not os.path.exists(other)
+
+
+def test_untracked_side_files_are_adopted_once_settled(tmp_path):
+    store = OutputStore(str(tmp_path), ttl_seconds=3600, quota_bytes=10_000)
+    download = write(store, 10)
+    store.register(download)
+    side = os.path.splitext(download)[0] + ".profile.zip"
+    with open(side, "w") as f:
+        f.write("x" * 20)
+    store.sweep()
+    assert store.bytes_held() == 10
+    age(side, 700)
+    store.sweep()
+    assert store.bytes_held() == 30
+
+
+def test_files_being_written_are_not_adopted(tmp_path):
+    store = OutputStore(str(tmp_path), ttl_seconds=60, quota_bytes=10_000)
+    reserved = store.create_path(suffix=".md")
+    branch = os.path.splitext(reserved)[0] + ".fast.md"
+    open(branch, "w").close()
+    age(reserved, 3600)
+    age(branch, 3600)
+    store.sweep()
+    assert store.bytes_held() == 0
+    assert os.path.exists(reserved) and os.path.exists(branch)
+
+
+def test_files_from_a_previous_run_expire_from_their_modification_time(tmp_path):
+    leftover = tmp_path / "leftover.md"
+    leftover.write_text("x" * 10)
+    age(leftover, 3600)
+    store = OutputStore(str(tmp_path), ttl_seconds=60, quota_bytes=10_000)
+    store.sweep()
+    assert not leftover.exists()
@@ -0,0 +1,118 @@
+"""Tests for the page cache's keys and the splicing of cached and converted pages."""
+
+import pytest
+
+pytest.importorskip("src.parsers", reason="parser dependencies are not installed")
+pdfium = pytest.importorskip("pypdfium2")
+
+from src.core.page_cache import PageCache, _cache_key, compute_page_hashes, parse_with_page_cache
+from src.parsers.parser_interface import DocumentParser, ParseResult
+
+
+def make_pdf(path, widths):
+    """Write a PDF with one blank page per width; pages of different widths hash differently."""
+    pdf = pdfium.PdfDocument.new()
+    for width in widths:
+        pdf.new_page(width, 200).close()
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
+
+
+class WidthParser(DocumentParser):
+    """Converts each page to its width, recording which pages it was given."""
+
+    def __init__(self, failing_widths=()):
+        self.calls = []
+        self.failing_widths = set(failing_widths)
+
+    @classmethod
+    def get_name(cls):
+        return "Widths"
+
+    @classmethod
+    def get_supported_ocr_methods(cls):
+        return [{"id": "no_ocr", "name": "No OCR", "default_params": {}}]
+
+    @classmethod
+    def supports_page_output(cls):
+        return True
+
+    def parse(self, file_path, ocr_method=None, **kwargs):
+        pdf = pdfium.PdfDocument(str(file_path))
+        widths = [int(pdf[i].get_width()) for i in range(len(pdf))]
+        pdf.close()
+        self.calls.append(widths)
+        pages, statuses = [], []
+        for number, width in enumerate(widths, start=1):
+            failed = width in self.failing_widths
+            pages.append(f"<!-- failed {width} -->" if failed else f"page {width}")
+            statuses.append({"page": number, "status": "failed" if failed else "ok"})
+        failed_pages = [status["page"] for status in statuses if status["status"] == "failed"]
+        return ParseResult("\n\n".join(pages), pages=pages,
+                           metadata={"page_status": statuses, "failed_pages": failed_pages})
+
+
+def test_cache_key_depends_on_every_setting():
+    base = _cache_key("hash", "Docling", "no_ocr")
+    assert base == _cache_key("hash", "Docling", "no_ocr")
+    assert base != _cache_key("other", "Docling", "no_ocr")
+    assert base != _cache_key("hash", "Marker", "no_ocr")
+    assert base != _cache_key("hash", "Docling", "tesseract")
+    assert base != _cache_key("hash", "Docling", "no_ocr", "cpu_optimised")
+
+
+def test_page_hashes_follow_page_content(tmp_path):
+    first = compute_page_hashes(make_pdf(tmp_path / "a.pdf", [100, 110, 120]))
+    second = compute_page_hashes(make_pdf(tmp_path / "b.pdf", [100, 115, 120]))
+    assert len(first) == 3
+    assert first[0] == second[0] and first[2] == second[2]
+    assert first[1] != second[1]
+
+
+def test_only_changed_pages_are_converted(tmp_path):
+    cache = PageCache(":memory:")
+    parser = WidthParser()
+    parse_with_page_cache(parser, "Widths", make_pdf(tmp_path / "v1.pdf", [100, 110, 120, 130]),
+                          "no_ocr", cache)
+    result = parse_with_page_cache(parser, "Widths", make_pdf(tmp_path / "v2.pdf", [100, 115, 120, 130]),
+                                   "no_ocr", cache)
+    assert parser.calls == [[100, 110, 120, 130], [115]]
+    assert result.pages == ["page 100", "page 115", "page 120", "page 130"]
+    assert str(result) == "page 100\n\npage 115\n\npage 120\n\npage 130"
+    assert result.metadata["page_cache"] == {"pages": 4, "hits": 3, "misses": 1}
+
+
+def test_partial_hit_keeps_page_status_of_converted_pages(tmp_path):
+    cache = PageCache(":memory:")
+    parse_with_page_cache(WidthParser(), "Widths", make_pdf(tmp_path / "v1.pdf", [100, 110, 120, 130]),
+                          "no_ocr", cache)
+    parser = WidthParser(failing_widths={135})
+    result = parse_with_page_cache(parser, "Widths", make_pdf(tmp_path / "v2.pdf", [100, 115, 120, 135]),
+                                   "no_ocr", cache)
+    assert parser.calls == [[115, 135]]
+    # Statuses are numbered by the original document's pages, not the sub-document's
+    assert result.metadata["page_status"] == [{"page": 2, "status": "ok"}, {"page": 4, "status": "failed"}]
+    assert result.metadata["failed_pages"] == [4]
+
+
+def test_failed_pages_are_not_cached(tmp_path):
+    cache = PageCache(":memory:")
+    path = make_pdf(tmp_path / "doc.pdf", [100, 110])
+    parse_with_page_cache(WidthParser(failing_widths={110}), "Widths", path, "no_ocr", cache)
+    parser = WidthParser()
+    result = parse_with_page_cache(parser, "Widths", path, "no_ocr", cache)
+    assert parser.calls == [[110]]
+    assert result.pages == ["page 100", "page 110"]
+
+
+@pytest.mark.parametrize("parser_name", ["Auto", "Fast Text"])
+def test_uncached_parsers_are_left_alone(tmp_path, parser_name):
+    path = make_pdf(tmp_path / "doc.pdf", [100, 110])
+    assert parse_with_page_cache(WidthParser(), parser_name, path, "no_ocr", PageCache(":memory:")) is None
+
+
+def test_uncacheable_formats_are_left_alone(tmp_path):
+    path = make_pdf(tmp_path / "doc.pdf", [100, 110])
+    assert parse_with_page_cache(WidthParser(), "Widths", path, "no_ocr", PageCache(":memory:"),
+                                 output_format="json") is None
@@ -0,0 +1,85 @@
+"""Tests for shortest-job-first ordering with aging and for throughput history."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.core.scheduler import JobScheduler, ThroughputHistory
+
+
+def estimate(seconds, pages=1):
+    return {"pages": pages, "file_size": 0, "scanned_ratio": 0.0, "seconds": seconds}
+
+
+def make_scheduler(aging):
+    return JobScheduler(slots=1, policy="sjf", max_backlog_seconds=1e9,
+                        history=ThroughputHistory(path=None), aging=aging)
+
+
+def queue_order(aging, gap):
+    """Occupy the only slot, then queue a large job and, ``gap`` seconds later, a small one."""
+
+    async def run():
+        scheduler = make_scheduler(aging)
+        loop = asyncio.get_running_loop()
+        scheduler.submit(loop.create_future, estimate(1), user="running")
+        large = scheduler.submit(loop.create_future, estimate(10), user="large")
+        await asyncio.sleep(gap)
+        small = scheduler.submit(loop.create_future, estimate(1), user="small")
+        return {"large": large.position(), "small": small.position()}
+
+    return asyncio.run(run())
+
+
+def test_plain_sjf_runs_small_jobs_first():
+    assert queue_order(aging=0.0, gap=0.05) == {"large": 2, "small": 1}
+
+
+def test_waiting_job_overtakes_smaller_newcomers():
+    # 0.05s of waiting at 1000s forgiven per second outweighs the 9s cost difference
+    assert queue_order(aging=1000.0, gap=0.05) == {"large": 1, "small": 2}
+
+
+def test_jobs_start_in_rank_order_as_slots_free():
+    async def run():
+        scheduler = make_scheduler(aging=0.0)
+        loop = asyncio.get_running_loop()
+        started = []
+
+        def runner(name):
+            def start():
+                started.append(name)
+                return loop.create_future()
+            return start
+
+        first = scheduler.submit(runner("first"), estimate(1))
+        scheduler.submit(runner("large"), estimate(10))
+        scheduler.submit(runner("small"), estimate(2))
+        first.job.set_result(("done", "/tmp/out.md"))
+        await asyncio.sleep(0)
+        return started
+
+    assert asyncio.run(run()) == ["first", "small"]
+
+
+def test_throughput_history_moving_average(tmp_path):
+    path = tmp_path / "throughput.json"
+    history = ThroughputHistory(str(path))
+    history.record("Docling", "no_ocr", pages=10, seconds=10)
+    history.record("Docling", "no_ocr", pages=10, seconds=20)
+    assert history.seconds_per_page("Docling", "no_ocr") == pytest.approx(1.3)
+    assert json.loads(path.read_text()) == {"Docling/no_ocr": pytest.approx(1.3)}
+
+
+def test_throughput_history_saves_off_the_event_loop(tmp_path):
+    path = tmp_path / "throughput.json"
+    history = ThroughputHistory(str(path))
+
+    async def run():
+        for seconds in (1, 2, 3):
+            history.record("Marker", "no_ocr", pages=1, seconds=seconds)
+
+    # asyncio.run() waits for the executor, and with it any pending save
+    asyncio.run(run())
+    assert json.loads(path.read_text()) == {"Marker/no_ocr": history.seconds_per_page("Marker", "no_ocr")}